@@ -0,0 +1,103 @@
+"""
+Activity - rollups that keep the live activity feed readable on long scans.
+
+A deep scan produces thousands of near-identical lines from _describe_tool_execution
+("[PROBE] Testing /api/users", "[PROBE] GET request to /api/orders", ...), and the feed only
+shows the last 100, so it ended up being mostly noise. rollup_activity() collapses runs of
+similar actions into one aggregate line with a count — "[PROBE] Probed 140 endpoints under
+/api", "[ANALYZE] Processing scan results (12x)" — and caps the result, so the
+recent_activity payload stays bounded no matter how long the scan runs.
+
+Entries keep the feed's shape ({ts, description, status, line}) plus a "count". "line" is
+the raw event number of the last event folded into the entry, so the dashboard's numbering
+still tracks the total number of actions.
+"""
+
+import re
+
+# Descriptions that name a path (see _categorize_action in strix_runner.py).
+_PATH_DESCRIPTION = re.compile(
+    r"^(?:Testing|Navigating to|[A-Z]+ request to)\s+(/\S*)$"
+)
+_TAG = re.compile(r"^(\[[A-Z]+\])\s*(.*)$")
+
+# Never folded together — each one is worth its own line.
+_KEEP_SEPARATE = {"[VULN]", "[NOTE]"}
+
+# How many of the most recent groups a new event may join. Parallel agents interleave
+# their actions, so strictly consecutive runs would barely collapse anything.
+_LOOKBACK = 4
+
+
+def _prefix(path: str) -> str:
+    """First path segment: /api/v1/users -> /api, /login -> /login."""
+    segment = path.strip("/").split("/", 1)[0]
+    return f"/{segment}" if segment else "/"
+
+
+def _group_key(description: str) -> tuple[tuple | None, str]:
+    """(group key, path named in the description or '') — key is None for ungroupable lines."""
+    m = _TAG.match(description)
+    tag, text = (m.group(1), m.group(2)) if m else ("", description)
+    if tag in _KEEP_SEPARATE:
+        return None, ""
+    path = _PATH_DESCRIPTION.match(text)
+    if path:
+        return (tag, "path", _prefix(path.group(1))), path.group(1)
+    return (tag, "text", text), ""
+
+
+def _describe_group(group: dict) -> str:
+    first, count = group["first"], group["count"]
+    if count == 1:
+        return first
+    tag, kind, value = group["key"]
+    lead = f"{tag} " if tag else ""
+    if kind == "path":
+        paths = len(group["paths"])
+        if paths == 1:
+            return f"{first} ({count}x)"
+        return f"{lead}Probed {paths} endpoints under {value}"
+    return f"{first} ({count}x)"
+
+
+def rollup_activity(entries: list[dict], max_entries: int = 100) -> list[dict]:
+    """
+    Collapse similar activity entries (already sorted by ts) and keep the newest max_entries.
+
+    Events join a recent group with the same tag and either the same description or, for
+    path-bearing descriptions, the same top-level path. Groups are ordered by, and take
+    ts/status/line from, their latest event (status is "running" while any folded event
+    still is), so line numbers stay increasing down the feed.
+    """
+    groups: list[dict] = []
+    for number, entry in enumerate(entries, start=1):
+        description = entry.get("description", "")
+        key, path = _group_key(description)
+        group = None
+        if key is not None:
+            for i in range(len(groups) - 1, max(-1, len(groups) - 1 - _LOOKBACK), -1):
+                if groups[i]["key"] == key:
+                    group = groups.pop(i)  # re-appended below: groups stay ordered by latest event
+                    break
+        if group is None:
+            group = {"key": key, "first": description, "count": 0, "paths": set(), "running": False}
+        groups.append(group)
+        group["count"] += 1
+        group["last"] = entry
+        group["line"] = number
+        group["running"] = group["running"] or entry.get("status") == "running"
+        if path:
+            group["paths"].add(path)
+
+    rolled = []
+    for group in groups[-max_entries:] if max_entries > 0 else []:
+        last = group["last"]
+        rolled.append({
+            "ts": last.get("ts", ""),
+            "description": _describe_group(group),
+            "status": "running" if group["running"] else last.get("status", "completed"),
+            "line": group["line"],
+            "count": group["count"],
+        })
+    return rolled
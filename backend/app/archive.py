@@ -0,0 +1,199 @@
+"""
+Archive - move expired free reports out of the hot scans table.
+
+A free scan's report expires FREE_REPORT_TTL_DAYS after it was created: get_scan_results
+stops serving it, yet its results_json / progress_json used to stay in the row forever.
+archive_batch() moves those payloads to one gzip file per scan under settings.archive_dir
+and clears them from the row (archived_at records when), along with the scan's rendered
+result views (app/result_views.py). The worker runs a batch at a time while idle;
+`python -m app.archive` runs to completion.
+
+A file is written (atomically) before its row is cleared, and the row is only cleared while
+the scan is still unpaid and unarchived — a scan paid for mid-batch keeps its payloads and
+the file is removed. restore_scan() puts the payloads back: on payment or admin unlock, and
+when an admin (or a paid reader) opens an archived report.
+
+SQLite keeps the pages a cleared blob used in its freelist. New databases are created with
+auto_vacuum=INCREMENTAL (app/sqlite_backend.py), so reclaim_space() hands at most
+settings.archive_vacuum_pages of them back to the filesystem per run instead of rewriting
+the whole file. `python -m app.archive --vacuum` converts an older database with one full
+VACUUM (it holds the write lock for the duration, so run it off-peak).
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import sqlalchemy
+
+from app.config import settings
+from app.database import database, engine as _default_engine, result_views, scans
+
+FREE_REPORT_TTL_DAYS = 30
+
+# Anything but a scan still in flight. (A NOT IN also keeps the planner on ix_scans_archivable.)
+_ACTIVE_STATUSES = ("pending", "running", "postprocessing", "cancelling")
+
+
+def archive_path(scan_id: str) -> Path:
+    return Path(settings.archive_dir) / "scans" / scan_id[:2] / f"{scan_id}.json.gz"
+
+
+def _write_archive(scan_id: str, payload: dict) -> int:
+    path = archive_path(scan_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = gzip.compress(json.dumps(payload).encode("utf-8"))
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(data)
+
+
+def load_archive(scan_id: str) -> dict | None:
+    """The archived {"results_json", "progress_json", ...} for a scan, or None."""
+    try:
+        return json.loads(gzip.decompress(archive_path(scan_id).read_bytes()))
+    except FileNotFoundError:
+        return None
+
+
+def expired_query(now: datetime, limit: int):
+    """Free, top-level, finished scans past the TTL whose payloads are still in the row —
+    spelled to match the partial index ix_scans_archivable."""
+    cutoff = now - timedelta(days=FREE_REPORT_TTL_DAYS)
+    return (
+        scans.select()
+        .with_only_columns(scans.c.id, scans.c.created_at, scans.c.results_json, scans.c.progress_json)
+        .where(scans.c.archived_at.is_(None) & scans.c.paid_tier.is_(None) & scans.c.parent_scan_id.is_(None))
+        .where(scans.c.status.notin_(_ACTIVE_STATUSES) & (scans.c.created_at <= cutoff))
+        .order_by(scans.c.created_at)
+        .limit(limit)
+    )
+
+
+async def archive_batch(now: datetime | None = None, limit: int | None = None, db=None) -> dict:
+    """Archive up to `limit` expired free scans. Returns {"scans", "bytes_freed", "archive_bytes"}."""
+    db = db or database
+    now = now or datetime.utcnow()  # naive UTC, matching how scans.created_at is stored
+    rows = await db.fetch_all(expired_query(now, limit or settings.archive_batch))
+    archived = freed = written = 0
+    for row in rows:
+        payload = {
+            "scan_id": row["id"], "archived_at": now.isoformat(),
+            "results_json": row["results_json"], "progress_json": row["progress_json"],
+        }
+        size = await asyncio.to_thread(_write_archive, row["id"], payload)
+        cleared = await db.fetch_one(
+            scans.update()
+            .where((scans.c.id == row["id"]) & scans.c.archived_at.is_(None) & scans.c.paid_tier.is_(None))
+            .values(results_json=None, progress_json=None, archived_at=now)
+            .returning(scans.c.id)
+        )
+        if cleared is None:  # paid for (or archived elsewhere) since we read it
+            archive_path(row["id"]).unlink(missing_ok=True)
+            continue
+        await db.execute(result_views.delete().where(result_views.c.scan_id == row["id"]))
+        archived += 1
+        written += size
+        freed += sum(len(row[c] or "") for c in ("results_json", "progress_json"))
+    return {"scans": archived, "bytes_freed": freed, "archive_bytes": written}
+
+
+async def restore_scan(scan_id: str, db=None) -> bool:
+    """Put an archived scan's payloads back in its row. False if it isn't archived."""
+    db = db or database
+    row = await db.fetch_one(
+        scans.select().with_only_columns(scans.c.archived_at).where(scans.c.id == scan_id)
+    )
+    if row is None or row["archived_at"] is None:
+        return False
+    payload = await asyncio.to_thread(load_archive, scan_id)
+    if payload is None:
+        print(f"[archive] {scan_id}: archived but {archive_path(scan_id)} is missing", flush=True)
+        return False
+    restored = await db.fetch_one(
+        scans.update()
+        .where((scans.c.id == scan_id) & scans.c.archived_at.isnot(None))
+        .values(results_json=payload["results_json"], progress_json=payload["progress_json"],
+                archived_at=None)
+        .returning(scans.c.id)
+    )
+    if restored is not None:
+        archive_path(scan_id).unlink(missing_ok=True)
+    return restored is not None
+
+
+def reclaim_space(engine: sqlalchemy.Engine | None = None, max_pages: int | None = None) -> dict:
+    """SQLite only: release up to `max_pages` free pages (auto_vacuum=INCREMENTAL databases).
+
+    Returns {"auto_vacuum", "freelist_pages", "released_pages"}; on a database without
+    incremental auto_vacuum nothing is released — see `python -m app.archive --vacuum`."""
+    engine = engine or _default_engine
+    if engine.dialect.name != "sqlite":
+        return {"auto_vacuum": None, "freelist_pages": 0, "released_pages": 0}
+    with engine.connect() as conn:
+        mode = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        before = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if mode == 2 and before:
+            # executescript steps the pragma to completion; execute() frees a single page.
+            pages = int(max_pages or settings.archive_vacuum_pages)
+            conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({pages})")
+        after = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        conn.commit()
+    return {"auto_vacuum": mode, "freelist_pages": after, "released_pages": before - after}
+
+
+def vacuum(engine: sqlalchemy.Engine | None = None) -> None:
+    """Switch an existing SQLite file to incremental auto_vacuum and compact it (full VACUUM)."""
+    engine = engine or _default_engine
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+
+
+async def archive_expired() -> dict:
+    """Archive batches until no expired free scan is left, then reclaim the freed pages."""
+    total = {"scans": 0, "bytes_freed": 0, "archive_bytes": 0}
+    while True:
+        batch = await archive_batch()
+        total = {k: total[k] + batch[k] for k in total}
+        if batch["scans"] < settings.archive_batch:
+            break
+    space = await asyncio.to_thread(reclaim_space)
+    while space["released_pages"] and space["freelist_pages"]:
+        space = await asyncio.to_thread(reclaim_space)
+    return total
+
+
+if __name__ == "__main__":
+    from app.migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Archive expired free reports")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="afterwards, switch SQLite to incremental auto_vacuum and compact the file")
+    args = parser.parse_args()
+
+    async def _main():
+        run_migrations()
+        await database.connect()
+        try:
+            total = await archive_expired()
+        finally:
+            await database.disconnect()
+        print(f"[archive] archived {total['scans']} scans: {total['bytes_freed'] / 1e6:.1f} MB out of "
+              f"the table, {total['archive_bytes'] / 1e6:.1f} MB of archives in {settings.archive_dir}/")
+        if args.vacuum:
+            vacuum()
+            print("[archive] VACUUM done (auto_vacuum=INCREMENTAL)")
+
+    asyncio.run(_main())
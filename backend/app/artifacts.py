@@ -0,0 +1,114 @@
+"""
+Artifacts - persisted index from scan id to its Strix run directory and files.
+
+Both runners call record_run_start() as soon as the run directory is known and
+record_run_finish() once artifacts are flushed, which walks the directory once (in a worker
+thread, off the event loop) and stores every file's relative path, kind and size in
+scan_artifacts. reprocess_scan.py looks the run up with get_run_dir() instead of listing and
+stat-ing every directory under strix_runs/.
+
+All writes are best-effort: a failed index write is logged and never fails the scan.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from pathlib import Path
+
+from app.database import database, scan_artifacts, scan_runs
+
+REPORT_NAME = "penetration_test_report.md"
+
+
+def artifact_kind(rel_path: str) -> str:
+    """Classify a run-dir file by its path (relative, '/'-separated)."""
+    name = rel_path.rsplit("/", 1)[-1]
+    if name == REPORT_NAME:
+        return "report"
+    if rel_path.startswith("vulnerabilities/") or name.startswith("vulnerabilities."):
+        return "vulnerability"
+    if name == "run.json":
+        return "run"
+    if name.endswith(".log"):
+        return "log"
+    return "other"
+
+
+def index_run_dir(run_dir: Path) -> list[dict]:
+    """Every file under ``run_dir`` as {path, kind, size_bytes}, in one os.scandir walk."""
+    entries = []
+    stack = [(str(run_dir), "")]
+    while stack:
+        abs_dir, rel_dir = stack.pop()
+        try:
+            it = os.scandir(abs_dir)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                rel = f"{rel_dir}{entry.name}"
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, rel + "/"))
+                    elif entry.is_file(follow_symlinks=False):
+                        entries.append({
+                            "path": rel,
+                            "kind": artifact_kind(rel),
+                            "size_bytes": entry.stat(follow_symlinks=False).st_size,
+                        })
+                except OSError:
+                    continue
+    entries.sort(key=lambda e: e["path"])
+    return entries
+
+
+async def _upsert_run(scan_id: str, values: dict, run_name: str | None = None) -> None:
+    existing = await database.fetch_one(
+        scan_runs.select().with_only_columns(scan_runs.c.scan_id).where(scan_runs.c.scan_id == scan_id)
+    )
+    if existing:
+        await database.execute(scan_runs.update().where(scan_runs.c.scan_id == scan_id).values(**values))
+    else:
+        if run_name and "run_name" not in values:
+            values = {**values, "run_name": run_name}
+        await database.execute(scan_runs.insert().values(scan_id=scan_id, **values))
+
+
+async def record_run_start(scan_id: str, run_dir: Path, run_name: str | None = None) -> None:
+    if not scan_id:
+        return
+    values = {"run_name": run_name or run_dir.name, "run_dir": str(run_dir), "started_at": datetime.now()}
+    try:
+        await _upsert_run(scan_id, {**values, "finished_at": None})
+    except Exception as e:
+        print(f"[artifacts] run start record failed for {scan_id}: {e}", flush=True)
+
+
+async def record_run_finish(scan_id: str, run_dir: Path) -> None:
+    """Index the finished run directory's files and sizes (replacing any earlier index)."""
+    if not scan_id:
+        return
+    files = await asyncio.to_thread(index_run_dir, run_dir)
+    total = sum(f["size_bytes"] for f in files)
+    try:
+        async with database.transaction():
+            await database.execute(scan_artifacts.delete().where(scan_artifacts.c.scan_id == scan_id))
+            if files:
+                await database.execute_many(
+                    scan_artifacts.insert(), [{"scan_id": scan_id, **f} for f in files]
+                )
+            await _upsert_run(scan_id, {
+                "run_dir": str(run_dir), "finished_at": datetime.now(),
+                "file_count": len(files), "total_bytes": total,
+            }, run_name=run_dir.name)
+        print(f"[artifacts] {scan_id}: indexed {len(files)} files ({total} bytes) in {run_dir}", flush=True)
+    except Exception as e:
+        print(f"[artifacts] run finish record failed for {scan_id}: {e}", flush=True)
+
+
+async def get_run_dir(scan_id: str) -> Path | None:
+    row = await database.fetch_one(
+        scan_runs.select().with_only_columns(scan_runs.c.run_dir).where(scan_runs.c.scan_id == scan_id)
+    )
+    return Path(row["run_dir"]) if row else None
+
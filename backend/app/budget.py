@@ -0,0 +1,290 @@
+"""
+Budget - push-based per-scan cost enforcement for in-process Strix scans.
+
+The cost cap used to be checked every 5 s from tracer.get_total_llm_stats() in
+_update_progress, so a burst of parallel agents could run well past the tier limit before
+the wrap-up message went in. Now every completed LLM call is charged to the active scan's
+BudgetGovernor the moment LiteLLM (which Strix calls through) reports it:
+
+- soft limit (the tier cost limit): on_soft fires once — the runner tells the agent to
+  wrap up and squeezes its remaining iterations, exactly as the old polling check did.
+- hard limit (soft x settings.budget_hard_multiplier): on_hard fires once — the runner
+  cancels the scan and finalizes whatever it has.
+
+The 5 s progress loop still feeds the tracer's total into observe_total() as a backstop
+(e.g. if LiteLLM can't price a model), and summary() records where the scan actually
+landed relative to its budget.
+
+Callbacks may arrive on Strix's agent threads, so triggers are handed to the scan's event
+loop with call_soon_threadsafe.
+
+AdaptiveController works below those limits: from the progress loop it retunes the agent cap
+and the root agent's iteration budget so the scan lands near its target cost and duration,
+instead of running flat out until the wrap-up squeeze.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Callable
+
+
+class BudgetGovernor:
+    """Soft/hard cost limits for one scan. A limit of 0 disables enforcement (spend is still tracked)."""
+
+    def __init__(
+        self,
+        scan_id: str,
+        limit: float,
+        hard_multiplier: float = 1.25,
+        on_soft: Callable[[], None] | None = None,
+        on_hard: Callable[[], None] | None = None,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ):
+        self.scan_id = scan_id
+        self.limit = limit
+        self.hard_limit = limit * max(hard_multiplier, 1.0) if limit > 0 else 0.0
+        self.on_soft = on_soft
+        self.on_hard = on_hard
+        self.spent = 0.0
+        self.calls = 0
+        self.soft_at: float | None = None  # spend when each limit tripped
+        self.hard_at: float | None = None
+        self._started = time.monotonic()
+        self._loop = loop
+        self._lock = threading.Lock()
+
+    @property
+    def hard_tripped(self) -> bool:
+        return self.hard_at is not None
+
+    def charge(self, cost: float) -> None:
+        """Add the cost of one LLM call (pushed from the usage hook)."""
+        with self._lock:
+            self.calls += 1
+            self.spent += max(cost or 0.0, 0.0)
+            fire = self._check()
+        self._fire(fire)
+
+    def observe_total(self, total: float) -> None:
+        """Reconcile with an externally measured running total (the tracer's), never decreasing."""
+        with self._lock:
+            self.spent = max(self.spent, total or 0.0)
+            fire = self._check()
+        self._fire(fire)
+
+    def _check(self) -> list[Callable[[], None]]:
+        fire = []
+        if self.limit <= 0:
+            return fire
+        if self.soft_at is None and self.spent >= self.limit:
+            self.soft_at = self.spent
+            print(f"[budget] {self.scan_id}: soft limit ${self.limit:.2f} reached at "
+                  f"${self.spent:.2f} ({self.calls} calls)", flush=True)
+            if self.on_soft:
+                fire.append(self.on_soft)
+        if self.hard_at is None and self.spent >= self.hard_limit:
+            self.hard_at = self.spent
+            print(f"[budget] {self.scan_id}: hard limit ${self.hard_limit:.2f} reached at "
+                  f"${self.spent:.2f}, stopping scan", flush=True)
+            if self.on_hard:
+                fire.append(self.on_hard)
+        return fire
+
+    def _fire(self, callbacks: list[Callable[[], None]]) -> None:
+        for cb in callbacks:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(cb)
+                continue
+            try:
+                cb()
+            except Exception as e:
+                print(f"[budget] {self.scan_id}: limit callback failed: {e}", flush=True)
+
+    def summary(self) -> dict:
+        """Where the scan landed relative to its budget (stored in progress_json["budget"])."""
+        overshoot = max(self.spent - self.limit, 0.0) if self.limit > 0 else 0.0
+        return {
+            "limit": round(self.limit, 4),
+            "hard_limit": round(self.hard_limit, 4),
+            "spent": round(self.spent, 4),
+            "overshoot": round(overshoot, 4),
+            "overshoot_pct": round(100 * overshoot / self.limit, 1) if self.limit > 0 else 0.0,
+            "soft_at": round(self.soft_at, 4) if self.soft_at is not None else None,
+            "hard_at": round(self.hard_at, 4) if self.hard_at is not None else None,
+            "llm_calls": self.calls,
+            "elapsed_s": round(time.monotonic() - self._started, 1),
+        }
+
+
+# The in-process runner handles one scan per worker process at a time, so a single active
+# governor is enough; Strix's agent threads don't inherit contextvars anyway.
+_active: BudgetGovernor | None = None
+_hook_installed = False
+
+
+def activate_governor(governor: BudgetGovernor) -> None:
+    global _active
+    _active = governor
+
+
+def deactivate_governor(governor: BudgetGovernor) -> None:
+    global _active
+    if _active is governor:
+        _active = None
+
+
+def charge_active(cost: float) -> None:
+    governor = _active
+    if governor is not None:
+        governor.charge(cost)
+
+
+def _call_cost(kwargs: dict, response) -> float:
+    """Cost of one LiteLLM call: the callback's response_cost, else priced from the response."""
+    cost = kwargs.get("response_cost")
+    if cost is None:
+        try:
+            import litellm
+            cost = litellm.completion_cost(completion_response=response)
+        except Exception:
+            cost = 0.0
+    return float(cost or 0.0)
+
+
+def install_usage_hook() -> bool:
+    """Register the LiteLLM success callback that charges the active governor. Idempotent."""
+    global _hook_installed
+    if _hook_installed:
+        return True
+    try:
+        import litellm
+        from litellm.integrations.custom_logger import CustomLogger
+    except ImportError:
+        print("[budget] litellm not importable — cost limits fall back to progress polling", flush=True)
+        return False
+
+    class _BudgetHook(CustomLogger):
+        def log_success_event(self, kwargs, response_obj, start_time, end_time):
+            charge_active(_call_cost(kwargs, response_obj))
+
+        async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+            charge_active(_call_cost(kwargs, response_obj))
+
+    litellm.callbacks = [*(litellm.callbacks or []), _BudgetHook()]
+    _hook_installed = True
+    return True
+
+
+class AdaptiveController:
+    """
+    Steers a running scan toward its target cost and duration.
+
+    step() is fed the scan's spend, elapsed time, finding count and root-agent iteration from
+    the progress loop. It keeps an exponentially smoothed burn rate ($/s), projects the final
+    cost at the target duration, and returns an adjustment when the plan drifts:
+
+    - projected cost well over target -> shrink the agent cap in proportion;
+    - past half the target time with no new findings for a quarter of it -> halve the cap;
+    - well under budget and still finding issues -> grow the cap back toward the tier's;
+    - always: cap the root agent's iterations at what the remaining money allows at the
+      current per-iteration cost (never above the tier's, never below a wrap-up margin).
+
+    Time only steers the agent cap: the iteration budget is never cut for being slow, since
+    the tier's wall clock (app/scan_control.py) is what ends a scan that runs long.
+
+    Adjustments are rate-limited by min_interval and recorded in .adjustments.
+    """
+
+    WRAP_UP_ITERATIONS = 8
+
+    def __init__(
+        self,
+        scan_id: str,
+        target_cost: float,
+        target_seconds: float,
+        max_agents: int,
+        max_iterations: int,
+        min_agents: int = 2,
+        min_interval: float = 30.0,
+        smoothing: float = 0.3,
+    ):
+        self.scan_id = scan_id
+        self.target_cost = target_cost
+        self.target_seconds = target_seconds
+        self.max_agents = max_agents
+        self.max_iterations = max_iterations
+        self.min_agents = min(min_agents, max_agents)
+        self.min_interval = min_interval
+        self.smoothing = smoothing
+        self.agents = max_agents  # current cap
+        self.adjustments: list[dict] = []
+        self._burn: float | None = None
+        self._last: tuple[float, float] | None = None  # (elapsed, spent) at the previous step
+        self._last_adjust = float("-inf")
+        self._findings = 0
+        self._last_finding_at = 0.0
+
+    def step(self, elapsed: float, spent: float, findings: int, iteration: int, max_iterations: int) -> dict | None:
+        """Observe the scan; return {"max_agents"?, "max_iterations"?} to apply, or None."""
+        if self._last is not None and elapsed > self._last[0]:
+            rate = max(spent - self._last[1], 0.0) / (elapsed - self._last[0])
+            self._burn = rate if self._burn is None else self._burn + self.smoothing * (rate - self._burn)
+        self._last = (elapsed, spent)
+        if findings > self._findings:
+            self._findings, self._last_finding_at = findings, elapsed
+        if self._burn is None or elapsed - self._last_adjust < self.min_interval:
+            return None
+
+        remaining_time = max(self.target_seconds - elapsed, 0.0)
+        remaining_cost = max(self.target_cost - spent, 0.0)
+        projected = spent + self._burn * remaining_time
+        cost_ratio = projected / self.target_cost if self.target_cost > 0 else 0.0
+        stale = elapsed - self._last_finding_at
+        reasons = []
+
+        agents, why = self.agents, ""
+        if cost_ratio > 1.1:
+            agents = max(self.min_agents, int(self.agents / cost_ratio))
+            why = f"projected ${projected:.2f} vs target ${self.target_cost:.2f}"
+        elif self.target_seconds and elapsed > 0.5 * self.target_seconds and stale > 0.25 * self.target_seconds:
+            agents = max(self.min_agents, self.agents // 2)
+            why = f"no new findings for {stale / 60:.0f}m"
+        elif cost_ratio < 0.6 and elapsed < self.target_seconds and stale < 0.25 * self.target_seconds:
+            agents = min(self.max_agents, self.agents + max(1, self.max_agents // 4))
+            why = "under budget and still finding issues"
+        if agents != self.agents:
+            reasons.append(why)
+
+        iterations = max_iterations
+        if iteration > 0 and elapsed > 0:
+            if self.target_cost > 0 and spent > 0:
+                fits = remaining_cost / (spent / iteration)
+                iterations = min(self.max_iterations, iteration + max(int(fits), self.WRAP_UP_ITERATIONS))
+        if abs(iterations - max_iterations) < max(3, (max_iterations - iteration) // 10):
+            iterations = max_iterations  # not worth an adjustment
+        elif iterations != max_iterations:
+            reasons.append(f"{iterations - iteration} iterations fit the remaining budget")
+
+        changes = {}
+        if agents != self.agents:
+            changes["max_agents"] = agents
+        if iterations != max_iterations:
+            changes["max_iterations"] = iterations
+        if not changes:
+            return None
+
+        self.agents = agents
+        self._last_adjust = elapsed
+        self.adjustments.append({
+            "t": round(elapsed, 1),
+            "spent": round(spent, 4),
+            "burn_per_min": round(self._burn * 60, 4),
+            "projected_cost": round(projected, 4),
+            "findings": findings,
+            "iteration": iteration,
+            **changes,
+            "reason": "; ".join(reasons),
+        })
+        print(f"[adaptive] {self.scan_id}: {changes} ({'; '.join(reasons)})", flush=True)
+        return changes
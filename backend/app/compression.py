@@ -0,0 +1,160 @@
+"""
+Compression - transparent zlib encoding of the results_json / progress_json blobs.
+
+A finished scan's results_json carries every PoC script, the reproduction steps and the
+whole structured report as plain JSON text — hundreds of KB per scan — and progress_json
+its recent-activity log. JSONText (app/database.py) runs every write through encode() and
+every read through decode(), so callers keep reading and writing JSON strings.
+
+Stored format (SQLite, where the columns are TEXT):
+
+    str                      plain JSON text: rows written before this, or below the threshold
+    bytes  b"\\x01" + zlib     compressed JSON (stored as a BLOB; the first byte is the format)
+
+Payloads under settings.blob_compress_min_bytes — or that don't shrink — stay plain text.
+On Postgres the columns are JSONB and TOAST already compresses them, so nothing here
+applies there.
+
+Rows written before compression existed are rewritten by reencode_batch(), which the worker
+runs a batch at a time while idle (or `python -m app.compression` runs to completion).
+compression_stats() reports this process's compression ratio and decode cost; the admin
+dashboard's JSON includes it.
+"""
+
+import asyncio
+import time
+import zlib
+
+import sqlalchemy
+
+from app.config import settings
+
+FORMAT_ZLIB = b"\x01"
+
+# Finished scans only: a running scan's progress_json is rewritten every few seconds anyway.
+_SETTLED_STATUSES = ("completed", "failed")
+
+_stats = {
+    "encoded": 0, "raw_bytes": 0, "stored_bytes": 0,
+    "decoded": 0, "decoded_bytes": 0, "decode_seconds": 0.0,
+}
+
+
+def encode(text: str) -> str | bytes:
+    """The stored form of a JSON string: zlib-compressed bytes, or the text itself."""
+    raw = text.encode("utf-8")
+    if not settings.blob_compression or len(raw) < settings.blob_compress_min_bytes:
+        return text
+    packed = FORMAT_ZLIB + zlib.compress(raw, settings.blob_compress_level)
+    if len(packed) >= len(raw):
+        return text
+    _stats["encoded"] += 1
+    _stats["raw_bytes"] += len(raw)
+    _stats["stored_bytes"] += len(packed)
+    return packed
+
+
+def decode(value: str | bytes) -> str:
+    """The JSON string behind a stored value (either format)."""
+    if isinstance(value, str):
+        return value
+    start = time.perf_counter()
+    if value[:1] != FORMAT_ZLIB:
+        raise ValueError(f"unknown payload format {value[:1]!r}")
+    text = zlib.decompress(value[1:]).decode("utf-8")
+    _stats["decoded"] += 1
+    _stats["decoded_bytes"] += len(text)
+    _stats["decode_seconds"] += time.perf_counter() - start
+    return text
+
+
+def compression_stats() -> dict:
+    """Counters since this process started: compression ratio (raw / stored) and decode cost."""
+    s = _stats
+    return {
+        "encoded": s["encoded"],
+        "raw_bytes": s["raw_bytes"],
+        "stored_bytes": s["stored_bytes"],
+        "ratio": round(s["raw_bytes"] / s["stored_bytes"], 2) if s["stored_bytes"] else None,
+        "decoded": s["decoded"],
+        "decode_ms_avg": round(s["decode_seconds"] * 1000 / s["decoded"], 3) if s["decoded"] else None,
+        "decode_mb_per_s": round(s["decoded_bytes"] / s["decode_seconds"] / 1e6, 1) if s["decode_seconds"] else None,
+    }
+
+
+def _plain_large(column):
+    return (sqlalchemy.func.typeof(column) == "text") & (
+        sqlalchemy.func.length(column) >= settings.blob_compress_min_bytes
+    )
+
+
+async def reencode_batch(db=None, limit: int | None = None) -> dict:
+    """Compress up to `limit` finished scans whose blobs are still stored as plain text.
+
+    Each column is rewritten only if it still holds the text that was read, so a concurrent
+    write (reprocess_scan.py, an admin cancel) is never overwritten with an older value.
+    Returns {"scans": rows examined, "columns": columns rewritten}."""
+    from app.database import database, scans
+
+    db = db or database
+    if db.url.scheme.startswith("postgres") or not settings.blob_compression:
+        return {"scans": 0, "columns": 0}
+
+    columns = (scans.c.results_json, scans.c.progress_json)
+    rows = await db.fetch_all(
+        sqlalchemy.select(
+            scans.c.id, *columns,
+            *(sqlalchemy.func.typeof(c).label(f"{c.name}_type") for c in columns),
+        )
+        .where(scans.c.status.in_(_SETTLED_STATUSES))
+        .where(sqlalchemy.or_(*(_plain_large(c) for c in columns)))
+        .order_by(scans.c.created_at)
+        .limit(limit or settings.blob_reencode_batch)
+    )
+    rewritten = 0
+    for row in rows:
+        for column in columns:
+            old = row[column.name]
+            if row[f"{column.name}_type"] != "text":
+                continue
+            packed = encode(old)
+            if isinstance(packed, str):  # under the threshold, or doesn't shrink
+                continue
+            updated = await db.fetch_one(
+                scans.update()
+                .where(scans.c.id == row["id"])
+                .where(sqlalchemy.type_coerce(column, sqlalchemy.Text) == old)
+                .values({column.name: sqlalchemy.literal(packed, sqlalchemy.LargeBinary)})
+                .returning(scans.c.id)
+            )
+            rewritten += updated is not None
+    return {"scans": len(rows), "columns": rewritten}
+
+
+async def reencode_all(db=None) -> dict:
+    """Run reencode_batch() until no plain-text blobs remain (or a batch compresses nothing)."""
+    total = {"scans": 0, "columns": 0}
+    while True:
+        batch = await reencode_batch(db)
+        total = {k: total[k] + batch[k] for k in total}
+        if not batch["columns"]:
+            return total
+        await asyncio.sleep(0)
+
+
+if __name__ == "__main__":
+    from app.database import database
+    from app.migrations import run_migrations
+
+    async def _main():
+        run_migrations()
+        await database.connect()
+        try:
+            start = time.perf_counter()
+            total = await reencode_all()
+        finally:
+            await database.disconnect()
+        print(f"[compression] re-encoded {total['columns']} blobs across {total['scans']} scans "
+              f"in {time.perf_counter() - start:.1f}s — {compression_stats()}")
+
+    asyncio.run(_main())
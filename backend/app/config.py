@@ -3,6 +3,43 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./scanner.db"
+    # SQLite profile (app/sqlite_backend.py; ignored for other databases): WAL journal,
+    # synchronous=NORMAL, one writer connection per process plus a pool of read-only ones.
+    sqlite_tuning: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_bytes: int = 256 * 1024 * 1024
+    sqlite_read_connections: int = 4
+    # Postgres (asyncpg) pool per process — the API serves concurrent requests, the worker needs
+    # a few (scan loop, postprocess loop, progress writes). Keep max_size x processes under
+    # the server's max_connections.
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 10
+    db_command_timeout: float = 30.0
+    # results_json / progress_json on SQLite: zlib-compress payloads at least this big
+    # (app/compression.py); the worker re-encodes older plain-text rows this many scans per tick.
+    blob_compression: bool = True
+    blob_compress_min_bytes: int = 1024
+    blob_compress_level: int = 6
+    blob_reencode_batch: int = 50
+    # Expired free reports (app/archive.py): payloads move to gzip files under archive_dir, this
+    # many scans per worker tick (keep archive_dir on persistent storage); SQLite then hands back
+    # up to archive_vacuum_pages free pages.
+    archive_enabled: bool = True
+    archive_dir: str = "archive"
+    archive_batch: int = 100
+    archive_vacuum_pages: int = 2000
+    # Free-scan submissions (app/rate_limit.py): per-process token bucket per email — this many
+    # at once, then one more per refill interval — and how long an email known to have used its
+    # monthly quota is turned away without asking the database.
+    rate_limit_burst: int = 5
+    rate_limit_refill_seconds: float = 60.0
+    rate_limit_exhausted_ttl_seconds: float = 600.0
+    # Target hostname lookups (app/dns_cache.py): per-lookup timeout, and how long answers are
+    # reused — the record TTL clamped to [min, max]; "no such host" for the negative TTL.
+    dns_timeout: float = 3.0
+    dns_min_ttl_seconds: float = 30.0
+    dns_max_ttl_seconds: float = 300.0
+    dns_negative_ttl_seconds: float = 60.0
     resend_api_key: str = ""
     email_from: str = "Nullscan <noreply@nullscan.io>"
     stripe_secret_key: str = ""
@@ -15,6 +52,24 @@ class Settings(BaseSettings):
     # Model for the report-extraction step (OpenAI SDK, separate from the scan LLM). Kept on
     # gpt-5.2 by default; set REPORT_LLM=gpt-5.6-luna once that id is confirmed to cut cost.
     report_llm: str = "gpt-5.2"
+    # Per-call timeout (seconds) for one report-extraction request; retried on expiry.
+    report_llm_timeout: float = 180.0
+    # On-disk cache of successful extractions (see app/report_cache.py), LRU-evicted past the cap.
+    report_cache_dir: str = "report_cache"
+    report_cache_max_mb: float = 256.0
+    # Reports longer than this (chars) are extracted map-reduce style, this many chunks at once.
+    report_chunk_chars: int = 120_000
+    report_chunk_concurrency: int = 4
+    # USD per 1M tokens for report_llm — only used for cost estimates (reprocess_scan.py --bulk).
+    report_llm_input_cost_per_mtok: float = 1.75
+    report_llm_output_cost_per_mtok: float = 14.0
+    # Scans awaiting report extraction (status "postprocessing") finalized at once — see
+    # app/postprocess.py. Independent of the scan loop, so slow LLM calls never hold a scan slot.
+    postprocess_concurrency: int = 2
+    # A scan whose finalize step raises (corrupt payload, database error) is retried after
+    # postprocess_retry_seconds, doubling each time, and marked failed after this many attempts.
+    postprocess_max_attempts: int = 5
+    postprocess_retry_seconds: float = 30.0
     # Route scans through the headless-CLI adapter (strix-agent >= 1.0). Default off until
     # validated against a live 1.0.x + Docker host. See app/strix_adapter.py.
     strix_use_cli: bool = False
@@ -53,6 +108,31 @@ class Settings(BaseSettings):
     tier_quick_cost_limit: float = 4.0
     tier_pro_cost_limit: float = 150.0
     tier_deep_cost_limit: float = 600.0
+    # Hard stop at this multiple of the tier cost limit (the limit itself triggers the graceful
+    # wrap-up). Enforced per LLM call — see app/budget.py.
+    budget_hard_multiplier: float = 1.25
+
+    # Retune agent cap / iterations mid-scan (AdaptiveController in app/budget.py), steering
+    # toward the tier cost limit and this fraction of the tier wall clock below. Off = the tier's
+    # fixed values for the whole scan; default off until its logged adjustments are checked
+    # against past scans.
+    adaptive_budget_enabled: bool = False
+    adaptive_target_fraction: float = 0.75
+    # Per-tier wall-clock budget (minutes). Past it — or after scan_stall_minutes with no new
+    # tool executions or token usage — the agent is told to wrap up, then cancelled
+    # scan_stop_grace_seconds later (see app/scan_control.py). The CLI adapter kills at it.
+    tier_quick_wall_clock_minutes: float = 20.0
+    tier_pro_wall_clock_minutes: float = 90.0
+    tier_deep_wall_clock_minutes: float = 240.0
+    scan_stall_minutes: float = 10.0
+    scan_stop_grace_seconds: float = 120.0
+    # How often a running scan checks whether an admin asked to cancel it.
+    scan_cancel_poll_seconds: float = 1.0
+    # Reachability probe before a sandbox is allocated (app/preflight.py): per-stage timeout,
+    # and how long a flaky target (timeout, 5xx from the edge) is deferred before one more try.
+    preflight_enabled: bool = True
+    preflight_timeout: float = 10.0
+    preflight_defer_minutes: float = 15.0
 
     # Per-tier agent cap and wait timeout
     tier_quick_max_agents: int = 15
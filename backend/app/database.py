@@ -1,10 +1,71 @@
+import json
+
 import databases
 import sqlalchemy
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app import compression
 from app.config import settings
+from app.sqlite_backend import TunedDatabase, is_tunable, tune_sqlite_connection
+
+IS_POSTGRES = settings.database_url.startswith(("postgres://", "postgresql"))
+
+
+def database_options(database_url: str) -> dict:
+    """Connection-pool options for `databases` (asyncpg pool sizes; SQLite needs none)."""
+    if database_url.startswith(("postgres://", "postgresql")):
+        return {"min_size": settings.db_pool_min_size, "max_size": settings.db_pool_max_size,
+                "command_timeout": settings.db_command_timeout}
+    return {}
+
+
+def sync_url(database_url: str) -> str:
+    """The URL for the sync (DDL/migrations) engine: SQLAlchemy wants postgresql://, which
+    runs on psycopg2, where `databases` also accepts Heroku/Railway-style postgres:// and
+    postgresql+asyncpg://."""
+    scheme, sep, rest = database_url.partition("://")
+    if scheme in ("postgres", "postgresql+asyncpg"):
+        return f"postgresql{sep}{rest}"
+    return database_url
+
 
-database = databases.Database(settings.database_url)
+# File-backed SQLite gets the WAL / single-writer profile (app/sqlite_backend.py).
+database = (TunedDatabase if is_tunable(settings.database_url) else databases.Database)(
+    settings.database_url, **database_options(settings.database_url)
+)
 metadata = sqlalchemy.MetaData()
 
+
+class JSONText(sqlalchemy.types.TypeDecorator):
+    """A JSON document the app reads and writes as a string (json.dumps / json.loads).
+
+    Stored as JSONB on Postgres, where it is parsed on the way in and re-serialized on the way
+    out, and on SQLite as TEXT — zlib-compressed past a size threshold (app/compression.py) —
+    so callers see the same string API on both."""
+
+    impl = sqlalchemy.Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB(none_as_null=True))
+        return dialect.type_descriptor(sqlalchemy.Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        if dialect.name == "postgresql":
+            return json.loads(value) if isinstance(value, str) else value
+        return compression.encode(value) if isinstance(value, str) else value
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, bytes):
+            return compression.decode(value)
+        return json.dumps(value)
+
+
 scans = sqlalchemy.Table(
     "scans",
     metadata,
@@ -13,13 +74,13 @@ scans = sqlalchemy.Table(
     sqlalchemy.Column("target_url", sqlalchemy.String(2048), nullable=False),
     sqlalchemy.Column("status", sqlalchemy.String(20), default="pending"),
     sqlalchemy.Column("scan_type", sqlalchemy.String(20), default="quick"),
-    sqlalchemy.Column("results_json", sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column("results_json", JSONText, nullable=True),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
     sqlalchemy.Column("completed_at", sqlalchemy.DateTime, nullable=True),
     sqlalchemy.Column("paid_tier", sqlalchemy.String(20), nullable=True),
     sqlalchemy.Column("stripe_payment_id", sqlalchemy.String(255), nullable=True),
     sqlalchemy.Column("retry_count", sqlalchemy.Integer, default=0),
-    sqlalchemy.Column("progress_json", sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column("progress_json", JSONText, nullable=True),
     sqlalchemy.Column("parent_scan_id", sqlalchemy.String(36), nullable=True),
     # First-party attribution — where this scan's visitor came from
     sqlalchemy.Column("utm_source", sqlalchemy.String(255), nullable=True),
@@ -27,6 +88,50 @@ scans = sqlalchemy.Table(
     sqlalchemy.Column("utm_campaign", sqlalchemy.String(255), nullable=True),
     sqlalchemy.Column("referrer", sqlalchemy.String(1024), nullable=True),
     sqlalchemy.Column("landing_page", sqlalchemy.String(1024), nullable=True),
+    # Set when preflight defers a flaky target: the worker leaves it pending until then. Also
+    # the backoff of a postprocessing scan whose finalize step failed (app/postprocess.py).
+    sqlalchemy.Column("not_before", sqlalchemy.DateTime, nullable=True),
+    # Failed finalize attempts of a postprocessing scan; it's marked failed past the limit.
+    sqlalchemy.Column("postprocess_attempts", sqlalchemy.Integer, nullable=True),
+    # Set when an expired free report's payloads were moved to cold storage (app/archive.py).
+    sqlalchemy.Column("archived_at", sqlalchemy.DateTime, nullable=True),
+    # Hot access paths — created by app/migrations.py (version 2), checked by tests/test_migrations.py.
+    # Worker/postprocess polls, drip candidates and the dashboard's status totals.
+    sqlalchemy.Index("ix_scans_status_created_at", "status", "created_at"),
+    # "Best completed child of this scan" (results, PDF, admin report) and child-status.
+    sqlalchemy.Index("ix_scans_parent_status_completed", "parent_scan_id", "status", "completed_at"),
+    # Dashboard's most-recent page.
+    sqlalchemy.Index("ix_scans_created_at", "created_at"),
+    # Lookups by email; also covers the drip's "emails that ever paid" without touching rows.
+    sqlalchemy.Index("ix_scans_email_paid_tier", "email", "paid_tier"),
+    # The job queue (app/jobs.py): only pending rows, so it stays tiny however many scans
+    # exist. Queries must spell the predicate as a literal for either planner to use it.
+    sqlalchemy.Index(
+        "ix_scans_pending", "created_at",
+        postgresql_where=sqlalchemy.text("status = 'pending'"),
+        sqlite_where=sqlalchemy.text("status = 'pending'"),
+    ),
+    # The expiry job (app/archive.py): free top-level scans still holding their payloads.
+    # parent_scan_id (always NULL in here) leads only so SQLite's planner, which ranks indexes
+    # by their equality prefix, prefers this to ix_scans_parent_status_completed.
+    sqlalchemy.Index(
+        "ix_scans_archivable", "parent_scan_id", "created_at",
+        postgresql_where=sqlalchemy.text("archived_at IS NULL AND paid_tier IS NULL AND parent_scan_id IS NULL"),
+        sqlite_where=sqlalchemy.text("archived_at IS NULL AND paid_tier IS NULL AND parent_scan_id IS NULL"),
+    ),
+)
+
+# Column projections for reads that don't need the JSON blobs. results_json and progress_json
+# run to hundreds of KB on a finished scan; select one of these with
+# scans.select().with_only_columns(*COLUMNS) so hot endpoints never pull them through the driver.
+# What GET /scans/{id} returns (ScanResponse).
+SCAN_SUMMARY_COLUMNS = (
+    scans.c.id, scans.c.email, scans.c.target_url, scans.c.status, scans.c.scan_type,
+    scans.c.created_at, scans.c.completed_at, scans.c.paid_tier, scans.c.parent_scan_id,
+)
+# What checkout and app.payments.apply_paid_tier need.
+SCAN_PAYMENT_COLUMNS = (
+    scans.c.id, scans.c.email, scans.c.target_url, scans.c.paid_tier, scans.c.stripe_payment_id,
 )
 
 rate_limits = sqlalchemy.Table(
@@ -77,26 +182,55 @@ drip_sends = sqlalchemy.Table(
     sqlalchemy.Column("sent_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
 )
 
+# Where each scan's Strix run lives on disk, recorded when the run directory is created and
+# again when the scan finishes (see app/artifacts.py) — so reprocessing never has to list
+# and stat strix_runs/ to find it.
+scan_runs = sqlalchemy.Table(
+    "scan_runs",
+    metadata,
+    sqlalchemy.Column("scan_id", sqlalchemy.String(36), primary_key=True),
+    sqlalchemy.Column("run_name", sqlalchemy.String(255), nullable=True),
+    sqlalchemy.Column("run_dir", sqlalchemy.String(1024), nullable=False),
+    sqlalchemy.Column("started_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
+    sqlalchemy.Column("finished_at", sqlalchemy.DateTime, nullable=True),
+    sqlalchemy.Column("file_count", sqlalchemy.Integer, default=0),
+    sqlalchemy.Column("total_bytes", sqlalchemy.BigInteger, default=0),
+)
+
+# One row per file in a finished run directory (path relative to scan_runs.run_dir).
+scan_artifacts = sqlalchemy.Table(
+    "scan_artifacts",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True, autoincrement=True),
+    sqlalchemy.Column("scan_id", sqlalchemy.String(36), index=True, nullable=False),
+    sqlalchemy.Column("path", sqlalchemy.String(1024), nullable=False),
+    sqlalchemy.Column("kind", sqlalchemy.String(32), nullable=False),
+    sqlalchemy.Column("size_bytes", sqlalchemy.BigInteger, default=0),
+)
+
+# Per-tier projections of a completed scan's results, as GET /scans/{id}/results serves them
+# (app/result_views.py). Keyed by the scan the reader asked for; source_* record which row's
+# results they were rendered from, so a newer child scan leaves them stale.
+result_views = sqlalchemy.Table(
+    "result_views",
+    metadata,
+    sqlalchemy.Column("scan_id", sqlalchemy.String(36), primary_key=True),
+    sqlalchemy.Column("view", sqlalchemy.String(8), primary_key=True),  # "free" / "paid"
+    sqlalchemy.Column("version", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("source_scan_id", sqlalchemy.String(36), nullable=False, index=True),
+    sqlalchemy.Column("source_completed_at", sqlalchemy.DateTime, nullable=True),
+    sqlalchemy.Column("etag", sqlalchemy.String(64), nullable=False),
+    sqlalchemy.Column("body", JSONText, nullable=False),
+    sqlalchemy.Column("rendered_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
+)
+
 _connect_args = {}
 if settings.database_url.startswith("sqlite"):
     _connect_args["check_same_thread"] = False
 
-engine = sqlalchemy.create_engine(settings.database_url, connect_args=_connect_args)
-metadata.create_all(engine)
-
-# Migrate existing DB: add columns if missing (idempotent — skips ones already present)
-_COLUMN_MIGRATIONS = [
-    "ALTER TABLE scans ADD COLUMN parent_scan_id VARCHAR(36)",
-    "ALTER TABLE scans ADD COLUMN utm_source VARCHAR(255)",
-    "ALTER TABLE scans ADD COLUMN utm_medium VARCHAR(255)",
-    "ALTER TABLE scans ADD COLUMN utm_campaign VARCHAR(255)",
-    "ALTER TABLE scans ADD COLUMN referrer VARCHAR(1024)",
-    "ALTER TABLE scans ADD COLUMN landing_page VARCHAR(1024)",
-]
-with engine.connect() as conn:
-    for _stmt in _COLUMN_MIGRATIONS:
-        try:
-            conn.execute(sqlalchemy.text(_stmt))
-            conn.commit()
-        except Exception:
-            conn.rollback()  # Column already exists
+# Sync engine for DDL. The schema is created and upgraded by app/migrations.py, which the API
+# and the worker run at startup (or `python -m app.migrations`) — never at import.
+_engine_options = {"pool_pre_ping": True, "pool_size": 2, "max_overflow": 2} if IS_POSTGRES else {}
+engine = sqlalchemy.create_engine(sync_url(settings.database_url), connect_args=_connect_args, **_engine_options)
+if is_tunable(settings.database_url):
+    sqlalchemy.event.listen(engine, "connect", lambda dbapi_conn, _record: tune_sqlite_connection(dbapi_conn))
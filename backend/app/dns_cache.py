@@ -0,0 +1,155 @@
+"""
+DNS cache - async hostname resolution with a TTL cache, shared by the API and the worker.
+
+validate_target_url used to call the blocking socket.getaddrinfo inside the create_scan
+handler, so one slow resolver answer stalled every request on that API process; preflight
+resolved the same host again minutes later. resolve() is the one place both go through:
+
+- async and bounded: queries run on the event loop (dnspython's async resolver; A and AAAA
+  together) under a timeout. Names DNS doesn't know are retried with loop.getaddrinfo, so
+  /etc/hosts entries the scan tools would see still count; so is a host with no resolver
+  configuration;
+- cached: answers are kept for their record TTL (clamped to settings.dns_min_ttl_seconds ..
+  settings.dns_max_ttl_seconds; getaddrinfo has no TTLs, so its answers get the max), and
+  "no such host" for settings.dns_negative_ttl_seconds. Transient failures and timeouts are
+  not cached. Concurrent lookups of one host share a single query;
+- measured: resolver_stats() reports hits, misses, failures and lookup latency percentiles
+  (the admin dashboard's JSON includes it).
+
+Failures raise what getaddrinfo would — socket.gaierror (EAI_AGAIN for a temporary failure,
+EAI_NONAME otherwise) or asyncio.TimeoutError — so callers keep their error handling.
+"""
+
+import asyncio
+import ipaddress
+import socket
+import time
+from collections import OrderedDict, deque
+
+from app.config import settings
+
+try:
+    import dns.asyncresolver
+    import dns.exception
+    import dns.resolver
+except ImportError:  # dnspython ships with email-validator; without it, use the system resolver
+    dns = None
+
+_MAX_HOSTS = 4096
+
+# host -> (expires_at, addresses or None, (errno, message) when negative)
+_cache: OrderedDict[str, tuple[float, list[str] | None, tuple[int, str] | None]] = OrderedDict()
+_in_flight: dict[str, asyncio.Future] = {}
+_latencies: deque[float] = deque(maxlen=1000)
+_stats = {"lookups": 0, "hits": 0, "negative_hits": 0, "misses": 0, "failures": 0, "timeouts": 0}
+_resolver = None
+_clock = time.monotonic
+
+
+def is_private_address(address: str) -> bool:
+    """Loopback, private, link-local or reserved — never a scan target."""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    return ip.is_private or ip.is_loopback or ip.is_reserved or ip.is_link_local
+
+
+def _get_resolver():
+    global _resolver
+    if _resolver is None and dns is not None:
+        try:
+            _resolver = dns.asyncresolver.Resolver()
+        except dns.resolver.NoResolverConfiguration:
+            _resolver = False
+    return _resolver or None
+
+
+async def _system_lookup(host: str) -> tuple[list[str], float]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return sorted({info[4][0] for info in infos}), settings.dns_max_ttl_seconds
+
+
+async def _lookup(host: str) -> tuple[list[str], float]:
+    """(addresses, ttl seconds) for a hostname; raises socket.gaierror."""
+    resolver = _get_resolver()
+    if resolver is None:
+        return await _system_lookup(host)
+
+    async def query(rdtype: str):
+        try:
+            return await resolver.resolve(host, rdtype, search=True)
+        except dns.resolver.NoAnswer:
+            return None
+
+    try:
+        answers = [a for a in await asyncio.gather(query("A"), query("AAAA")) if a is not None]
+    except dns.resolver.NXDOMAIN:
+        answers = []
+    except (dns.resolver.NoNameservers, dns.exception.Timeout) as e:
+        raise socket.gaierror(socket.EAI_AGAIN, f"Temporary failure in name resolution ({type(e).__name__})")
+    if not answers:
+        # Not in DNS — but /etc/hosts (which the scan tools read, and dnspython doesn't) may
+        # still map it, e.g. to the container's own address. The system resolver decides.
+        return await _system_lookup(host)
+    addresses = sorted({rr.address for answer in answers for rr in answer})
+    return addresses, min(answer.rrset.ttl for answer in answers)
+
+
+def _store(host: str, ttl: float, addresses: list[str] | None, error: tuple[int, str] | None) -> None:
+    _cache[host] = (_clock() + ttl, addresses, error)
+    _cache.move_to_end(host)
+    while len(_cache) > _MAX_HOSTS:
+        _cache.popitem(last=False)
+
+
+async def _resolve_uncached(host: str, timeout: float) -> list[str]:
+    start = time.perf_counter()
+    try:
+        addresses, ttl = await asyncio.wait_for(_lookup(host), timeout)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        raise
+    except socket.gaierror as e:
+        _stats["failures"] += 1
+        if e.errno != socket.EAI_AGAIN:
+            _store(host, settings.dns_negative_ttl_seconds, None, (e.errno, e.strerror or str(e)))
+        raise
+    finally:
+        _latencies.append(time.perf_counter() - start)
+    ttl = min(max(ttl, settings.dns_min_ttl_seconds), settings.dns_max_ttl_seconds)
+    _store(host, ttl, addresses, None)
+    return addresses
+
+
+async def resolve(host: str, timeout: float | None = None) -> list[str]:
+    """The host's addresses (sorted), from the cache when fresh. IP literals resolve to themselves."""
+    host = host.lower().rstrip(".")
+    try:
+        return [str(ipaddress.ip_address(host))]
+    except ValueError:
+        pass
+    _stats["lookups"] += 1
+    cached = _cache.get(host)
+    if cached and cached[0] > _clock():
+        _, addresses, error = cached
+        if error:
+            _stats["negative_hits"] += 1
+            raise socket.gaierror(*error)
+        _stats["hits"] += 1
+        return list(addresses)
+
+    _stats["misses"] += 1
+    shared = _in_flight.get(host)
+    if shared is None:
+        timeout = settings.dns_timeout if timeout is None else timeout
+        shared = _in_flight[host] = asyncio.ensure_future(_resolve_uncached(host, timeout))
+        shared.add_done_callback(lambda _: _in_flight.pop(host, None))
+    return list(await asyncio.shield(shared))
+
+
+def resolver_stats() -> dict:
+    """Counters since this process started, plus latency percentiles of recent real lookups."""
+    recent = sorted(_latencies)
+
+    def pct(q: float) -> float | None:
+        return round(recent[min(len(recent) - 1, int(len(recent) * q))] * 1000, 1) if recent else None
+
+    return {**_stats, "cached_hosts": len(_cache), "p50_ms": pct(0.50), "p95_ms": pct(0.95), "max_ms": pct(1.0)}
@@ -21,6 +21,7 @@ from urllib.parse import urlparse
 import resend
 import sqlalchemy as sa
 
+from app.archive import FREE_REPORT_TTL_DAYS  # the real step-4 deadline
 from app.config import settings
 from app.database import database, scans, drip_sends, email_suppressions
 from app.marketing import unsubscribe_link, promo_link
@@ -32,7 +33,6 @@ STEP_AGES_H = {1: 1, 2: 24, 3: 72, 4: 168}
 ENROLL_WINDOW_H = 36        # only START a sequence while the scan is younger than this
 EMAIL_COOLDOWN_H = 20       # min gap between any two drip emails to the same address
 MAX_SENDS_PER_TICK = 40
-FREE_REPORT_TTL_DAYS = 30   # mirrors get_scan_results — used for the real step-4 deadline
 
 _SEV_RANK = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3, "Info": 4}
 
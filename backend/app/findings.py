@@ -0,0 +1,193 @@
+"""
+Findings - fingerprint-based dedupe and merge of findings from several sources.
+
+A scan's findings arrive from up to three places (vulnerability files on disk, the tracer's
+in-memory reports, the vulnerability callback) that often describe the same issue in
+different words: "SQL Injection in /login" on disk, "SQLi on login endpoint" from the
+callback. Deduping on the lowercased title let those pile up and threw away whatever the
+second source knew that the first didn't.
+
+fingerprint() reduces a finding to (vuln class, normalized endpoint, title key), the title
+key being the title's significant words once class words and the endpoint's own words are
+gone. merge_findings() walks every source once and merges a finding into an earlier one
+from a *different* source when their fingerprints are equal or, for the same class and
+endpoint, when their title keys are similar (half their words shared, or one title says
+nothing beyond class and endpoint). Findings from one source are never merged with each
+other, so "Reflected XSS in q" and "Stored XSS in comment body" at /search both survive.
+The merged finding keeps the first-seen title, the most severe severity and the most
+complete value of every other field.
+
+Pure functions only (unit-tested — see tests/test_findings.py; benchmarked in
+benchmarks/bench_findings_merge.py).
+"""
+
+import re
+from urllib.parse import urlparse
+
+FIELDS = ("title", "severity", "endpoint", "impact", "reproduction_steps", "poc", "fix_guidance")
+
+_SEVERITY_RANK = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3, "Info": 4, "None": 5}
+
+# (class, pattern) — first match wins, so more specific classes come first.
+_VULN_CLASSES = [
+    ("sqli", r"\bsql\s*i\b|\bsqli\b|sql[\s-]*injection|blind\s+sql"),
+    ("nosqli", r"\bnosql"),
+    ("xss", r"\bxss\b|cross[\s-]*site\s+scripting"),
+    ("csrf", r"\bcsrf\b|\bxsrf\b|cross[\s-]*site\s+request\s+forgery"),
+    ("ssrf", r"\bssrf\b|server[\s-]*side\s+request\s+forgery"),
+    ("ssti", r"\bssti\b|template\s+injection"),
+    ("xxe", r"\bxxe\b|xml\s+external\s+entit"),
+    ("rce", r"\brce\b|remote\s+code\s+execution|command\s+injection|\bos\s+command"),
+    ("traversal", r"path\s+traversal|directory\s+traversal|\blfi\b|local\s+file\s+inclusion"),
+    ("idor", r"\bidor\b|insecure\s+direct\s+object|broken\s+object\s+level|\bbola\b"),
+    ("open_redirect", r"open\s+redirect|unvalidated\s+redirect"),
+    ("cors", r"\bcors\b|cross[\s-]*origin\s+resource"),
+    ("auth", r"auth(?:entication)?\s+bypass|broken\s+auth|\bjwt\b|session\s+fixation|"
+             r"brute[\s-]*force|credential|weak\s+password|account\s+takeover"),
+    ("access_control", r"access\s+control|privilege\s+escalation|authori[sz]ation|missing\s+auth"),
+    ("headers", r"security\s+header|content[\s-]*security[\s-]*policy|\bcsp\b|\bhsts\b|"
+                r"strict[\s-]*transport|x[\s-]*frame[\s-]*options|clickjacking|missing\s+header"),
+    ("info_disclosure", r"information\s+disclosure|info(?:rmation)?\s+leak|stack\s+trace|"
+                        r"verbose\s+error|exposed|sensitive\s+data|debug"),
+    ("rate_limit", r"rate[\s-]*limit"),
+]
+_VULN_CLASS_PATTERNS = [(name, re.compile(p, re.IGNORECASE)) for name, p in _VULN_CLASSES]
+
+# Words that say nothing about *which* issue this is — dropped from title keys.
+_STOPWORDS = frozenset(
+    "a an the in on at of to for via via and or with without from by is are was be "
+    "vulnerability vulnerable issue found possible potential detected endpoint page form "
+    "parameter param field input request response api route url path".split()
+)
+_CLASS_WORDS = re.compile(
+    r"sql\s*injection|sqli|nosql|injection|cross[\s-]*site|scripting|xss|csrf|ssrf|ssti|xxe|rce|"
+    r"traversal|inclusion|lfi|idor|redirect|cors|bypass|header[s]?|disclosure|"
+    r"authentication|authorization|access\s+control|"
+    # class names spelled out: "Insecure Direct Object Reference in /x" says no more than "IDOR in /x"
+    r"insecure\s+direct\s+object\s+reference[s]?|request\s+forgery|remote\s+code\s+execution|"
+    r"xml\s+external\s+entit(?:y|ies)|resource\s+sharing|broken\s+object\s+level|information",
+)  # matched against lowercased titles — IGNORECASE would make it several times slower
+
+# A URL or a path standing on its own ("in /login", "(/api/v1)") — not "TLS 1.2/1.3".
+_PATH_IN_TEXT = re.compile(r"(?:https?://[^\s/]+|(?<![^\s(]))(/[A-Za-z0-9_\-./{}:]*)")
+_NAMED_ENDPOINT = re.compile(r"\b([a-z0-9_-]+)\s+(?:endpoint|page|form|route|api)\b", re.IGNORECASE)
+_ID_SEGMENT = re.compile(r"^(?:\d+|[0-9a-f]{8}-[0-9a-f-]{27,}|[0-9a-f]{16,})$", re.IGNORECASE)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def vuln_class(finding: dict) -> str:
+    """Classify by title first (most specific), then the impact text; '' when unknown."""
+    for text in (finding.get("title") or "", finding.get("impact") or ""):
+        for name, pattern in _VULN_CLASS_PATTERNS:
+            if pattern.search(text):
+                return name
+    return ""
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """Host-less, query-less, lowercased path; id-like segments become {id}, trailing ones drop."""
+    endpoint = (endpoint or "").strip().strip("`'\"<>")
+    if not endpoint:
+        return ""
+    # "POST /api/login" → "/api/login"
+    parts = endpoint.split()
+    if len(parts) > 1 and parts[0].isalpha() and parts[0].isupper():
+        endpoint = parts[1]
+    if "://" in endpoint:
+        try:
+            endpoint = urlparse(endpoint).path or "/"
+        except ValueError:
+            return ""
+    endpoint = endpoint.split("?", 1)[0].split("#", 1)[0]
+    if not endpoint.startswith("/"):
+        return ""
+    segments = [("{id}" if _ID_SEGMENT.match(s) else s) for s in endpoint.lower().split("/") if s]
+    while segments and segments[-1] == "{id}":  # /api/users/123 and /api/users are one resource
+        segments.pop()
+    return "/" + "/".join(segments)
+
+
+def _endpoint_from_title(title: str) -> str:
+    m = _PATH_IN_TEXT.search(title)
+    if m and len(m.group(1)) > 1:
+        return normalize_endpoint(m.group(1).rstrip(".,:;"))
+    m = _NAMED_ENDPOINT.search(title)
+    if m and m.group(1).lower() not in _STOPWORDS:
+        return "/" + m.group(1).lower()
+    return ""
+
+
+def _title_key(title: str, endpoint: str) -> str:
+    words = _WORD.findall(_CLASS_WORDS.sub(" ", title.lower()))
+    ignored = _STOPWORDS | set(_WORD.findall(endpoint))
+    return " ".join(sorted({w for w in words if w not in ignored and not _ID_SEGMENT.match(w)}))
+
+
+def fingerprint(finding: dict) -> tuple[str, str, str]:
+    """(vuln class, normalized endpoint, title key)."""
+    title = finding.get("title") or ""
+    cls = vuln_class(finding)
+    endpoint = normalize_endpoint(finding.get("endpoint") or "") or _endpoint_from_title(title)
+    return cls, endpoint, _title_key(title, endpoint)
+
+
+def _similarity(a: str, b: str) -> float:
+    """Jaccard overlap of two title keys; a key with no words matches anything at 0.5."""
+    a_words, b_words = set(a.split()), set(b.split())
+    if not a_words or not b_words:
+        return 0.5
+    return len(a_words & b_words) / len(a_words | b_words)
+
+
+def _more_complete(current: str, candidate: str) -> bool:
+    current, candidate = (current or "").strip(), (candidate or "").strip()
+    if not candidate or candidate.lower() in ("n/a", "none", "unknown"):
+        return False
+    return not current or len(candidate) > len(current)
+
+
+def merge_findings(*sources) -> list[dict]:
+    """
+    Dedupe and merge findings from any number of sources in a single pass.
+
+    Order is first-seen (so pass the most authoritative source first). A finding merges into
+    at most one earlier finding from another source (see the module docstring). For duplicates
+    the first title is kept, severity becomes the most severe reported, and every other field
+    takes the most complete (longest non-placeholder) value from any source.
+    """
+    merged: list[dict] = []
+    seen_in: list[set[int]] = []  # per merged finding, the sources it already took one from
+    exact: dict[tuple[str, str, str], list[int]] = {}
+    by_location: dict[tuple[str, str], list[tuple[int, str]]] = {}  # (cls, endpoint) -> [(index, key)]
+    for source_no, source in enumerate(sources):
+        for finding in source or ():
+            cls, endpoint, key = fingerprint(finding)
+            target = None
+            if cls or endpoint or key:  # nothing identifying at all: never merge it away
+                target = next((i for i in exact.get((cls, endpoint, key), ()) if source_no not in seen_in[i]),
+                              None)
+                if target is None and cls and endpoint:
+                    scored = [(_similarity(key, merged_key), -i) for i, merged_key in
+                              by_location.get((cls, endpoint), ()) if source_no not in seen_in[i]]
+                    best = max(scored, default=None)
+                    if best and best[0] >= 0.5:
+                        target = -best[1]
+            if target is None:
+                merged.append({**finding, **{field: finding.get(field, "") or "" for field in FIELDS}})
+                seen_in.append({source_no})
+                index = len(merged) - 1
+                exact.setdefault((cls, endpoint, key), []).append(index)
+                if cls and endpoint:
+                    by_location.setdefault((cls, endpoint), []).append((index, key))
+                continue
+            existing = merged[target]
+            seen_in[target].add(source_no)
+            if not existing["title"] and finding.get("title"):
+                existing["title"] = finding["title"]
+            sev = finding.get("severity")
+            if sev and _SEVERITY_RANK.get(sev, 9) < _SEVERITY_RANK.get(existing["severity"], 9):
+                existing["severity"] = sev
+            for field in FIELDS[2:]:
+                if _more_complete(existing[field], finding.get(field)):
+                    existing[field] = finding[field]
+    return merged
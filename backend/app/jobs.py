@@ -0,0 +1,53 @@
+"""
+Jobs - atomically claim the next pending scan for a worker.
+
+The worker used to read every pending scan, then flip each to "running" as it got to it.
+Two workers (or an admin cancel landing in between) could then act on the same row.
+claim_pending_scan() does both in one statement:
+
+    UPDATE scans SET status = 'running'
+     WHERE status = 'pending'
+       AND id = (SELECT id FROM scans
+                  WHERE status = 'pending' AND (not_before IS NULL OR not_before <= :now)
+                  ORDER BY created_at LIMIT 1
+                  FOR UPDATE SKIP LOCKED)            -- Postgres only
+    RETURNING id, email, target_url, scan_type, retry_count
+
+On Postgres, SKIP LOCKED lets any number of workers claim side by side without blocking on
+(or double-claiming) a row another worker is taking. SQLite renders the same statement
+without the locking clause; its single writer makes the statement atomic anyway.
+
+The status predicate is a literal ('pending', not a bound parameter) so both planners can use
+the partial index ix_scans_pending.
+"""
+
+from datetime import datetime
+
+import sqlalchemy
+
+from app.database import database, scans
+
+CLAIM_COLUMNS = (scans.c.id, scans.c.email, scans.c.target_url, scans.c.scan_type, scans.c.retry_count)
+
+_IS_PENDING = scans.c.status == sqlalchemy.literal_column("'pending'")
+
+
+def claim_query(now: datetime):
+    due = _IS_PENDING & (scans.c.not_before.is_(None) | (scans.c.not_before <= now))
+    next_id = (
+        sqlalchemy.select(scans.c.id).where(due).order_by(scans.c.created_at).limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return (
+        scans.update()
+        .where(_IS_PENDING & (scans.c.id == next_id))
+        .values(status="running")
+        .returning(*CLAIM_COLUMNS)
+    )
+
+
+async def claim_pending_scan(now: datetime | None = None, db=None) -> dict | None:
+    """Mark the oldest due pending scan "running" and return it, or None when none is due."""
+    row = await (db or database).fetch_one(claim_query(now or datetime.now()))
+    return dict(row) if row is not None else None
@@ -4,11 +4,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.database import database
+from app.migrations import run_migrations
 from app.routers import scans, webhooks, events, marketing
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    run_migrations()
     await database.connect()
     yield
     await database.disconnect()
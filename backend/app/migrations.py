@@ -0,0 +1,267 @@
+"""
+Migrations - versioned schema upgrades, run explicitly at startup instead of at import.
+
+database.py used to run metadata.create_all plus a list of try/except ALTER TABLE statements
+every time it was imported — by the API, the worker, every test and every one-off script.
+Now each schema change is a numbered step in MIGRATIONS, applied in order by
+run_migrations() and recorded in the schema_migrations table, so a database is upgraded
+exactly once per step and `python -m app.migrations` shows where it stands.
+
+The API (lifespan) and the worker (run_worker) both call run_migrations() before connecting,
+so two processes often start at once. Each step runs in its own transaction under a lock —
+pg_advisory_xact_lock on Postgres, SQLite's write lock (BEGIN IMMEDIATE) there — and checks
+schema_migrations again once it holds it, so the second process waits and then skips the step
+instead of re-running its DDL.
+
+Steps build what they create from frozen copies of the tables as they were at that version
+(the _V1 tables and _v6_result_views below), not from app/database.py, so a shipped step does the same thing
+however the live models have moved on since.
+
+Adding a schema change: declare it in app/database.py, then append a step here that spells
+out the new table/columns itself — never edit or renumber one that has shipped.
+"""
+
+from typing import Callable
+
+import sqlalchemy
+
+from app.database import JSONText, engine as _default_engine, scans
+
+schema_migrations = sqlalchemy.Table(
+    "schema_migrations",
+    sqlalchemy.MetaData(),
+    sqlalchemy.Column("version", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("name", sqlalchemy.String(255), nullable=False),
+    sqlalchemy.Column("applied_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
+)
+
+
+# Any constant; shared by every process migrating this database.
+_LOCK_KEY = 0x6E756C6C_7363616E  # "nullscan"
+
+# ---- Version 1: the schema database.py created at import before migrations existed ----
+_V1 = sqlalchemy.MetaData()
+
+_v1_scans = sqlalchemy.Table(
+    "scans",
+    _V1,
+    sqlalchemy.Column("id", sqlalchemy.String(36), primary_key=True),
+    sqlalchemy.Column("email", sqlalchemy.String(255), nullable=False),
+    sqlalchemy.Column("target_url", sqlalchemy.String(2048), nullable=False),
+    sqlalchemy.Column("status", sqlalchemy.String(20)),
+    sqlalchemy.Column("scan_type", sqlalchemy.String(20)),
+    sqlalchemy.Column("results_json", sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
+    sqlalchemy.Column("completed_at", sqlalchemy.DateTime, nullable=True),
+    sqlalchemy.Column("paid_tier", sqlalchemy.String(20), nullable=True),
+    sqlalchemy.Column("stripe_payment_id", sqlalchemy.String(255), nullable=True),
+    sqlalchemy.Column("retry_count", sqlalchemy.Integer),
+    sqlalchemy.Column("progress_json", sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column("parent_scan_id", sqlalchemy.String(36), nullable=True),
+    sqlalchemy.Column("utm_source", sqlalchemy.String(255), nullable=True),
+    sqlalchemy.Column("utm_medium", sqlalchemy.String(255), nullable=True),
+    sqlalchemy.Column("utm_campaign", sqlalchemy.String(255), nullable=True),
+    sqlalchemy.Column("referrer", sqlalchemy.String(1024), nullable=True),
+    sqlalchemy.Column("landing_page", sqlalchemy.String(1024), nullable=True),
+    sqlalchemy.Column("not_before", sqlalchemy.DateTime, nullable=True),
+)
+
+sqlalchemy.Table(
+    "rate_limits",
+    _V1,
+    sqlalchemy.Column("email", sqlalchemy.String(255), primary_key=True),
+    sqlalchemy.Column("scan_count", sqlalchemy.Integer),
+    sqlalchemy.Column("month", sqlalchemy.String(7)),
+)
+
+sqlalchemy.Table(
+    "events",
+    _V1,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True, autoincrement=True),
+    sqlalchemy.Column("session_id", sqlalchemy.String(64), index=True),
+    sqlalchemy.Column("scan_id", sqlalchemy.String(36), nullable=True, index=True),
+    sqlalchemy.Column("name", sqlalchemy.String(64), nullable=False, index=True),
+    sqlalchemy.Column("props_json", sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column("path", sqlalchemy.String(512), nullable=True),
+    sqlalchemy.Column("referrer", sqlalchemy.String(1024), nullable=True),
+    sqlalchemy.Column("utm_source", sqlalchemy.String(255), nullable=True),
+    sqlalchemy.Column("utm_medium", sqlalchemy.String(255), nullable=True),
+    sqlalchemy.Column("utm_campaign", sqlalchemy.String(255), nullable=True),
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
+)
+
+sqlalchemy.Table(
+    "email_suppressions",
+    _V1,
+    sqlalchemy.Column("email", sqlalchemy.String(255), primary_key=True),
+    sqlalchemy.Column("reason", sqlalchemy.String(64), nullable=True),
+    sqlalchemy.Column("created_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
+)
+
+sqlalchemy.Table(
+    "drip_sends",
+    _V1,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True, autoincrement=True),
+    sqlalchemy.Column("scan_id", sqlalchemy.String(36), index=True),
+    sqlalchemy.Column("email", sqlalchemy.String(255), index=True),
+    sqlalchemy.Column("step", sqlalchemy.Integer),
+    sqlalchemy.Column("sent_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
+)
+
+sqlalchemy.Table(
+    "scan_runs",
+    _V1,
+    sqlalchemy.Column("scan_id", sqlalchemy.String(36), primary_key=True),
+    sqlalchemy.Column("run_name", sqlalchemy.String(255), nullable=True),
+    sqlalchemy.Column("run_dir", sqlalchemy.String(1024), nullable=False),
+    sqlalchemy.Column("started_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
+    sqlalchemy.Column("finished_at", sqlalchemy.DateTime, nullable=True),
+    sqlalchemy.Column("file_count", sqlalchemy.Integer),
+    sqlalchemy.Column("total_bytes", sqlalchemy.BigInteger),
+)
+
+sqlalchemy.Table(
+    "scan_artifacts",
+    _V1,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True, autoincrement=True),
+    sqlalchemy.Column("scan_id", sqlalchemy.String(36), index=True, nullable=False),
+    sqlalchemy.Column("path", sqlalchemy.String(1024), nullable=False),
+    sqlalchemy.Column("kind", sqlalchemy.String(32), nullable=False),
+    sqlalchemy.Column("size_bytes", sqlalchemy.BigInteger),
+)
+
+# ---- Version 6 ----
+_v6_result_views = sqlalchemy.Table(
+    "result_views",
+    sqlalchemy.MetaData(),
+    sqlalchemy.Column("scan_id", sqlalchemy.String(36), primary_key=True),
+    sqlalchemy.Column("view", sqlalchemy.String(8), primary_key=True),
+    sqlalchemy.Column("version", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("source_scan_id", sqlalchemy.String(36), nullable=False, index=True),
+    sqlalchemy.Column("source_completed_at", sqlalchemy.DateTime, nullable=True),
+    sqlalchemy.Column("etag", sqlalchemy.String(64), nullable=False),
+    sqlalchemy.Column("body", JSONText, nullable=False),
+    sqlalchemy.Column("rendered_at", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
+)
+
+
+def _lock(conn) -> None:
+    """Hold the migration lock until this transaction ends; other migrating processes wait."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(sqlalchemy.text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+    elif conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _add_missing_columns(conn, table: sqlalchemy.Table) -> list[str]:
+    """ALTER TABLE ... ADD COLUMN for every column of ``table`` the live table lacks."""
+    existing = {c["name"] for c in sqlalchemy.inspect(conn).get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        col_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(sqlalchemy.text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+        added.append(column.name)
+    return added
+
+
+def _baseline(conn) -> None:
+    # Everything database.py used to do at import: create missing tables, then add the
+    # columns (parent_scan_id, utm_*, referrer, landing_page, not_before) older DBs lack.
+    _V1.create_all(conn)
+    added = _add_missing_columns(conn, _v1_scans)
+    if added:
+        print(f"[migrations] scans: added columns {', '.join(added)}", flush=True)
+
+
+def _create_indexes(*names: str) -> Callable:
+    def step(conn) -> None:
+        for index in scans.indexes:
+            if index.name in names:
+                index.create(conn, checkfirst=True)
+    return step
+
+
+def _jsonb_payloads(conn) -> None:
+    # Postgres only: results_json / progress_json were created as TEXT before JSONText.
+    if conn.dialect.name != "postgresql":
+        return
+    types = {c["name"]: str(c["type"]).upper() for c in sqlalchemy.inspect(conn).get_columns("scans")}
+    for column in ("results_json", "progress_json"):
+        if types.get(column) != "JSONB":
+            conn.execute(sqlalchemy.text(
+                f"ALTER TABLE scans ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"
+            ))
+
+
+def _archive_columns(conn) -> None:
+    # archived_at, and the partial index the expiry job (app/archive.py) walks.
+    _add_missing_columns(conn, sqlalchemy.Table(
+        "scans", sqlalchemy.MetaData(), sqlalchemy.Column("archived_at", sqlalchemy.DateTime, nullable=True),
+    ))
+    _create_indexes("ix_scans_archivable")(conn)
+
+
+def _result_views(conn) -> None:
+    # Cached per-tier results responses (app/result_views.py).
+    _v6_result_views.create(conn, checkfirst=True)
+
+
+def _postprocess_attempts(conn) -> None:
+    # Failed finalize attempts, so a poisoned postprocessing row backs off and gives up.
+    _add_missing_columns(conn, sqlalchemy.Table(
+        "scans", sqlalchemy.MetaData(), sqlalchemy.Column("postprocess_attempts", sqlalchemy.Integer, nullable=True),
+    ))
+
+
+# (version, name, step). Append only.
+MIGRATIONS: list[tuple[int, str, Callable]] = [
+    (1, "baseline", _baseline),
+    (2, "scan_indexes", _create_indexes(
+        "ix_scans_status_created_at", "ix_scans_parent_status_completed",
+        "ix_scans_created_at", "ix_scans_email_paid_tier",
+    )),
+    (3, "pending_partial_index", _create_indexes("ix_scans_pending")),
+    (4, "jsonb_payloads", _jsonb_payloads),
+    (5, "archived_at", _archive_columns),
+    (6, "result_views", _result_views),
+    (7, "postprocess_attempts", _postprocess_attempts),
+]
+
+
+def _applied(conn) -> set[int]:
+    schema_migrations.create(conn, checkfirst=True)
+    return {row[0] for row in conn.execute(sqlalchemy.select(schema_migrations.c.version))}
+
+
+def applied_versions(engine: sqlalchemy.Engine | None = None) -> set[int]:
+    engine = engine or _default_engine
+    with engine.begin() as conn:
+        _lock(conn)
+        return _applied(conn)
+
+
+def run_migrations(engine: sqlalchemy.Engine | None = None) -> list[int]:
+    """Apply every pending migration in order; returns the versions applied by this call."""
+    engine = engine or _default_engine
+    done = applied_versions(engine)
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            _lock(conn)
+            if version in _applied(conn):
+                continue  # another process applied it while we waited for the lock
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name))
+        print(f"[migrations] applied {version:03d} {name}", flush=True)
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    applied = run_migrations()
+    current = max(applied_versions(), default=0)
+    print(f"[migrations] schema at version {current} ({len(applied)} applied now)")
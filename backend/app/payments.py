@@ -8,14 +8,16 @@ scan — no matter how many times, or through how many channels, it is delivered
 
 import uuid
 
+from app.archive import restore_scan
 from app.database import database, scans
+from app.result_views import invalidate
 
 TIER_RANK = {"unlock": 1, "pro": 2, "deep": 3}
 
 
 async def _existing_child(parent_scan_id: str, tier: str):
     return await database.fetch_one(
-        scans.select().where(
+        scans.select().with_only_columns(scans.c.id).where(
             (scans.c.parent_scan_id == parent_scan_id) & (scans.c.scan_type == tier)
         )
     )
@@ -43,6 +45,10 @@ async def apply_paid_tier(scan_row, tier: str, payment_id: str) -> tuple[str | N
     if new_rank > current_rank:
         values["paid_tier"] = tier
     await database.execute(scans.update().where(scans.c.id == scan_id).values(**values))
+    if "paid_tier" in values:
+        await invalidate(scan_id)
+    if not scan_row["paid_tier"]:
+        await restore_scan(scan_id)  # an expired free report paid for after it was archived
 
     # Spawn a child scan for pro/deep — but only one per (parent, tier).
     child_scan_id = None
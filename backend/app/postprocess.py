@@ -0,0 +1,166 @@
+"""
+Postprocess - the report postprocessing stage, decoupled from the scan slot.
+
+A scan used to hold its slot through sandbox teardown, report parsing and the (slow,
+network-bound) LLM extraction. Now the runners stop once artifacts are flushed: they return
+{"findings", "report_markdown", "report_facts", "run_dir"} and the worker stores that payload
+with status "postprocessing", then moves straight on to the next pending scan.
+
+This consumer picks those rows up, runs process_scan_report_async, stores the final
+{"findings", "structured_report"} result, marks the scan completed, renders its results view
+(app/result_views.py) and sends the email.
+The scans table is the queue — rows left in "postprocessing" by a worker restart are simply
+picked up again. Concurrency is bounded by settings.postprocess_concurrency, independently
+of the scan loop. A row whose finalize step raises (a corrupt payload, a database error) is
+not retried on every dispatch: postprocess_attempts counts the failures and not_before backs
+it off exponentially; after settings.postprocess_max_attempts it is marked failed, its
+payload kept under "raw_results" for reprocessing.
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.database import database, scans
+from app.email_service import send_scan_complete_email, send_scan_failed_email
+from app.report_processor import create_fallback_report, process_scan_report_async
+from app.result_views import warm as warm_result_view
+
+POSTPROCESS_STATUS = "postprocessing"
+
+# Scan ids with a finalize task running in this process, and the tasks themselves (held so
+# they aren't garbage-collected mid-flight).
+_in_flight: set[str] = set()
+_tasks: set[asyncio.Task] = set()
+
+
+async def finalize_scan(scan: dict) -> None:
+    """Extract the structured report for one postprocessing scan and complete it."""
+    scan_id = scan["id"]
+    payload = json.loads(scan["results_json"]) if scan["results_json"] else {}
+    findings = payload.get("findings", [])
+    markdown = payload.get("report_markdown")
+    facts = payload.get("report_facts")
+
+    started = time.monotonic()
+    try:
+        if markdown:
+            structured_report = await process_scan_report_async(markdown, scan["target_url"], facts)
+        else:
+            structured_report = create_fallback_report(
+                scan["target_url"], f"Found {len(findings)} potential issue(s)", facts
+            )
+    except Exception as e:
+        print(f"[postprocess] {scan_id}: extraction failed: {e}", flush=True)
+        structured_report = create_fallback_report(scan["target_url"], str(e), facts)
+
+    results = {"findings": findings, "structured_report": structured_report}
+    if payload.get("run_dir"):
+        results["run_dir"] = payload["run_dir"]  # lets reprocess_scan.py --bulk find the artifacts
+    if payload.get("stop_reason"):
+        results["stop_reason"] = payload["stop_reason"]  # partial: cost/time limit or admin cancel
+    await database.execute(
+        scans.update()
+        .where((scans.c.id == scan_id) & (scans.c.status == POSTPROCESS_STATUS))
+        .values(
+            status="completed",
+            results_json=json.dumps(results),
+            completed_at=datetime.now(),
+        )
+    )
+    print(f"[postprocess] {scan_id}: completed in {time.monotonic() - started:.1f}s "
+          f"(risk: {structured_report.get('risk_level', '?')})", flush=True)
+    try:
+        await warm_result_view(scan_id)  # the first /results read is then served as stored
+    except Exception as e:
+        print(f"[postprocess] {scan_id}: result view not rendered: {e}", flush=True)
+
+    await send_scan_complete_email(
+        email=scan["email"],
+        scan_id=scan_id,
+        findings_count=len(findings),
+        target_url=scan["target_url"],
+    )
+
+
+async def _record_failure(scan: dict, error: Exception) -> None:
+    """Back the row off (it stays in "postprocessing"), or fail it once out of attempts."""
+    scan_id = scan["id"]
+    attempts = (scan.get("postprocess_attempts") or 0) + 1
+    pending = (scans.c.id == scan_id) & (scans.c.status == POSTPROCESS_STATUS)
+    if attempts < settings.postprocess_max_attempts:
+        delay = settings.postprocess_retry_seconds * 2 ** (attempts - 1)
+        await database.execute(
+            scans.update().where(pending).values(
+                postprocess_attempts=attempts, not_before=datetime.now() + timedelta(seconds=delay),
+            )
+        )
+        print(f"[postprocess] {scan_id}: error (attempt {attempts}/{settings.postprocess_max_attempts}, "
+              f"retrying in {delay:.0f}s): {error}", flush=True)
+        return
+
+    await database.execute(
+        scans.update().where(pending).values(
+            status="failed",
+            results_json=json.dumps({
+                "error": "postprocessing_failed",
+                "message": str(error)[:500],
+                "raw_results": scan["results_json"],
+            }),
+            completed_at=datetime.now(),
+            postprocess_attempts=attempts,
+        )
+    )
+    print(f"[postprocess] {scan_id}: failed after {attempts} attempts: {error}", flush=True)
+    await send_scan_failed_email(scan["email"], scan_id)
+
+
+async def _run(scan: dict) -> None:
+    try:
+        await finalize_scan(scan)
+    except Exception as e:
+        try:
+            await _record_failure(scan, e)
+        except Exception as record_error:
+            # Couldn't even record it (database down?): picked up again on the next dispatch.
+            print(f"[postprocess] {scan['id']}: error: {e} (not recorded: {record_error})", flush=True)
+    finally:
+        _in_flight.discard(scan["id"])
+
+
+async def dispatch_postprocessing() -> int:
+    """Start finalize tasks for queued scans, up to the concurrency limit. Returns how many started."""
+    free = settings.postprocess_concurrency - len(_in_flight)
+    if free <= 0:
+        return 0
+    now = datetime.now()
+    queued = await database.fetch_all(
+        scans.select()
+        .where((scans.c.status == POSTPROCESS_STATUS)
+               & (scans.c.not_before.is_(None) | (scans.c.not_before <= now)))
+        .order_by(scans.c.created_at)
+    )
+    started = 0
+    for scan in queued:
+        if started >= free:
+            break
+        if scan["id"] in _in_flight:
+            continue
+        _in_flight.add(scan["id"])
+        task = asyncio.create_task(_run(dict(scan)))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+        started += 1
+    return started
+
+
+async def run_postprocess_loop(interval: float = 2.0) -> None:
+    """Poll the postprocessing queue forever (started as a task next to the scan loop)."""
+    while True:
+        try:
+            await dispatch_postprocessing()
+        except Exception as e:
+            print(f"[postprocess] dispatch error: {e}", flush=True)
+        await asyncio.sleep(interval)
@@ -0,0 +1,117 @@
+"""
+Rate limit - free scans per email per month, enforced in one statement.
+
+create_scan used to read the email's rate_limits row, insert or reset it, then (after the
+scan was created) increment it: three round trips, and two concurrent submissions from the
+same email could both read "2 used" and both get through. reserve_free_scan() is a single
+upsert that only counts the scan if a slot is left:
+
+    INSERT INTO rate_limits (email, scan_count, month) VALUES (:email, 1, :month)
+    ON CONFLICT (email) DO UPDATE
+       SET scan_count = CASE WHEN rate_limits.month = excluded.month
+                             THEN rate_limits.scan_count + 1 ELSE 1 END,
+           month = excluded.month
+     WHERE rate_limits.month != excluded.month OR rate_limits.scan_count < :limit
+    RETURNING scan_count
+
+No row back means the month's quota is used up. The database serializes the upsert per
+email, so the limit holds however many API processes share it (SQLite >= 3.35 or Postgres).
+
+Two in-process fast paths sit in front of it, neither of which can let a scan through that
+the database would refuse:
+
+- throttled(): a token bucket per email (settings.rate_limit_burst requests, refilled one per
+  settings.rate_limit_refill_seconds) that turns away scripted bursts before URL validation
+  or the database;
+- emails the database has refused this month are remembered for
+  settings.rate_limit_exhausted_ttl_seconds, so repeat attempts are rejected without a query.
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import sqlalchemy
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.config import settings
+from app.database import database, rate_limits
+
+MAX_FREE_SCANS_PER_MONTH = 3
+
+UNLIMITED_EMAILS = {e.strip().lower() for e in settings.unlimited_emails.split(",") if e.strip()}
+
+# Per-process state, LRU-bounded so a flood of distinct emails can't grow it without limit.
+_MAX_TRACKED = 10_000
+_buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # email -> (tokens, updated_at)
+_exhausted: OrderedDict[str, tuple[str, float]] = OrderedDict()  # email -> (month, expires_at)
+
+
+def _remember(cache: OrderedDict, key: str, value) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > _MAX_TRACKED:
+        cache.popitem(last=False)
+
+
+def throttled(email: str, now: float | None = None) -> bool:
+    """Take a token from the email's bucket; True when it is empty (too many requests)."""
+    if email.lower() in UNLIMITED_EMAILS:
+        return False
+    now = time.monotonic() if now is None else now
+    capacity = float(settings.rate_limit_burst)
+    tokens, updated = _buckets.get(email, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) / settings.rate_limit_refill_seconds)
+    if tokens < 1:
+        _remember(_buckets, email, (tokens, now))
+        return True
+    _remember(_buckets, email, (tokens - 1, now))
+    return False
+
+
+def _current_month(now: datetime | None) -> str:
+    return (now or datetime.now()).strftime("%Y-%m")
+
+
+def reserve_query(email: str, month: str, scheme: str):
+    insert = (postgresql if scheme.startswith("postgres") else sqlite).insert
+    stmt = insert(rate_limits).values(email=email, scan_count=1, month=month)
+    same_month = rate_limits.c.month == stmt.excluded.month
+    return stmt.on_conflict_do_update(
+        index_elements=[rate_limits.c.email],
+        set_={
+            "scan_count": sqlalchemy.case((same_month, rate_limits.c.scan_count + 1), else_=1),
+            "month": stmt.excluded.month,
+        },
+        where=rate_limits.c.month.is_distinct_from(stmt.excluded.month)
+        | (rate_limits.c.scan_count < MAX_FREE_SCANS_PER_MONTH),
+    ).returning(rate_limits.c.scan_count)
+
+
+async def reserve_free_scan(email: str, now: datetime | None = None, db=None) -> bool:
+    """Count one free scan against the email's monthly quota; False if none is left."""
+    if email.lower() in UNLIMITED_EMAILS:
+        return True
+    month = _current_month(now)
+    known = _exhausted.get(email)
+    if known and known[0] == month and known[1] > time.monotonic():
+        return False
+    db = db or database
+    row = await db.fetch_one(reserve_query(email, month, db.url.scheme))
+    if row is None:
+        _remember(_exhausted, email, (month, time.monotonic() + settings.rate_limit_exhausted_ttl_seconds))
+        return False
+    return True
+
+
+async def release_free_scan(email: str, now: datetime | None = None, db=None) -> None:
+    """Give back a slot reserve_free_scan() took, when the scan couldn't be created after all."""
+    if email.lower() in UNLIMITED_EMAILS:
+        return
+    await (db or database).execute(
+        rate_limits.update()
+        .where((rate_limits.c.email == email) & (rate_limits.c.month == _current_month(now))
+               & (rate_limits.c.scan_count > 0))
+        .values(scan_count=rate_limits.c.scan_count - 1)
+    )
+    _exhausted.pop(email, None)
@@ -0,0 +1,100 @@
+"""
+Report Cache - content-addressed, on-disk cache for structured-report extraction.
+
+Entries are keyed on sha256(markdown) + the report model + an extraction version derived from
+EXTRACTION_PROMPT and the StructuredReport schema, so identical reports (reprocess runs, runner
+fallbacks, retries of a failed scan) skip the LLM call entirely, while any prompt, schema or
+model change naturally misses. Only successful extractions are stored — fallback reports never.
+
+Each entry is one JSON file under settings.report_cache_dir. The directory is size-bounded
+(settings.report_cache_max_mb): writes evict least-recently-used entries (by mtime, which a
+hit refreshes) until it fits again.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from app.config import settings
+
+# Process-wide counters, surfaced via cache_stats() and the [ReportCache] log lines.
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+
+def cache_key(markdown_report: str, model: str, version: str) -> str:
+    h = hashlib.sha256()
+    for part in (version, model, markdown_report):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _cache_dir() -> Path:
+    return Path(settings.report_cache_dir)
+
+
+def _entry_path(key: str) -> Path:
+    return _cache_dir() / f"{key}.json"
+
+
+def get(key: str) -> dict | None:
+    """Return the cached report for ``key`` (refreshing its LRU position), or None."""
+    path = _entry_path(key)
+    try:
+        report = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        _stats["misses"] += 1
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    _stats["hits"] += 1
+    return report
+
+
+def put(key: str, report: dict) -> None:
+    """Store ``report`` atomically, then evict down to the size bound."""
+    cache_dir = _cache_dir()
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(report, f)
+        os.replace(tmp, _entry_path(key))
+    except OSError as e:
+        print(f"[ReportCache] write failed: {e}")
+        return
+    _stats["writes"] += 1
+    _evict(cache_dir, int(settings.report_cache_max_mb * 1024 * 1024))
+
+
+def _evict(cache_dir: Path, max_bytes: int) -> None:
+    entries = []
+    total = 0
+    for path in cache_dir.glob("*.json"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    if total <= max_bytes:
+        return
+    entries.sort(key=lambda e: e[0])  # least recently used first
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        _stats["evictions"] += 1
+
+
+def cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {**_stats, "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0}
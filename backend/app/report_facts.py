@@ -0,0 +1,262 @@
+"""
+Report Facts - deterministic, local extraction of the quantitative parts of a report.
+
+scan_stats, categories_tested and the observable half of attack_surface (subdomains, key
+routes, technologies) are computed here from run artifacts — tracer tool executions and their
+output, parsed findings and the report markdown — instead of being guessed by the report LLM.
+The LLM only writes the prose (see ReportNarrative in app/report_processor.py), and
+assemble_report() joins the two into the StructuredReport shape the API and PDF expect.
+
+Pure functions only (unit-tested — see tests/test_report_facts.py).
+"""
+
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+_URL_RE = re.compile(r"https?://[^\s\"'<>()\[\]`{}|\\^]+")
+
+# Terminal commands that send HTTP traffic to the target.
+_HTTP_COMMANDS = ("curl", "wget", "httpx", "nuclei", "nikto", "sqlmap", "ffuf")
+
+# Tool output is scanned for technology fingerprints; cap per execution so one huge
+# response body can't dominate the cost of building a report.
+_MAX_OUTPUT_CHARS = 20_000
+
+# (display name, pattern). Patterns match headers/banners/asset paths rather than bare
+# English words, so prose in the report ("the server may react…") doesn't count.
+_TECH_SIGNATURES = [
+    ("nginx", r"\bnginx\b"),
+    ("Apache", r"\bapache(?:/\d|\s+httpd|\s+tomcat)|server:\s*apache"),
+    ("Microsoft IIS", r"\bmicrosoft-iis\b|server:\s*iis"),
+    ("Cloudflare", r"\bcloudflare\b|\bcf-ray\b"),
+    ("Vercel", r"\bvercel\b|x-vercel-"),
+    ("Netlify", r"\bnetlify\b"),
+    ("AWS", r"\bamazonaws\.com\b|\bcloudfront\b|x-amz-"),
+    ("Next.js", r"\bnext\.js\b|/_next/|x-nextjs-"),
+    ("React", r"\breact(?:\.js|-dom)\b|data-reactroot"),
+    ("Vue.js", r"\bvue(?:\.js)?@|\bvue\.js\b|data-v-[0-9a-f]{6}"),
+    ("Angular", r"\bng-version\b|\bangular(?:\.js)?\b"),
+    ("Express", r"x-powered-by:\s*express|\bexpress\.js\b"),
+    ("PHP", r"x-powered-by:\s*php|\bphpsessid\b|\.php\b"),
+    ("WordPress", r"\bwordpress\b|/wp-(?:content|includes|admin|json)/"),
+    ("Django", r"\bdjango\b|\bcsrftoken\b"),
+    ("Ruby on Rails", r"\brails\b|_rails_session|x-runtime:"),
+    ("Laravel", r"\blaravel\b|laravel_session"),
+    ("ASP.NET", r"\basp\.net\b|x-aspnet-version|__viewstate"),
+    ("Java / Spring", r"\bspring(?:boot|\s+boot)?\b|\bjsessionid\b|whitelabel error page"),
+    ("GraphQL", r"\bgraphql\b"),
+    ("Supabase", r"\bsupabase\b"),
+    ("Firebase", r"\bfirebase(?:io|app)?\b"),
+    ("Stripe", r"\bjs\.stripe\.com\b"),
+    ("JWT", r"\beyJ[A-Za-z0-9_-]{10,}\.eyJ"),
+]
+_TECH_PATTERNS = [(name, re.compile(p, re.IGNORECASE)) for name, p in _TECH_SIGNATURES]
+
+# Category name (as shown in the UI) -> indicators of testing activity / of a finding's class.
+# Matched as whole words (see _indicator_pattern) against the agent's own activity and finding
+# titles — never the report prose, which mentions "password" or "authorization" whether or not
+# anything was tested.
+CATEGORIES = [
+    ("SQL Injection", ("sqlmap", "sqli", "sql injection", "union select", "' or 1=1", "or '1'='1")),
+    ("Cross-Site Scripting (XSS)", ("xss", "cross-site scripting", "<script", "onerror=", "javascript:")),
+    ("Authentication Bypass", ("auth bypass", "authentication", "/login", "/signin", "jwt", "session fixation", "password")),
+    ("IDOR / Access Control", ("idor", "access control", "insecure direct object", "authorization", "privilege")),
+    ("SSRF", ("ssrf", "server-side request forgery", "169.254.169.254", "metadata.google.internal")),
+    ("Directory Traversal", ("traversal", "../", "..%2f", "/etc/passwd", "lfi", "local file inclusion")),
+    ("Security Headers", ("security header", "content-security-policy", "strict-transport-security",
+                          "x-frame-options", "curl -i", "curl -si", "nikto", "cors")),
+]
+
+
+def _indicator_pattern(indicators) -> re.Pattern:
+    """One regex for a category's indicators, each bounded by \\b on its word-character edges
+    (a plural or -ed/-ing ending allowed) — so "cors" doesn't match "records", "idor" "corridor"
+    or "lfi" "selfie", while "security header" still matches "Missing Security Headers"."""
+    def bounded(indicator: str) -> str:
+        head = r"\b" if indicator[0].isalnum() else ""
+        tail = r"(?:e?s|e?d|ing)?\b" if indicator[-1].isalnum() else ""
+        return head + re.escape(indicator) + tail
+
+    return re.compile("|".join(bounded(i) for i in indicators), re.IGNORECASE)
+
+
+_CATEGORY_PATTERNS = [(name, _indicator_pattern(indicators)) for name, indicators in CATEGORIES]
+
+
+def _host(url: str) -> str:
+    try:
+        return (urlparse(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def _endpoint(url: str) -> str | None:
+    """Normalize a URL to host+path (no query/fragment/trailing punctuation)."""
+    url = url.rstrip(".,;:!?*")
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+    if not parsed.hostname:
+        return None
+    path = parsed.path.rstrip("/") or "/"
+    return f"{parsed.hostname.lower()}{path}"
+
+
+def _base_domain(target_url: str) -> str:
+    host = _host(target_url)
+    return host[4:] if host.startswith("www.") else host
+
+
+def _duration_minutes(started_at) -> int:
+    if not started_at:
+        return 0
+    try:
+        start = (
+            datetime.fromisoformat(started_at.replace("Z", "+00:00"))
+            if isinstance(started_at, str) else started_at
+        )
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        return max(1, int((datetime.now(timezone.utc) - start).total_seconds() / 60))
+    except (ValueError, TypeError, AttributeError):
+        return 0
+
+
+def collect_report_facts(
+    target_url: str,
+    tool_executions=None,
+    findings: list | None = None,
+    markdown: str = "",
+    tool_count: int = 0,
+    started_at=None,
+) -> dict:
+    """
+    Compute the deterministic report fields from whatever artifacts are available.
+
+    Args:
+        target_url: The scanned target (defines which hosts count as subdomains)
+        tool_executions: Iterable of tracer tool-execution dicts (tool_name/args/result)
+        findings: Parsed findings (title/endpoint/...) from the runner
+        markdown: The report markdown, scanned for URLs and technology fingerprints (not
+            for categories_tested, which only counts observed activity)
+        tool_count: The tracer's real tool count (lower bound for requests_sent)
+        started_at: Scan start (ISO string or datetime) for duration_minutes
+
+    Returns:
+        {"scan_stats": {...}, "categories_tested": [...], "attack_surface": {...}}
+    """
+    findings = findings or []
+    base = _base_domain(target_url)
+
+    tested: set[str] = set()        # endpoints we actually sent traffic to
+    discovered: set[str] = set()    # every endpoint seen anywhere
+    route_hits: Counter = Counter()
+    http_requests = 0
+    activity_text: list[str] = []
+    evidence_text: list[str] = []
+
+    for exec_data in tool_executions or []:
+        tool_name = exec_data.get("tool_name", "")
+        args = exec_data.get("args") or {}
+        urls: list[str] = []
+        if tool_name == "send_request":
+            http_requests += 1
+            urls = [args.get("url", "")]
+            activity_text.append(f"{args.get('method', '')} {args.get('url', '')} {args.get('body', '')}")
+        elif tool_name == "browser_action":
+            if args.get("action") == "goto":
+                http_requests += 1
+                urls = [args.get("url", "")]
+            activity_text.append(" ".join(str(v) for v in args.values()))
+        elif tool_name == "terminal_execute":
+            cmd = str(args.get("command", ""))
+            if any(x in cmd.lower() for x in _HTTP_COMMANDS):
+                http_requests += 1
+                urls = _URL_RE.findall(cmd)
+            activity_text.append(cmd)
+        for url in urls:
+            ep = _endpoint(url) if url else None
+            if ep:
+                tested.add(ep)
+                route_hits[ep] += 1
+
+        result = exec_data.get("result")
+        if result:
+            out = str(result)[:_MAX_OUTPUT_CHARS]
+            evidence_text.append(out)
+            discovered.update(ep for ep in map(_endpoint, _URL_RE.findall(out)) if ep)
+
+    for f in findings:
+        endpoint = str(f.get("endpoint") or "")
+        if endpoint.startswith("http"):
+            ep = _endpoint(endpoint)
+        elif endpoint.startswith("/"):
+            ep = f"{_host(target_url)}{endpoint.split('?')[0].rstrip('/') or '/'}"
+        else:
+            ep = None
+        if ep:
+            tested.add(ep)
+
+    discovered.update(ep for ep in map(_endpoint, _URL_RE.findall(markdown or "")) if ep)
+    discovered |= tested
+
+    # Only the target's own hosts count toward its attack surface.
+    in_scope = {ep for ep in discovered if base and (ep.split("/", 1)[0] == base or ep.split("/", 1)[0].endswith("." + base))}
+    subdomains = sorted({ep.split("/", 1)[0] for ep in in_scope})
+    in_scope_tested = {ep for ep in tested if ep in in_scope} or tested
+
+    technologies = []
+    haystack = "\n".join(evidence_text + activity_text + [markdown or ""])
+    for name, pattern in _TECH_PATTERNS:
+        if pattern.search(haystack):
+            technologies.append(name)
+
+    # Most-exercised in-scope paths first, then anything else discovered, de-duplicated.
+    ranked = [ep for ep, _ in route_hits.most_common() if ep in in_scope] + sorted(in_scope)
+    key_routes = list(dict.fromkeys("/" + ep.split("/", 1)[1] for ep in ranked))[:15]
+
+    # "tested" only on the agent's own requests/commands, not on what the report says about them.
+    activity = "\n".join(activity_text)
+    categories = []
+    for name, pattern in _CATEGORY_PATTERNS:
+        count = sum(1 for f in findings if pattern.search(f"{f.get('title', '')} {f.get('impact', '')}"))
+        if count:
+            status = "findings"
+        elif pattern.search(activity):
+            status = "tested"
+        else:
+            status = "skipped"
+        categories.append({"name": name, "status": status, "findings_count": count, "note": None})
+
+    return {
+        "scan_stats": {
+            "endpoints_discovered": len(in_scope) or len(discovered),
+            "endpoints_tested": len(in_scope_tested),
+            "subdomains_found": len(subdomains),
+            "requests_sent": max(http_requests, tool_count),
+            "duration_minutes": _duration_minutes(started_at),
+            "technologies_identified": len(technologies),
+        },
+        "categories_tested": categories,
+        "attack_surface": {
+            "subdomains": subdomains,
+            "key_routes": key_routes,
+            "technologies": technologies,
+        },
+    }
+
+
+def assemble_report(narrative: dict, facts: dict) -> dict:
+    """Join LLM prose (ReportNarrative) with local facts into the StructuredReport shape."""
+    report = dict(narrative)
+    report["scan_stats"] = facts["scan_stats"]
+    report["categories_tested"] = facts["categories_tested"]
+    report["attack_surface"] = {
+        **facts["attack_surface"],
+        "auth_mechanisms": (narrative.get("attack_surface") or {}).get("auth_mechanisms", []),
+        "external_services": (narrative.get("attack_surface") or {}).get("external_services", []),
+    }
+    return report
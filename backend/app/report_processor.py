@@ -3,14 +3,19 @@ Report Processor - Extracts structured data from markdown pentest reports
 Uses OpenAI GPT-5.2 with structured outputs for guaranteed schema compliance
 """
 
+import asyncio
+import hashlib
+import json
 import time
 from typing import Optional
 from enum import Enum
 from pydantic import BaseModel
 import openai
-from openai import OpenAI
+from openai import AsyncOpenAI
 
+from app import report_cache
 from app.config import settings
+from app.report_facts import assemble_report, collect_report_facts
 
 
 # ============================================================================
@@ -138,6 +143,31 @@ class StructuredReport(BaseModel):
     what_deep_scan_covers: list[str]    # What additional testing deep scan does
 
 
+class AttackSurfaceNotes(BaseModel):
+    """The part of the attack surface only the report prose can tell us"""
+    auth_mechanisms: list[str]
+    external_services: list[str]        # Third-party integrations detected
+
+
+class ReportNarrative(BaseModel):
+    """
+    What the report LLM actually generates: the prose fields of StructuredReport.
+    scan_stats, categories_tested and the observable attack surface (subdomains, routes,
+    technologies) are computed locally by app.report_facts and joined in afterwards,
+    which keeps the structured-output schema and the tokens per report small.
+    """
+    executive_summary: str
+    executive_summary_teaser: str
+    risk_level: RiskLevel
+    risk_rationale: str
+    attack_surface: AttackSurfaceNotes
+    areas_of_interest: list[AreaOfInterest]
+    recommendations: list[Recommendation]
+    constraints: list[Constraint]
+    deep_scan_value_prop: str
+    what_deep_scan_covers: list[str]
+
+
 # ============================================================================
 # EXTRACTION PROMPT
 # ============================================================================
@@ -172,70 +202,326 @@ FOR DEEP SCAN VALUE PROP:
 Be thorough. The user paid for this scan and deserves comprehensive output."""
 
 
+# Changes whenever the prompt or the output schema changes, so cached extractions made under
+# an older prompt/schema are never served (see app/report_cache.py).
+EXTRACTION_VERSION = hashlib.sha256(
+    (EXTRACTION_PROMPT + json.dumps(ReportNarrative.model_json_schema(), sort_keys=True)).encode("utf-8")
+).hexdigest()[:16]
+
+
 # ============================================================================
 # PROCESSOR FUNCTION
 # ============================================================================
 
-def extract_structured_report(markdown_report: str) -> dict:
-    """
-    Extract structured data from a markdown penetration test report.
-    Uses OpenAI GPT-5.2 with structured outputs for guaranteed schema compliance.
+# Transient OpenAI errors worth retrying (rate limits, timeouts, dropped connections, 5xx).
+# These were silently forcing the empty "Indeterminate" fallback report on costly scans.
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError, openai.APITimeoutError,
+    openai.APIConnectionError, openai.InternalServerError,
+)
+_MAX_ATTEMPTS = 3
+
+# One AsyncOpenAI client per event loop, so every extraction in the worker shares a single
+# HTTP connection pool instead of paying a fresh TLS handshake per report. The SDK's own
+# retries are disabled — _parse_with_retries owns the retry policy for both code paths.
+_async_client: AsyncOpenAI | None = None
+_async_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_async_client() -> AsyncOpenAI:
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            timeout=settings.report_llm_timeout,
+            max_retries=0,
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+def _extraction_input(markdown_report: str, part: tuple[int, int] | None = None) -> list[dict]:
+    instruction = "Extract structured data from this penetration test report"
+    if part:
+        instruction += (
+            f" (part {part[0]} of {part[1]} of a larger report — extract only what this part"
+            " contains; other parts are processed separately and merged)"
+        )
+    return [
+        {"role": "system", "content": EXTRACTION_PROMPT},
+        {"role": "user", "content": f"{instruction}:\n\n{markdown_report}"},
+    ]
+
+
+def _parsed_output(response) -> dict:
+    """Unwrap a responses.parse() result, raising on refusal or an unparseable output."""
+    if hasattr(response, 'output') and response.output:
+        content = response.output[0].content[0]
+        if hasattr(content, 'refusal') and content.refusal:
+            raise ValueError(f"Model refused to process report: {content.refusal}")
 
-    Args:
-        markdown_report: The raw markdown report content
+    result = response.output_parsed
+    if result is None:
+        raise ValueError("Failed to parse structured output from model")
+
+    return result.model_dump(mode="json")
+
+
+def _response_usage(response) -> dict:
+    usage = getattr(response, "usage", None)
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+    }
+
+
+def _backoff_seconds(attempt: int) -> int:
+    return 2 * (2 ** attempt)  # 2s, then 4s
 
-    Returns:
-        Dictionary matching the StructuredReport schema
-    """
-    client = OpenAI(api_key=settings.openai_api_key)
 
-    # Retry transient OpenAI errors (rate limits, timeouts) with backoff before giving up.
-    # These were silently forcing the empty "Indeterminate" fallback report on costly scans.
+# Process-wide LLM usage for report extraction, surfaced via usage_stats().
+_usage_totals = {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+
+
+def usage_stats() -> dict:
+    return dict(_usage_totals)
+
+
+async def _parse_with_retries(markdown_report: str, part: tuple[int, int] | None = None) -> tuple[dict, dict]:
+    """One structured-output call with retry/backoff. Returns (report, token usage)."""
+    client = _get_async_client()
+
     response = None
-    for attempt in range(3):
+    for attempt in range(_MAX_ATTEMPTS):
         try:
-            response = client.responses.parse(
+            response = await client.responses.parse(
                 model=settings.report_llm,  # Report extraction only (separate from the scan LLM)
-                input=[
-                    {"role": "system", "content": EXTRACTION_PROMPT},
-                    {"role": "user", "content": f"Extract structured data from this penetration test report:\n\n{markdown_report}"},
-                ],
-                text_format=StructuredReport,
+                input=_extraction_input(markdown_report, part),
+                text_format=ReportNarrative,
+                timeout=settings.report_llm_timeout,
             )
             break
-        except (openai.RateLimitError, openai.APITimeoutError,
-                openai.APIConnectionError, openai.InternalServerError) as e:
-            if attempt == 2:
+        except _RETRYABLE_ERRORS as e:
+            if attempt == _MAX_ATTEMPTS - 1:
                 raise
-            wait = 2 * (2 ** attempt)  # 2s, then 4s
-            print(f"[ReportProcessor] transient OpenAI error (attempt {attempt + 1}/3): {e}; retrying in {wait}s")
-            time.sleep(wait)
+            wait = _backoff_seconds(attempt)
+            print(f"[ReportProcessor] transient OpenAI error (attempt {attempt + 1}/{_MAX_ATTEMPTS}): {e}; retrying in {wait}s")
+            await asyncio.sleep(wait)
 
-    # Handle potential refusal
-    if hasattr(response, 'output') and response.output:
-        content = response.output[0].content[0]
-        if hasattr(content, 'refusal') and content.refusal:
-            raise ValueError(f"Model refused to process report: {content.refusal}")
+    usage = _response_usage(response)
+    _usage_totals["calls"] += 1
+    _usage_totals["input_tokens"] += usage["input_tokens"]
+    _usage_totals["output_tokens"] += usage["output_tokens"]
+    return _parsed_output(response), usage
 
-    # Get the parsed output
-    result = response.output_parsed
 
-    if result is None:
-        raise ValueError("Failed to parse structured output from model")
+async def extract_structured_report_async(markdown_report: str) -> dict:
+    """
+    Extract structured data from a markdown penetration test report without blocking the
+    event loop. Uses the shared pooled client, a per-call timeout (settings.report_llm_timeout)
+    and asyncio.sleep backoff, so other scans' progress updates keep flowing meanwhile.
+
+    Reports longer than settings.report_chunk_chars are map-reduced: split at section
+    boundaries, extracted chunk-by-chunk in parallel, then merged deterministically.
+
+    Args:
+        markdown_report: The raw markdown report content
+
+    Returns:
+        Dictionary matching the ReportNarrative schema (join with app.report_facts
+        via assemble_report for the full StructuredReport)
+    """
+    chunks = split_report_sections(markdown_report, settings.report_chunk_chars)
+    started = time.monotonic()
+
+    if len(chunks) == 1:
+        report, usage = await _parse_with_retries(markdown_report)
+        print(f"[ReportProcessor] extract: {len(markdown_report)} chars in {time.monotonic() - started:.1f}s "
+              f"(in={usage['input_tokens']}, out={usage['output_tokens']} tokens)")
+        return report
+
+    # Map: bounded-parallel extraction per chunk. Any chunk failing fails the whole
+    # extraction, so the caller's fallback applies rather than a silently partial report.
+    sem = asyncio.Semaphore(max(1, settings.report_chunk_concurrency))
+
+    async def _map(i: int, chunk: str):
+        async with sem:
+            return await _parse_with_retries(chunk, part=(i + 1, len(chunks)))
 
-    return result.model_dump()
+    results = await asyncio.gather(*(_map(i, c) for i, c in enumerate(chunks)))
+    map_secs = time.monotonic() - started
+    in_tokens = sum(u["input_tokens"] for _, u in results)
+    out_tokens = sum(u["output_tokens"] for _, u in results)
+    print(f"[ReportProcessor] map: {len(chunks)} chunks from {len(markdown_report)} chars in {map_secs:.1f}s "
+          f"(in={in_tokens}, out={out_tokens} tokens)")
+
+    reduce_started = time.monotonic()
+    merged = merge_report_narratives([r for r, _ in results])
+    print(f"[ReportProcessor] reduce: merged {len(results)} partial reports in "
+          f"{(time.monotonic() - reduce_started) * 1000:.1f}ms")
+    return merged
+
+
+def extract_structured_report(markdown_report: str) -> dict:
+    """
+    Synchronous variant of extract_structured_report_async for scripts that have no event
+    loop of their own. Must not be called from inside a running loop.
+    """
+    return asyncio.run(extract_structured_report_async(markdown_report))
+
+
+# ============================================================================
+# MAP-REDUCE HELPERS (pure — see tests/test_report_processor.py)
+# ============================================================================
+
+def _is_split_heading(line: str) -> bool:
+    return line.startswith("# ") or line.startswith("## ")
+
+
+def split_report_sections(markdown_report: str, max_chars: int) -> list[str]:
+    """
+    Split a report into chunks of at most ``max_chars``, cutting only at top-level
+    (``#``/``##``) headings outside fenced code blocks so each vulnerability write-up stays
+    whole. A single section larger than the limit is split at paragraph breaks, and a single
+    paragraph larger than that is hard-cut as a last resort.
+    """
+    if len(markdown_report) <= max_chars:
+        return [markdown_report]
+
+    sections: list[str] = []
+    current: list[str] = []
+    in_fence = False
+    for line in markdown_report.split("\n"):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        if not in_fence and _is_split_heading(line) and current:
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+
+    pieces: list[str] = []
+    for section in sections:
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+        for para in section.split("\n\n"):
+            for i in range(0, len(para), max_chars):
+                pieces.append(para[i:i + max_chars])
+
+    # Greedily pack pieces back together up to the limit (+1 per joining newline).
+    chunks: list[str] = []
+    buf = ""
+    for piece in pieces:
+        if buf and len(buf) + 1 + len(piece) > max_chars:
+            chunks.append(buf)
+            buf = piece
+        else:
+            buf = f"{buf}\n{piece}" if buf else piece
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+
+_RISK_RANK = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3, "Clean": 4, "Indeterminate": 5}
+_SEVERITY_RANK = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3, "Info": 4}
+
+
+def _union(*lists: list[str]) -> list[str]:
+    seen = set()
+    out = []
+    for items in lists:
+        for item in items or []:
+            k = str(item).strip().lower()
+            if k and k not in seen:
+                seen.add(k)
+                out.append(item)
+    return out
+
+
+def merge_report_narratives(parts: list[dict]) -> dict:
+    """
+    Deterministically merge per-chunk ReportNarrative dicts (in chunk order) into one.
+
+    Narrative fields come from the first chunk that has them (the executive summary opens
+    the report); risk is the most severe non-indeterminate level; lists are de-duplicated
+    case-insensitively by their natural key, first occurrence wins; recommendations are
+    re-prioritized 0..n-1 in (priority, chunk) order.
+    """
+    if len(parts) == 1:
+        return parts[0]
+
+    def first(field: str) -> str:
+        return next((p[field] for p in parts if p.get(field)), "")
+
+    # Risk: most severe level any chunk assessed; rationale from the chunk that set it.
+    rated = [p for p in parts if p.get("risk_level") in _RISK_RANK]
+    risk_source = min(rated, key=lambda p: _RISK_RANK[p["risk_level"]]) if rated else parts[0]
+
+    surfaces = [p.get("attack_surface") or {} for p in parts]
+    attack_surface = {
+        f: _union(*(s.get(f, []) for s in surfaces))
+        for f in ("auth_mechanisms", "external_services")
+    }
+
+    areas: dict[str, dict] = {}
+    for p in parts:
+        for area in p.get("areas_of_interest") or []:
+            areas.setdefault(area.get("title", "").strip().lower(), area)
+    areas_sorted = sorted(areas.values(), key=lambda a: _SEVERITY_RANK.get(a.get("severity"), 9))
+
+    recs: dict[str, tuple] = {}
+    for chunk_idx, p in enumerate(parts):
+        for rec in p.get("recommendations") or []:
+            key = rec.get("title", "").strip().lower()
+            order = (rec.get("priority", 99), chunk_idx)
+            if key not in recs or order < recs[key][0]:
+                recs[key] = (order, rec)
+    recommendations = [
+        {**rec, "priority": i}
+        for i, (_, rec) in enumerate(sorted(recs.values(), key=lambda r: r[0]))
+    ]
+
+    constraints: dict[str, dict] = {}
+    for p in parts:
+        for c in p.get("constraints") or []:
+            constraints.setdefault(c.get("description", "").strip().lower(), c)
+
+    return {
+        "executive_summary": first("executive_summary"),
+        "executive_summary_teaser": first("executive_summary_teaser"),
+        "risk_level": risk_source.get("risk_level", "Indeterminate"),
+        "risk_rationale": risk_source.get("risk_rationale", ""),
+        "attack_surface": attack_surface,
+        "areas_of_interest": areas_sorted,
+        "recommendations": recommendations,
+        "constraints": list(constraints.values()),
+        "deep_scan_value_prop": first("deep_scan_value_prop"),
+        "what_deep_scan_covers": _union(*(p.get("what_deep_scan_covers", []) for p in parts)),
+    }
 
 
 # ============================================================================
 # FALLBACK FOR FAILED EXTRACTION
 # ============================================================================
 
-def create_fallback_report(target_url: str, error_msg: str) -> dict:
+FALLBACK_AREA_TITLE = "Report Processing Error"
+
+
+def is_fallback_report(report: dict) -> bool:
+    """True for a create_fallback_report() result rather than a real extraction."""
+    return any(a.get("title") == FALLBACK_AREA_TITLE for a in report.get("areas_of_interest") or [])
+
+
+def create_fallback_report(target_url: str, error_msg: str, facts: dict | None = None) -> dict:
     """
     Create a minimal structured report when extraction fails.
-    This ensures the UI always has something to display.
+    This ensures the UI always has something to display. Locally computed facts
+    (app.report_facts), when given, still fill in the stats and what was tested.
     """
-    return {
+    report = {
         "executive_summary": f"Security assessment of {target_url} was completed. Please review the detailed findings below.",
         "executive_summary_teaser": f"Security assessment of {target_url} completed.",
         "risk_level": "Indeterminate",
@@ -266,7 +552,7 @@ def create_fallback_report(target_url: str, error_msg: str) -> dict:
         },
         "areas_of_interest": [
             {
-                "title": "Report Processing Error",
+                "title": FALLBACK_AREA_TITLE,
                 "severity": "Info",
                 "teaser": "The scan completed but results could not be fully processed.",
                 "technical_detail": f"Error during report extraction: {error_msg}",
@@ -298,13 +584,16 @@ def create_fallback_report(target_url: str, error_msg: str) -> dict:
             "Detailed remediation guidance",
         ],
     }
+    return assemble_report(report, facts) if facts else report
 
 
 # ============================================================================
 # MAIN PROCESSING FUNCTION
 # ============================================================================
 
-def process_scan_report(markdown_report: str, target_url: str) -> dict:
+async def process_scan_report_async(
+    markdown_report: str, target_url: str, facts: dict | None = None, use_cache: bool = True,
+) -> dict:
     """
     Main entry point for processing a scan report.
     Handles errors gracefully with fallback.
@@ -312,12 +601,39 @@ def process_scan_report(markdown_report: str, target_url: str) -> dict:
     Args:
         markdown_report: The raw markdown report content
         target_url: The target URL that was scanned
+        facts: Deterministic fields from app.report_facts.collect_report_facts. When
+            omitted they are derived from the markdown alone.
+        use_cache: Serve an identical earlier extraction from the report cache. Pass False
+            to force a fresh LLM call (the result still refreshes the cache entry).
 
     Returns:
         Dictionary matching the StructuredReport schema
     """
-    try:
-        return extract_structured_report(markdown_report)
-    except Exception as e:
-        print(f"[ReportProcessor] Error extracting structured report: {e}")
-        return create_fallback_report(target_url, str(e))
+    if facts is None:
+        facts = collect_report_facts(target_url, markdown=markdown_report)
+
+    key = report_cache.cache_key(markdown_report, settings.report_llm, EXTRACTION_VERSION)
+    narrative = None
+    if use_cache:
+        narrative = await asyncio.to_thread(report_cache.get, key)
+        if narrative is not None:
+            print(f"[ReportCache] hit {key[:12]} ({report_cache.cache_stats()})")
+        else:
+            print(f"[ReportCache] miss {key[:12]}")
+
+    if narrative is None:
+        try:
+            narrative = await extract_structured_report_async(markdown_report)
+        except Exception as e:
+            print(f"[ReportProcessor] Error extracting structured report: {e}")
+            return create_fallback_report(target_url, str(e), facts)
+        await asyncio.to_thread(report_cache.put, key, narrative)
+
+    return assemble_report(narrative, facts)
+
+
+def process_scan_report(
+    markdown_report: str, target_url: str, facts: dict | None = None, use_cache: bool = True,
+) -> dict:
+    """Sync wrapper for process_scan_report_async (scripts only — never call from the worker)."""
+    return asyncio.run(process_scan_report_async(markdown_report, target_url, facts, use_cache))
@@ -0,0 +1,327 @@
+"""
+Result views - the per-tier projections GET /scans/{id}/results serves, rendered once.
+
+A completed scan's results don't change, yet every read used to json.loads the full
+results_json and rebuild the pydantic findings and structured report for the reader's tier.
+The projection only depends on whether the reader sees the paid report, so there are two
+views per scan — "free" and "paid" — stored ready-to-send in the result_views table:
+
+- postprocessing renders the view the scan's owner will ask for as soon as it completes
+  (warm()); any other view is rendered on its first read (get_view());
+- a view remembers which row it was rendered from (the scan, or its newest completed
+  pro/deep child) and VIEW_VERSION, so a newer child or a change here re-renders it;
+- invalidate() drops a scan's views when its tier changes or its results are rewritten
+  (reprocess_scan.py); archiving an expired free scan drops them with its payloads.
+
+Fields that differ per request (tier, expiry countdown) are serialized separately and joined
+with the stored view body, and the strong ETag covers both, so an unchanged report answers
+If-None-Match with 304 without reading results_json at all.
+
+resolve_report() is how the results, PDF and admin report endpoints find what to show: the
+scan and its newest completed child in one indexed query, with only the payload columns the
+caller needs — the two lookups (and two JSON blobs) each used to make.
+"""
+
+import hashlib
+import json
+
+import sqlalchemy
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.archive import restore_scan
+from app.database import database, result_views, scans, SCAN_SUMMARY_COLUMNS
+from app.models import (
+    ScanResults, ScanResultFinding,
+    StructuredReportResponse, ScanStatsResponse, CategoryResultResponse,
+    AreaOfInterestResponse, RecommendationResponse, ConstraintResponse,
+    AttackSurfaceResponse
+)
+
+PAID_TIERS = ("unlock", "pro", "deep")
+
+# Bump when the projection (the filters below, or the models they build) changes shape;
+# stored views with another version are re-rendered on read.
+VIEW_VERSION = 1
+
+# The ScanResults fields a view body carries; the rest are filled in per request.
+_VIEW_FIELDS = {"risk_level", "findings", "structured_report"}
+
+_stats = {"hits": 0, "renders": 0, "not_modified": 0}
+
+
+def calculate_risk_level(findings: list) -> str:
+    """Calculate overall risk level from findings."""
+    if not findings:
+        return "Clean"
+
+    severities = [f.get("severity", "Low") for f in findings]
+
+    if "Critical" in severities:
+        return "Critical"
+    if "High" in severities:
+        return "High"
+    if "Medium" in severities:
+        return "Medium"
+    return "Low"
+
+
+def filter_findings_for_tier(findings: list, paid_tier: str | None) -> list:
+    """Filter finding details based on paid tier."""
+    filtered = []
+
+    for f in findings:
+        finding = {
+            "title": f.get("title", "Unknown Issue"),
+            "severity": f.get("severity", "Medium"),
+            "endpoint": f.get("endpoint", "N/A"),
+            "impact": f.get("impact", "Potential security issue"),
+            "owasp_category": f.get("owasp_category") if paid_tier else None,
+        }
+
+        # Only include details if paid
+        if paid_tier in ("unlock", "pro", "deep"):
+            finding["reproduction_steps"] = f.get("reproduction_steps")
+            finding["poc"] = f.get("poc")
+            finding["fix_guidance"] = f.get("fix_guidance")
+
+        filtered.append(ScanResultFinding(**finding))
+
+    return filtered
+
+
+def filter_structured_report_for_tier(
+    report: dict | None, paid_tier: str | None
+) -> StructuredReportResponse | None:
+    """Filter structured report based on paid tier."""
+    if not report:
+        return None
+
+    is_paid = paid_tier in ("unlock", "pro", "deep")
+
+    # Executive summary: teaser for free, full for paid
+    exec_summary = (
+        report.get("executive_summary", "")
+        if is_paid
+        else report.get("executive_summary_teaser", report.get("executive_summary", "")[:200] + "...")
+    )
+
+    # Areas of interest: free gets title + teaser only
+    areas = []
+    for area in report.get("areas_of_interest", []):
+        areas.append(AreaOfInterestResponse(
+            title=area.get("title", ""),
+            severity=area.get("severity", "Info"),
+            teaser=area.get("teaser", ""),
+            affected_component=area.get("affected_component", ""),
+            technical_detail=area.get("technical_detail") if is_paid else None,
+            recommendation=area.get("recommendation") if is_paid else None,
+        ))
+
+    # Recommendations: free gets title only
+    recs = []
+    for rec in report.get("recommendations", []):
+        recs.append(RecommendationResponse(
+            priority=rec.get("priority", 99),
+            title=rec.get("title", ""),
+            description=rec.get("description") if is_paid else None,
+            effort=rec.get("effort") if is_paid else None,
+            impact=rec.get("impact") if is_paid else None,
+        ))
+
+    # Categories tested - always shown
+    categories = [
+        CategoryResultResponse(**cat)
+        for cat in report.get("categories_tested", [])
+    ]
+
+    # Constraints - always shown
+    constraints = [
+        ConstraintResponse(**c)
+        for c in report.get("constraints", [])
+    ]
+
+    # Attack surface - always shown
+    attack_surface_data = report.get("attack_surface", {})
+    attack_surface = AttackSurfaceResponse(
+        subdomains=attack_surface_data.get("subdomains", []),
+        key_routes=attack_surface_data.get("key_routes", []),
+        technologies=attack_surface_data.get("technologies", []),
+        auth_mechanisms=attack_surface_data.get("auth_mechanisms", []),
+        external_services=attack_surface_data.get("external_services", []),
+    )
+
+    # Scan stats - always shown
+    stats_data = report.get("scan_stats", {})
+    scan_stats = ScanStatsResponse(
+        endpoints_discovered=stats_data.get("endpoints_discovered", 0),
+        endpoints_tested=stats_data.get("endpoints_tested", 0),
+        subdomains_found=stats_data.get("subdomains_found", 0),
+        requests_sent=stats_data.get("requests_sent", 0),
+        duration_minutes=stats_data.get("duration_minutes", 0),
+        technologies_identified=stats_data.get("technologies_identified", 0),
+    )
+
+    return StructuredReportResponse(
+        executive_summary=exec_summary,
+        risk_level=report.get("risk_level", "Indeterminate"),
+        risk_rationale=report.get("risk_rationale", ""),
+        scan_stats=scan_stats,
+        categories_tested=categories,
+        attack_surface=attack_surface,
+        areas_of_interest=areas,
+        recommendations=recs,
+        constraints=constraints,
+        # Upsell only for free users
+        deep_scan_value_prop=report.get("deep_scan_value_prop") if not is_paid else None,
+        what_deep_scan_covers=report.get("what_deep_scan_covers") if not is_paid else None,
+    )
+
+
+def view_name(paid_tier: str | None) -> str:
+    return "paid" if paid_tier in PAID_TIERS else "free"
+
+
+def render(results: dict, view: str) -> str:
+    """The view's {"risk_level", "findings", "structured_report"} as compact JSON."""
+    tier = "unlock" if view == "paid" else None
+    findings = results.get("findings", [])
+    structured_report = results.get("structured_report")
+    # Use structured report risk level if available, otherwise calculate from findings
+    risk_level = (
+        structured_report.get("risk_level", "Indeterminate")
+        if structured_report
+        else calculate_risk_level(findings)
+    )
+    report = filter_structured_report_for_tier(structured_report, tier)
+    return json.dumps({
+        "risk_level": risk_level,
+        "findings": [f.model_dump(mode="json") for f in filter_findings_for_tier(findings, tier)],
+        "structured_report": report.model_dump(mode="json") if report else None,
+    }, separators=(",", ":"))
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+async def _render_and_store(scan_id: str, view: str, source_id: str, db) -> tuple[str, str]:
+    query = scans.select().with_only_columns(scans.c.results_json, scans.c.completed_at).where(
+        scans.c.id == source_id
+    )
+    source = await db.fetch_one(query)
+    if source["results_json"] is None and await restore_scan(source_id, db=db):
+        source = await db.fetch_one(query)
+    body = render(json.loads(source["results_json"]) if source["results_json"] else {}, view)
+    etag = _digest(str(VIEW_VERSION), body)
+    values = {"version": VIEW_VERSION, "source_scan_id": source_id,
+              "source_completed_at": source["completed_at"], "etag": etag, "body": body}
+    insert = (postgresql if db.url.scheme.startswith("postgres") else sqlite).insert
+    stmt = insert(result_views).values(scan_id=scan_id, view=view, **values)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[result_views.c.scan_id, result_views.c.view], set_=values,
+    ))
+    _stats["renders"] += 1
+    return etag, body
+
+
+async def get_view(scan_id: str, view: str, source_id: str, source_completed_at, db=None) -> tuple[str, str]:
+    """(etag, body) of a scan's view rendered from `source_id`: stored, or rendered and stored now."""
+    db = db or database
+    row = await db.fetch_one(
+        result_views.select().with_only_columns(
+            result_views.c.version, result_views.c.source_scan_id, result_views.c.source_completed_at,
+            result_views.c.etag, result_views.c.body,
+        ).where((result_views.c.scan_id == scan_id) & (result_views.c.view == view))
+    )
+    if (row is not None and row["version"] == VIEW_VERSION and row["source_scan_id"] == source_id
+            and row["source_completed_at"] == source_completed_at):
+        _stats["hits"] += 1
+        return row["etag"], row["body"]
+    return await _render_and_store(scan_id, view, source_id, db)
+
+
+def report_query(scan_id: str, *payload: str):
+    """The scan's summary columns plus its report source — the newest completed pro/deep
+    child, whose results supersede the parent's, else the scan itself — in one statement.
+
+    Columns: SCAN_SUMMARY_COLUMNS (the scan's own), source_id / source_scan_type /
+    source_completed_at, and each requested payload column ("results_json",
+    "progress_json") taken from the source. A primary-key lookup; the child is picked by a
+    correlated LIMIT 1 over ix_scans_parent_status_completed and joined back by primary key."""
+    parent, child = scans.alias("parent"), scans.alias("child")
+    best_child = (
+        sqlalchemy.select(scans.c.id)
+        .where((scans.c.parent_scan_id == parent.c.id) & (scans.c.status == "completed"))
+        .order_by(scans.c.completed_at.desc())
+        .limit(1)
+        .correlate(parent)
+        .scalar_subquery()
+    )
+    has_child = child.c.id.isnot(None)
+
+    def source(column: str):
+        return sqlalchemy.case((has_child, child.c[column]), else_=parent.c[column])
+
+    return (
+        sqlalchemy.select(
+            *(parent.c[c.name] for c in SCAN_SUMMARY_COLUMNS),
+            source("id").label("source_id"),
+            source("scan_type").label("source_scan_type"),
+            source("completed_at").label("source_completed_at"),
+            *(source(column).label(column) for column in payload),
+        )
+        .select_from(parent.outerjoin(child, child.c.id == best_child))
+        .where(parent.c.id == scan_id)
+    )
+
+
+async def resolve_report(scan_id: str, *payload: str, db=None):
+    """One row of report_query(), or None if there is no such scan. Payloads of an archived
+    scan come back None — callers restore_scan() once they've checked the reader may see it."""
+    return await (db or database).fetch_one(report_query(scan_id, *payload))
+
+
+async def warm(scan_id: str, db=None) -> None:
+    """Render the view a just-completed scan's owner will ask for (its parent's, for a child)."""
+    db = db or database
+    scan = await db.fetch_one(
+        scans.select().with_only_columns(scans.c.parent_scan_id).where(scans.c.id == scan_id)
+    )
+    if scan is None:
+        return
+    target_id = scan["parent_scan_id"] or scan_id
+    report = await resolve_report(target_id, db=db)
+    await get_view(target_id, view_name(report["paid_tier"]), report["source_id"],
+                   report["source_completed_at"], db)
+
+
+async def invalidate(scan_id: str, db=None) -> None:
+    """Drop every view of this scan, and every view rendered from it (a parent's, for a child)."""
+    await (db or database).execute(
+        result_views.delete().where(
+            (result_views.c.scan_id == scan_id) | (result_views.c.source_scan_id == scan_id)
+        )
+    )
+
+
+def respond(view_etag: str, body: str, **fields) -> tuple[str, bytes]:
+    """(ETag header value, response bytes) for a ScanResults made of a view plus per-request fields."""
+    head = ScanResults(risk_level="", findings=[], **fields).model_dump_json(exclude=_VIEW_FIELDS)
+    # Two JSON objects with disjoint keys: splice the members instead of parsing the view.
+    payload = f"{head[:-1]},{body[1:]}" if head != "{}" else body
+    return f'"{_digest(view_etag, head)}"', payload.encode("utf-8")
+
+
+def not_modified(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches the current ETag (RFC 9110 weak comparison)."""
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    matched = "*" in tags or etag in tags
+    if matched:
+        _stats["not_modified"] += 1
+    return matched
+
+
+def view_stats() -> dict:
+    return dict(_stats)
@@ -1,20 +1,23 @@
-import ipaddress
+import asyncio
 import json
-import socket
 import uuid
 from datetime import datetime, timedelta, timezone
 from urllib.parse import urlparse
 import stripe
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
 from fastapi.responses import Response
-from app.database import database, scans, rate_limits, events
-from app.models import (
-    ScanCreate, ScanResponse, ScanResults, ScanResultFinding,
-    StructuredReportResponse, ScanStatsResponse, CategoryResultResponse,
-    AreaOfInterestResponse, RecommendationResponse, ConstraintResponse,
-    AttackSurfaceResponse
+from app.database import (
+    database, scans, events, SCAN_PAYMENT_COLUMNS, SCAN_SUMMARY_COLUMNS,
 )
+from app.models import ScanCreate, ScanResponse, ScanResults
+from app.archive import FREE_REPORT_TTL_DAYS, restore_scan
 from app.config import settings
+from app.dns_cache import is_private_address, resolve, resolver_stats
+from app.rate_limit import MAX_FREE_SCANS_PER_MONTH, release_free_scan, reserve_free_scan, throttled
+from app.result_views import (
+    get_view, invalidate, not_modified, resolve_report, respond, view_name, view_stats,
+)
+from app.scan_control import CANCEL_STATUS
 
 stripe.api_key = settings.stripe_secret_key
 
@@ -28,70 +31,25 @@ TIER_RANK = {"unlock": 1, "pro": 2, "deep": 3}
 
 router = APIRouter(prefix="/scans", tags=["scans"])
 
-MAX_FREE_SCANS_PER_MONTH = 3
-
-
-UNLIMITED_EMAILS = {e.strip().lower() for e in settings.unlimited_emails.split(",") if e.strip()}
-
-
-def validate_target_url(url: str):
+async def validate_target_url(url: str):
     """Block SSRF attempts by rejecting private/reserved IP targets."""
-    try:
-        parsed = urlparse(url)
-        hostname = parsed.hostname
-        if not hostname:
-            raise HTTPException(status_code=400, detail="Invalid target URL")
-
-        if hostname.lower() in ("localhost", "localhost.localdomain"):
-            raise HTTPException(status_code=400, detail="Private/reserved targets are not allowed")
-
-        addrs = socket.getaddrinfo(hostname, None)
-        for family, _, _, _, sockaddr in addrs:
-            ip = ipaddress.ip_address(sockaddr[0])
-            if ip.is_private or ip.is_loopback or ip.is_reserved or ip.is_link_local:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Private/reserved targets are not allowed"
-                )
-    except HTTPException:
-        raise
-    except Exception:
-        pass  # DNS resolution failure is ok — Strix will handle it
+    parsed = urlparse(url)
+    hostname = parsed.hostname
+    if not hostname:
+        raise HTTPException(status_code=400, detail="Invalid target URL")
 
+    if hostname.lower() in ("localhost", "localhost.localdomain"):
+        raise HTTPException(status_code=400, detail="Private/reserved targets are not allowed")
 
-async def check_rate_limit(email: str) -> bool:
-    if email.lower() in UNLIMITED_EMAILS:
-        return True
-
-    current_month = datetime.now().strftime("%Y-%m")
-    query = rate_limits.select().where(rate_limits.c.email == email)
-    result = await database.fetch_one(query)
-
-    if result is None:
-        await database.execute(
-            rate_limits.insert().values(
-                email=email, scan_count=0, month=current_month
-            )
-        )
-        return True
-
-    if result["month"] != current_month:
-        await database.execute(
-            rate_limits.update()
-            .where(rate_limits.c.email == email)
-            .values(scan_count=0, month=current_month)
+    try:
+        addrs = await resolve(hostname, timeout=settings.dns_timeout)
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return  # DNS resolution failure is ok — preflight decides whether the target is dead
+    if any(is_private_address(a) for a in addrs):
+        raise HTTPException(
+            status_code=400,
+            detail="Private/reserved targets are not allowed"
         )
-        return True
-
-    return result["scan_count"] < MAX_FREE_SCANS_PER_MONTH
-
-
-async def increment_rate_limit(email: str):
-    await database.execute(
-        rate_limits.update()
-        .where(rate_limits.c.email == email)
-        .values(scan_count=rate_limits.c.scan_count + 1)
-    )
 
 
 @router.post("/", response_model=ScanResponse)
@@ -99,34 +57,40 @@ async def create_scan(scan: ScanCreate):
     if not scan.consent:
         raise HTTPException(status_code=400, detail="Consent is required")
 
-    validate_target_url(str(scan.target_url))
+    if throttled(scan.email):
+        raise HTTPException(status_code=429, detail="Too many requests. Please wait a minute and try again.")
+
+    await validate_target_url(str(scan.target_url))
 
-    if not await check_rate_limit(scan.email):
+    # Counts the scan against the monthly quota in the same statement that checks it.
+    if not await reserve_free_scan(scan.email):
         raise HTTPException(
             status_code=429,
-            detail="Rate limit exceeded. Maximum 3 free scans per month."
+            detail=f"Rate limit exceeded. Maximum {MAX_FREE_SCANS_PER_MONTH} free scans per month."
         )
 
     scan_id = str(uuid.uuid4())
 
-    await database.execute(
-        scans.insert().values(
-            id=scan_id,
-            email=scan.email,
-            target_url=str(scan.target_url),
-            status="pending",
-            scan_type="quick",  # Free scans are quick, deep scans require payment
-            utm_source=scan.utm_source,
-            utm_medium=scan.utm_medium,
-            utm_campaign=scan.utm_campaign,
-            referrer=scan.referrer,
-            landing_page=scan.landing_page,
+    try:
+        await database.execute(
+            scans.insert().values(
+                id=scan_id,
+                email=scan.email,
+                target_url=str(scan.target_url),
+                status="pending",
+                scan_type="quick",  # Free scans are quick, deep scans require payment
+                utm_source=scan.utm_source,
+                utm_medium=scan.utm_medium,
+                utm_campaign=scan.utm_campaign,
+                referrer=scan.referrer,
+                landing_page=scan.landing_page,
+            )
         )
-    )
-
-    await increment_rate_limit(scan.email)
+    except Exception:
+        await release_free_scan(scan.email)
+        raise
 
-    query = scans.select().where(scans.c.id == scan_id)
+    query = scans.select().with_only_columns(*SCAN_SUMMARY_COLUMNS).where(scans.c.id == scan_id)
     result = await database.fetch_one(query)
 
     return ScanResponse(**dict(result))
@@ -134,7 +98,7 @@ async def create_scan(scan: ScanCreate):
 
 @router.get("/{scan_id}", response_model=ScanResponse)
 async def get_scan(scan_id: str):
-    query = scans.select().where(scans.c.id == scan_id)
+    query = scans.select().with_only_columns(*SCAN_SUMMARY_COLUMNS).where(scans.c.id == scan_id)
     result = await database.fetch_one(query)
 
     if result is None:
@@ -148,7 +112,7 @@ async def create_checkout(scan_id: str, tier: str):
     if tier not in PRICE_TIERS:
         raise HTTPException(status_code=400, detail="Invalid tier")
 
-    query = scans.select().where(scans.c.id == scan_id)
+    query = scans.select().with_only_columns(*SCAN_PAYMENT_COLUMNS).where(scans.c.id == scan_id)
     scan = await database.fetch_one(query)
 
     if not scan:
@@ -194,7 +158,7 @@ async def create_payment_intent(scan_id: str, tier: str, promo: str = ""):
     if tier not in PRICE_TIERS:
         raise HTTPException(status_code=400, detail=f"Invalid tier: {tier}")
 
-    query = scans.select().where(scans.c.id == scan_id)
+    query = scans.select().with_only_columns(*SCAN_PAYMENT_COLUMNS).where(scans.c.id == scan_id)
     scan = await database.fetch_one(query)
 
     if not scan:
@@ -243,7 +207,7 @@ async def confirm_payment(scan_id: str, payment_intent_id: str, tier: str):
     if tier not in PRICE_TIERS:
         raise HTTPException(status_code=400, detail="Invalid tier")
 
-    query = scans.select().where(scans.c.id == scan_id)
+    query = scans.select().with_only_columns(*SCAN_PAYMENT_COLUMNS).where(scans.c.id == scan_id)
     scan = await database.fetch_one(query)
 
     if not scan:
@@ -281,137 +245,11 @@ async def confirm_payment(scan_id: str, payment_intent_id: str, tier: str):
     return {"success": True, "message": "Payment confirmed", "child_scan_id": child_scan_id}
 
 
-def calculate_risk_level(findings: list) -> str:
-    """Calculate overall risk level from findings."""
-    if not findings:
-        return "Clean"
-
-    severities = [f.get("severity", "Low") for f in findings]
-
-    if "Critical" in severities:
-        return "Critical"
-    if "High" in severities:
-        return "High"
-    if "Medium" in severities:
-        return "Medium"
-    return "Low"
-
-
-def filter_findings_for_tier(findings: list, paid_tier: str | None) -> list:
-    """Filter finding details based on paid tier."""
-    filtered = []
-
-    for f in findings:
-        finding = {
-            "title": f.get("title", "Unknown Issue"),
-            "severity": f.get("severity", "Medium"),
-            "endpoint": f.get("endpoint", "N/A"),
-            "impact": f.get("impact", "Potential security issue"),
-            "owasp_category": f.get("owasp_category") if paid_tier else None,
-        }
-
-        # Only include details if paid
-        if paid_tier in ("unlock", "pro", "deep"):
-            finding["reproduction_steps"] = f.get("reproduction_steps")
-            finding["poc"] = f.get("poc")
-            finding["fix_guidance"] = f.get("fix_guidance")
-
-        filtered.append(ScanResultFinding(**finding))
-
-    return filtered
-
-
-def filter_structured_report_for_tier(
-    report: dict | None, paid_tier: str | None
-) -> StructuredReportResponse | None:
-    """Filter structured report based on paid tier."""
-    if not report:
-        return None
-
-    is_paid = paid_tier in ("unlock", "pro", "deep")
-
-    # Executive summary: teaser for free, full for paid
-    exec_summary = (
-        report.get("executive_summary", "")
-        if is_paid
-        else report.get("executive_summary_teaser", report.get("executive_summary", "")[:200] + "...")
-    )
-
-    # Areas of interest: free gets title + teaser only
-    areas = []
-    for area in report.get("areas_of_interest", []):
-        areas.append(AreaOfInterestResponse(
-            title=area.get("title", ""),
-            severity=area.get("severity", "Info"),
-            teaser=area.get("teaser", ""),
-            affected_component=area.get("affected_component", ""),
-            technical_detail=area.get("technical_detail") if is_paid else None,
-            recommendation=area.get("recommendation") if is_paid else None,
-        ))
-
-    # Recommendations: free gets title only
-    recs = []
-    for rec in report.get("recommendations", []):
-        recs.append(RecommendationResponse(
-            priority=rec.get("priority", 99),
-            title=rec.get("title", ""),
-            description=rec.get("description") if is_paid else None,
-            effort=rec.get("effort") if is_paid else None,
-            impact=rec.get("impact") if is_paid else None,
-        ))
-
-    # Categories tested - always shown
-    categories = [
-        CategoryResultResponse(**cat)
-        for cat in report.get("categories_tested", [])
-    ]
-
-    # Constraints - always shown
-    constraints = [
-        ConstraintResponse(**c)
-        for c in report.get("constraints", [])
-    ]
-
-    # Attack surface - always shown
-    attack_surface_data = report.get("attack_surface", {})
-    attack_surface = AttackSurfaceResponse(
-        subdomains=attack_surface_data.get("subdomains", []),
-        key_routes=attack_surface_data.get("key_routes", []),
-        technologies=attack_surface_data.get("technologies", []),
-        auth_mechanisms=attack_surface_data.get("auth_mechanisms", []),
-        external_services=attack_surface_data.get("external_services", []),
-    )
-
-    # Scan stats - always shown
-    stats_data = report.get("scan_stats", {})
-    scan_stats = ScanStatsResponse(
-        endpoints_discovered=stats_data.get("endpoints_discovered", 0),
-        endpoints_tested=stats_data.get("endpoints_tested", 0),
-        subdomains_found=stats_data.get("subdomains_found", 0),
-        requests_sent=stats_data.get("requests_sent", 0),
-        duration_minutes=stats_data.get("duration_minutes", 0),
-        technologies_identified=stats_data.get("technologies_identified", 0),
-    )
-
-    return StructuredReportResponse(
-        executive_summary=exec_summary,
-        risk_level=report.get("risk_level", "Indeterminate"),
-        risk_rationale=report.get("risk_rationale", ""),
-        scan_stats=scan_stats,
-        categories_tested=categories,
-        attack_surface=attack_surface,
-        areas_of_interest=areas,
-        recommendations=recs,
-        constraints=constraints,
-        # Upsell only for free users
-        deep_scan_value_prop=report.get("deep_scan_value_prop") if not is_paid else None,
-        what_deep_scan_covers=report.get("what_deep_scan_covers") if not is_paid else None,
-    )
-
-
 @router.get("/{scan_id}/progress")
 async def get_scan_progress(scan_id: str):
-    query = scans.select().where(scans.c.id == scan_id)
+    query = scans.select().with_only_columns(scans.c.status, scans.c.progress_json).where(
+        scans.c.id == scan_id
+    )
     scan = await database.fetch_one(query)
 
     if not scan:
@@ -429,9 +267,9 @@ async def get_scan_progress(scan_id: str):
 
 
 @router.get("/{scan_id}/results", response_model=ScanResults)
-async def get_scan_results(scan_id: str, key: str = ""):
-    query = scans.select().where(scans.c.id == scan_id)
-    scan = await database.fetch_one(query)
+async def get_scan_results(scan_id: str, key: str = "", if_none_match: str | None = Header(default=None)):
+    # The scan and its result source (newest completed pro/deep child, else itself) in one query.
+    scan = await resolve_report(scan_id)
 
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
@@ -447,8 +285,8 @@ async def get_scan_results(scan_id: str, key: str = ""):
     is_admin = bool(settings.admin_api_key) and key == settings.admin_api_key
     effective_tier = scan["paid_tier"] or ("unlock" if is_admin else None)
 
-    # Check free scan expiration (30 days) — admins bypass it.
-    FREE_REPORT_TTL_DAYS = 30
+    # Check free scan expiration (FREE_REPORT_TTL_DAYS) — admins bypass it. Payloads of expired
+    # scans are moved out of the row by app/archive.py.
     expired = False
     expires_in_days = None
     if not scan["paid_tier"] and not is_admin:
@@ -473,44 +311,34 @@ async def get_scan_results(scan_id: str, key: str = ""):
             expired=True,
         )
 
-    # Check for completed child scans (pro/deep upgrades)
-    child_query = scans.select().where(
-        (scans.c.parent_scan_id == scan_id) & (scans.c.status == "completed")
-    ).order_by(scans.c.completed_at.desc())
-    child_scan = await database.fetch_one(child_query)
-
-    # Use child scan results if available, but parent's paid_tier for access control
-    result_source = child_scan if child_scan else scan
-    results = json.loads(result_source["results_json"]) if result_source["results_json"] else {}
-    findings = results.get("findings", [])
-    structured_report = results.get("structured_report")
-
-    # Use structured report risk level if available, otherwise calculate from findings
-    risk_level = (
-        structured_report.get("risk_level", "Indeterminate")
-        if structured_report
-        else calculate_risk_level(findings)
+    # Child scan results if available, but parent's paid_tier for access control. The tier's
+    # projection is rendered once and stored (app/result_views.py).
+    view_etag, body = await get_view(
+        scan_id, view_name(effective_tier), scan["source_id"], scan["source_completed_at"]
     )
-
-    return ScanResults(
+    etag, content = respond(
+        view_etag, body,
         scan_id=scan_id,
         target_url=scan["target_url"],
-        risk_level=risk_level,
-        findings=filter_findings_for_tier(findings, effective_tier),
-        scan_type=result_source["scan_type"],
-        completed_at=result_source["completed_at"],
+        scan_type=scan["source_scan_type"],
+        completed_at=scan["source_completed_at"],
         paid_tier=effective_tier,
-        structured_report=filter_structured_report_for_tier(
-            structured_report, effective_tier
-        ),
         expires_in_days=expires_in_days,
     )
+    # private: reports are per-customer (and admin-unlocked via ?key=); no-cache: a tier change
+    # must be seen, so clients revalidate — cheaply, via If-None-Match.
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if not_modified(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
 
 
 @router.get("/{scan_id}/child-status")
 async def get_child_scan_status(scan_id: str):
     """Get the status of any child scans (pro/deep upgrades)."""
-    child_query = scans.select().where(
+    child_query = scans.select().with_only_columns(
+        scans.c.id, scans.c.status, scans.c.scan_type, scans.c.progress_json
+    ).where(
         scans.c.parent_scan_id == scan_id
     ).order_by(scans.c.created_at.desc())
     child = await database.fetch_one(child_query)
@@ -536,7 +364,7 @@ async def send_pdf_report(scan_id: str, key: str = ""):
     """Send PDF report to user's email (paid users, or admin via ?key=)."""
     from app.email_service import send_pdf_report_email
 
-    query = scans.select().where(scans.c.id == scan_id)
+    query = scans.select().with_only_columns(*SCAN_SUMMARY_COLUMNS).where(scans.c.id == scan_id)
     scan = await database.fetch_one(query)
 
     if not scan:
@@ -570,8 +398,8 @@ async def send_pdf_report(scan_id: str, key: str = ""):
 @router.get("/{scan_id}/download-pdf")
 async def download_pdf_report(scan_id: str, key: str = ""):
     """Download PDF report (paid users, or admin via ?key=)."""
-    query = scans.select().where(scans.c.id == scan_id)
-    scan = await database.fetch_one(query)
+    # The scan, plus results/progress of its newest completed child (else its own), in one query.
+    scan = await resolve_report(scan_id, "results_json", "progress_json")
 
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
@@ -582,21 +410,15 @@ async def download_pdf_report(scan_id: str, key: str = ""):
     is_admin = bool(settings.admin_api_key) and key == settings.admin_api_key
     if not scan["paid_tier"] and not is_admin:
         raise HTTPException(status_code=403, detail="PDF reports are only available for paid scans")
-
-    # Get results (check for child scan results like the results endpoint)
-    child_query = scans.select().where(
-        (scans.c.parent_scan_id == scan_id) & (scans.c.status == "completed")
-    ).order_by(scans.c.completed_at.desc())
-    child_scan = await database.fetch_one(child_query)
-
-    result_source = child_scan if child_scan else scan
-    results = json.loads(result_source["results_json"]) if result_source["results_json"] else {}
+    if scan["results_json"] is None and await restore_scan(scan["source_id"]):
+        scan = await resolve_report(scan_id, "results_json", "progress_json")
+    results = json.loads(scan["results_json"]) if scan["results_json"] else {}
 
     from app.pdf_generator import generate_pdf_report
 
     # Extract tool count from progress data for the PDF stats
     tools_executed = 0
-    progress_raw = result_source["progress_json"] if result_source["progress_json"] else None
+    progress_raw = scan["progress_json"] if scan["progress_json"] else None
     if progress_raw:
         try:
             prog = json.loads(progress_raw)
@@ -609,9 +431,9 @@ async def download_pdf_report(scan_id: str, key: str = ""):
         "target_url": scan["target_url"],
         "email": scan["email"],
         "paid_tier": scan["paid_tier"] or ("unlock" if is_admin else None),
-        "scan_type": result_source["scan_type"],
+        "scan_type": scan["source_scan_type"],
         "created_at": str(scan["created_at"]),
-        "completed_at": str(result_source["completed_at"]),
+        "completed_at": str(scan["source_completed_at"]),
         "tools_executed": tools_executed,
     }
 
@@ -638,7 +460,7 @@ async def admin_dashboard(key: str = "", format: str = "html", limit: int = 250)
     limit = max(1, min(limit, 2000))
 
     # Status totals over ALL scans (not just the displayed page).
-    summary = {"pending": 0, "running": 0, "completed": 0, "failed": 0}
+    summary = {"pending": 0, "running": 0, "postprocessing": 0, "completed": 0, "failed": 0}
     for r in await database.fetch_all(
         sa.select(scans.c.status, sa.func.count().label("n")).group_by(scans.c.status)
     ):
@@ -646,7 +468,8 @@ async def admin_dashboard(key: str = "", format: str = "html", limit: int = 250)
 
     # Most-recent `limit` scans for the table.
     all_scans = await database.fetch_all(
-        scans.select().order_by(scans.c.created_at.desc()).limit(limit)
+        scans.select().with_only_columns(*SCAN_SUMMARY_COLUMNS, scans.c.progress_json)
+        .order_by(scans.c.created_at.desc()).limit(limit)
     )
 
     scan_list = []
@@ -663,7 +486,7 @@ async def admin_dashboard(key: str = "", format: str = "html", limit: int = 250)
             "created_at": str(s["created_at"]),
             "completed_at": str(s["completed_at"]) if s["completed_at"] else None,
         }
-        if status in ("running", "completed", "failed", "cancelling") and s["progress_json"]:
+        if status in ("running", "postprocessing", "completed", "failed", "cancelling") and s["progress_json"]:
             progress = json.loads(s["progress_json"])
             scan_info["cost"] = progress.get("cost", 0)
             scan_info["tools"] = progress.get("tools", 0)
@@ -672,16 +495,19 @@ async def admin_dashboard(key: str = "", format: str = "html", limit: int = 250)
         scan_list.append(scan_info)
 
     if format == "json":
+        from app.compression import compression_stats
         return {"summary": summary, "total": sum(summary.values()),
-                "showing": len(all_scans), "scans": scan_list}
+                "showing": len(all_scans), "scans": scan_list,
+                "blob_compression": compression_stats(), "dns": resolver_stats(),
+                "result_views": view_stats()}
 
     # Build the polished HTML dashboard.
     from datetime import datetime, timezone
     import html as _h
 
     status_colors = {
-        "pending": "#eab308", "running": "#06b6d4", "completed": "#22c55e",
-        "failed": "#ef4444", "cancelling": "#f97316",
+        "pending": "#eab308", "running": "#06b6d4", "postprocessing": "#8b5cf6",
+        "completed": "#22c55e", "failed": "#ef4444", "cancelling": "#f97316",
     }
 
     def _fmt_dt(dt):
@@ -720,12 +546,12 @@ async def admin_dashboard(key: str = "", format: str = "html", limit: int = 250)
         sid = s["id"]
         if st in ("completed", "failed"):
             dur = _fmt_dur(s["created_at"], s["completed_at"])
-        elif st in ("running", "cancelling"):
+        elif st in ("running", "postprocessing", "cancelling"):
             dur = _fmt_dur(s["created_at"], None)
         else:
             dur = "—"
         acts = ""
-        if st in ("running", "pending", "cancelling"):
+        if st in ("running", "pending", "postprocessing", "cancelling"):
             acts += f'<a class="act av" href="{settings.frontend_url}/scan/{sid}" target="_blank">View</a>'
         if st == "completed":
             acts += f'<a class="act ar" href="{settings.frontend_url}/results/{sid}" target="_blank">Results</a>'
@@ -834,23 +660,18 @@ async def admin_full_report(scan_id: str, key: str = ""):
     if not settings.admin_api_key or key != settings.admin_api_key:
         raise HTTPException(status_code=403, detail="Forbidden")
 
-    scan = await database.fetch_one(scans.select().where(scans.c.id == scan_id))
+    # Prefer a completed pro/deep child scan's results, like the /results endpoint does.
+    scan = await resolve_report(scan_id, "results_json")
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
-
-    # Prefer a completed pro/deep child scan's results, like the /results endpoint does.
-    child = await database.fetch_one(
-        scans.select()
-        .where((scans.c.parent_scan_id == scan_id) & (scans.c.status == "completed"))
-        .order_by(scans.c.completed_at.desc())
-    )
-    src = child if child else scan
-    results = json.loads(src["results_json"]) if src["results_json"] else {}
+    if scan["results_json"] is None and await restore_scan(scan["source_id"]):
+        scan = await resolve_report(scan_id, "results_json")
+    results = json.loads(scan["results_json"]) if scan["results_json"] else {}
     return {
         "scan_id": scan_id,
         "status": scan["status"],
         "target_url": scan["target_url"],
-        "scan_type": src["scan_type"],
+        "scan_type": scan["source_scan_type"],
         "results": results,
     }
 
@@ -867,7 +688,9 @@ async def admin_unlock_scan(scan_id: str, key: str = "", tier: str = "unlock"):
     if tier not in ("unlock", "pro", "deep", "free", "lock"):
         raise HTTPException(status_code=400, detail="Invalid tier")
 
-    scan = await database.fetch_one(scans.select().where(scans.c.id == scan_id))
+    scan = await database.fetch_one(
+        scans.select().with_only_columns(scans.c.id).where(scans.c.id == scan_id)
+    )
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
 
@@ -877,6 +700,9 @@ async def admin_unlock_scan(scan_id: str, key: str = "", tier: str = "unlock"):
     await database.execute(
         scans.update().where(scans.c.id == scan_id).values(paid_tier=new_tier)
     )
+    await invalidate(scan_id)
+    if new_tier:
+        await restore_scan(scan_id)
     return {"success": True, "scan_id": scan_id, "paid_tier": new_tier}
 
 
@@ -887,19 +713,33 @@ async def admin_cancel_scan(scan_id: str, key: str = ""):
         raise HTTPException(status_code=403, detail="Forbidden")
 
     scan = await database.fetch_one(
-        scans.select().where(scans.c.id == scan_id)
+        scans.select().with_only_columns(scans.c.status).where(scans.c.id == scan_id)
     )
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
 
+    if scan["status"] == "pending":
+        # Not picked up yet: fail it outright (guarded, in case the worker claims it meanwhile)
+        await database.execute(
+            scans.update()
+            .where((scans.c.id == scan_id) & (scans.c.status == "pending"))
+            .values(
+                status="failed",
+                results_json=json.dumps({"error": "cancelled", "message": "Scan cancelled by admin."}),
+                completed_at=datetime.now(),
+            )
+        )
+        return {"success": True, "message": f"Scan {scan_id} cancelled"}
+
     if scan["status"] != "running":
         raise HTTPException(status_code=400, detail=f"Scan is not running (status: {scan['status']})")
 
-    # Set to cancelling — the worker's progress loop will detect this and cancel the task
+    # Set to cancelling — the worker checks the status every scan_cancel_poll_seconds, stops
+    # the agent (or kills the CLI process group) and finalizes with partial results
     await database.execute(
         scans.update()
-        .where(scans.c.id == scan_id)
-        .values(status="cancelling")
+        .where((scans.c.id == scan_id) & (scans.c.status == "running"))
+        .values(status=CANCEL_STATUS)
     )
 
     return {"success": True, "message": f"Scan {scan_id} is being cancelled"}
@@ -1061,7 +901,12 @@ async def admin_analytics(key: str = "", format: str = "html"):
 
     from collections import Counter
 
-    all_scans = await database.fetch_all(scans.select())
+    all_scans = await database.fetch_all(
+        scans.select().with_only_columns(
+            scans.c.status, scans.c.email, scans.c.paid_tier, scans.c.parent_scan_id,
+            scans.c.utm_source, scans.c.referrer,
+        )
+    )
     # Attribute on root scans only (child pro/deep scans inherit their parent's source).
     root_scans = [s for s in all_scans if not s["parent_scan_id"]]
     total_scans = len(root_scans)
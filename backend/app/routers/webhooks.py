@@ -1,7 +1,7 @@
 import stripe
 from fastapi import APIRouter, Request, HTTPException
 from app.config import settings
-from app.database import database, scans
+from app.database import database, scans, SCAN_PAYMENT_COLUMNS
 from app.payments import apply_paid_tier
 from app.email_service import send_payment_received_email, send_deep_scan_started_email
 
@@ -51,7 +51,9 @@ async def handle_payment(obj: dict, payment_id: str):
     if not scan_id or not tier:
         return
 
-    scan = await database.fetch_one(scans.select().where(scans.c.id == scan_id))
+    scan = await database.fetch_one(
+        scans.select().with_only_columns(*SCAN_PAYMENT_COLUMNS).where(scans.c.id == scan_id)
+    )
     if not scan:
         print(f"[webhook] Scan not found: {scan_id}")
         return
@@ -0,0 +1,106 @@
+"""
+Scan control - wall-clock budget and stall watchdog for in-process Strix scans.
+
+Only the CLI adapter had a wall-clock limit; an in-process scan whose agent deadlocked could
+hold the worker's only slot forever. ScanWatchdog is polled from a small task next to the
+scan. It trips when either
+
+- the tier's wall-clock budget (settings.tier_*_wall_clock_minutes) runs out ("timeout"), or
+- no new tool executions and no new token usage have appeared for
+  settings.scan_stall_minutes ("stalled"),
+
+and then escalates the same way the cost limit does: on_wrap_up(reason) first (tell the
+agent to finish with what it has), on_cancel(reason) once settings.scan_stop_grace_seconds
+have passed without the scan ending on its own.
+
+Time comes from an injectable clock so the logic is unit-tested without waiting (see
+tests/test_scan_control.py).
+
+watch_for_cancel() is the other half of admin cancel: POST /scans/admin/cancel/{id} only
+flips the row to "cancelling" (the API and the worker are separate processes), and this
+one-column primary-key poll notices it within settings.scan_cancel_poll_seconds so the
+runner can stop the agent / kill the CLI process group and finalize partial results.
+"""
+
+import asyncio
+import time
+from typing import Callable
+
+from app.config import settings
+
+CANCEL_STATUS = "cancelling"
+
+
+class ScanWatchdog:
+    def __init__(
+        self,
+        scan_id: str,
+        wall_clock_seconds: float,
+        stall_seconds: float,
+        grace_seconds: float,
+        on_wrap_up: Callable[[str], None],
+        on_cancel: Callable[[str], None],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.scan_id = scan_id
+        self.wall_clock_seconds = wall_clock_seconds
+        self.stall_seconds = stall_seconds
+        self.grace_seconds = grace_seconds
+        self.on_wrap_up = on_wrap_up
+        self.on_cancel = on_cancel
+        self._clock = clock
+        self.started = clock()
+        self.last_activity = self.started
+        self._signal: tuple | None = None
+        self.reason: str | None = None  # "timeout" / "stalled" once tripped
+        self.triggered_at: float | None = None
+        self.cancelled = False
+
+    def observe(self, tools: int, tokens: int) -> None:
+        """Record the scan's activity counters; any change counts as progress."""
+        signal = (tools, tokens)
+        if signal != self._signal:
+            self._signal = signal
+            self.last_activity = self._clock()
+
+    def check(self) -> str | None:
+        """Fire wrap-up / cancel when due. Returns "wrap_up" or "cancel" when it acted."""
+        now = self._clock()
+        if self.reason is None:
+            if self.wall_clock_seconds and now - self.started >= self.wall_clock_seconds:
+                self.reason = "timeout"
+            elif self.stall_seconds and now - self.last_activity >= self.stall_seconds:
+                self.reason = "stalled"
+            else:
+                return None
+            self.triggered_at = now
+            print(f"[watchdog] {self.scan_id}: {self.reason} after {now - self.started:.0f}s "
+                  f"(idle {now - self.last_activity:.0f}s) — wrapping up", flush=True)
+            self.on_wrap_up(self.reason)
+            return "wrap_up"
+        if not self.cancelled and now - self.triggered_at >= self.grace_seconds:
+            self.cancelled = True
+            print(f"[watchdog] {self.scan_id}: still running {self.grace_seconds:.0f}s after "
+                  f"wrap-up ({self.reason}) — cancelling", flush=True)
+            self.on_cancel(self.reason)
+            return "cancel"
+        return None
+
+
+async def watch_for_cancel(scan_id: str, on_cancel: Callable[[], None], interval: float | None = None) -> None:
+    """Poll the scan's status until it becomes "cancelling" (or the row is gone), then call on_cancel once."""
+    from app.database import database, scans
+
+    interval = settings.scan_cancel_poll_seconds if interval is None else interval
+    query = scans.select().with_only_columns(scans.c.status).where(scans.c.id == scan_id)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            row = await database.fetch_one(query)
+        except Exception as e:
+            print(f"[cancel] {scan_id}: status check failed: {e}", flush=True)
+            continue
+        if row is None or row["status"] == CANCEL_STATUS:
+            print(f"[cancel] {scan_id}: cancel requested — stopping scan", flush=True)
+            on_cancel()
+            return
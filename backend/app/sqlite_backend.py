@@ -0,0 +1,244 @@
+"""
+SQLite backend - the production profile for `databases` on a single SQLite file.
+
+The stock `databases` SQLite backend opens a fresh aiosqlite connection (and thread) for
+every query, in the default rollback-journal mode. The worker's progress writes every 5 s and
+the API's polling reads then contend on the journal lock, which surfaces as
+"database is locked". This backend keeps the same Database API but:
+
+- puts the file in WAL mode, so readers never block the writer (or each other), and creates
+  new files with auto_vacuum=INCREMENTAL so app/archive.py can hand freed pages back;
+- opens every connection with synchronous=NORMAL (safe under WAL), busy_timeout and mmap_size;
+- routes writes and transactions through ONE long-lived writer connection per process,
+  serialized by an asyncio lock, with transactions started as BEGIN IMMEDIATE so they take
+  the write lock up front instead of failing on a read→write upgrade;
+- serves plain reads from a small pool of read-only (query_only) connections (rows fetched
+  from an INSERT/UPDATE ... RETURNING go to the writer).
+
+app/database.py selects it for sqlite URLs when settings.sqlite_tuning is on; in-memory
+databases keep the stock backend. benchmarks/bench_sqlite_concurrency.py compares the two.
+"""
+
+import asyncio
+import sqlite3
+import typing
+
+import aiosqlite
+import databases
+from databases.backends.sqlite import SQLiteBackend, SQLiteConnection
+
+from app.config import settings
+
+
+def connection_pragmas(read_only: bool = False) -> list[str]:
+    """Per-connection PRAGMAs of the profile (journal_mode=WAL is set once, by the writer)."""
+    pragmas = [
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_bytes)}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=1")
+    return pragmas
+
+
+def tune_sqlite_connection(dbapi_connection: sqlite3.Connection) -> None:
+    """Apply the profile to a plain sqlite3 connection (the sync engine used by migrations)."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")  # takes effect only on a new, empty file
+    cursor.execute("PRAGMA journal_mode=WAL")
+    for pragma in connection_pragmas():
+        cursor.execute(pragma)
+    cursor.close()
+
+
+class _Pool:
+    """One writer connection plus up to ``readers`` read-only connections, opened lazily."""
+
+    def __init__(self, path: str, readers: int):
+        self.path = path
+        self.readers = max(1, readers)
+        self.writer: aiosqlite.Connection | None = None
+        self.writer_lock: asyncio.Lock | None = None
+        self._idle: list[aiosqlite.Connection] = []
+        self._slots: asyncio.Semaphore | None = None
+        self._open: list[aiosqlite.Connection] = []
+
+    async def _connect(self, read_only: bool) -> aiosqlite.Connection:
+        timeout = settings.sqlite_busy_timeout_ms / 1000
+        connection = aiosqlite.connect(self.path, isolation_level=None, timeout=timeout)
+        await connection.__aenter__()
+        if not read_only:
+            await connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await connection.execute("PRAGMA journal_mode=WAL")
+        for pragma in connection_pragmas(read_only):
+            await connection.execute(pragma)
+        self._open.append(connection)
+        return connection
+
+    async def open(self) -> None:
+        if self.writer is None:
+            self.writer_lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.readers)
+            self.writer = await self._connect(read_only=False)
+
+    async def close(self) -> None:
+        connections, self._open, self._idle = self._open, [], []
+        self.writer = self.writer_lock = self._slots = None
+        for connection in connections:
+            await connection.close()
+
+    async def acquire_reader(self) -> aiosqlite.Connection:
+        await self.open()
+        await self._slots.acquire()
+        try:
+            return self._idle.pop() if self._idle else await self._connect(read_only=True)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release_reader(self, connection: aiosqlite.Connection) -> None:
+        self._idle.append(connection)
+        self._slots.release()
+
+
+class TunedSQLiteConnection(SQLiteConnection):
+    """A `databases` connection that borrows pooled sqlite connections per statement."""
+
+    def __init__(self, pool: _Pool, dialect):
+        super().__init__(pool, dialect)
+        self._in_transaction = False
+
+    async def acquire(self) -> None:
+        await self._pool.open()  # real connections are borrowed per statement
+
+    async def release(self) -> None:
+        pass
+
+    async def _read(self, method, query):
+        if getattr(query, "is_dml", False):  # UPDATE ... RETURNING fetched as rows
+            return await self._write(method, query)
+        if self._in_transaction:  # read your own uncommitted writes
+            return await method(query)
+        self._connection = await self._pool.acquire_reader()
+        try:
+            return await method(query)
+        finally:
+            self._pool.release_reader(self._connection)
+            self._connection = None
+
+    async def _write(self, method, query):
+        if self._in_transaction:
+            return await method(query)
+        async with self._pool.writer_lock:
+            self._connection = self._pool.writer
+            try:
+                return await method(query)
+            finally:
+                self._connection = None
+
+    async def fetch_all(self, query):
+        return await self._read(super().fetch_all, query)
+
+    async def fetch_one(self, query):
+        return await self._read(super().fetch_one, query)
+
+    async def execute(self, query):
+        return await self._write(super().execute, query)
+
+    async def execute_many(self, queries):
+        if self._in_transaction:
+            return await super().execute_many(queries)
+        async with self._pool.writer_lock:
+            self._connection = self._pool.writer
+            try:
+                for query in queries:
+                    await super().execute(query)
+            finally:
+                self._connection = None
+
+    async def iterate(self, query) -> typing.AsyncGenerator[typing.Any, None]:
+        # Materialized through a reader: an open cursor must not pin a pooled connection.
+        for record in await self.fetch_all(query):
+            yield record
+
+    def transaction(self) -> "TunedSQLiteTransaction":
+        return TunedSQLiteTransaction(self)
+
+
+class TunedSQLiteTransaction:
+    """BEGIN IMMEDIATE on the writer (holding the process's writer lock until it ends);
+    nested transactions are savepoints on the same connection."""
+
+    def __init__(self, connection: TunedSQLiteConnection):
+        self._connection = connection
+        self._is_root = False
+        self._savepoint = ""
+
+    async def _run(self, sql: str) -> None:
+        await self._connection._connection.execute(sql)
+
+    async def start(self, is_root: bool, extra_options: dict) -> None:
+        conn = self._connection
+        self._is_root = is_root and not conn._in_transaction
+        if self._is_root:
+            await conn._pool.writer_lock.acquire()
+            conn._connection = conn._pool.writer
+            conn._in_transaction = True
+            try:
+                await self._run("BEGIN IMMEDIATE")
+            except BaseException:
+                self._end()
+                raise
+        else:
+            self._savepoint = f"SP_{id(self):x}"
+            await self._run(f"SAVEPOINT {self._savepoint}")
+
+    def _end(self) -> None:
+        conn = self._connection
+        conn._in_transaction = False
+        conn._connection = None
+        conn._pool.writer_lock.release()
+
+    async def commit(self) -> None:
+        if not self._is_root:
+            return await self._run(f"RELEASE SAVEPOINT {self._savepoint}")
+        try:
+            await self._run("COMMIT")
+        finally:
+            self._end()
+
+    async def rollback(self) -> None:
+        if not self._is_root:
+            await self._run(f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+            return await self._run(f"RELEASE SAVEPOINT {self._savepoint}")
+        try:
+            await self._run("ROLLBACK")
+        finally:
+            self._end()
+
+
+class TunedSQLiteBackend(SQLiteBackend):
+    def __init__(self, database_url, **options):
+        super().__init__(database_url, **options)
+        self._tuned_pool = _Pool(self._database_url.database, settings.sqlite_read_connections)
+
+    async def connect(self) -> None:
+        await self._tuned_pool.open()
+
+    async def disconnect(self) -> None:
+        await self._tuned_pool.close()
+
+    def connection(self) -> TunedSQLiteConnection:
+        return TunedSQLiteConnection(self._tuned_pool, self._dialect)
+
+
+class TunedDatabase(databases.Database):
+    SUPPORTED_BACKENDS = {**databases.Database.SUPPORTED_BACKENDS,
+                          "sqlite": "app.sqlite_backend:TunedSQLiteBackend"}
+
+
+def is_tunable(database_url: str) -> bool:
+    """File-backed SQLite URLs only — in-memory databases keep the stock backend."""
+    return (settings.sqlite_tuning and database_url.startswith("sqlite")
+            and ":memory:" not in database_url and "mode=memory" not in database_url)
@@ -33,16 +33,22 @@ import json
 import os
 import signal
 import time
+from datetime import datetime, timezone
 from pathlib import Path
 
 from app.config import settings
-from app.report_processor import process_scan_report
+from app.report_facts import collect_report_facts
+from app.scan_control import watch_for_cancel
 
 SANDBOX_IMAGE = "ghcr.io/usestrix/strix-sandbox:1.0.0"
 
 # Strix 1.0.x has no wall-clock flag; we impose one per scan mode (seconds) as a cost/hang
-# backstop and kill the process group when exceeded.
-_WALL_CLOCK_SECONDS = {"quick": 20 * 60, "pro": 90 * 60, "deep": 240 * 60}
+# backstop and kill the process group when exceeded. Same budgets as the in-process runner.
+_WALL_CLOCK_SECONDS = {
+    "quick": settings.tier_quick_wall_clock_minutes * 60,
+    "pro": settings.tier_pro_wall_clock_minutes * 60,
+    "deep": settings.tier_deep_wall_clock_minutes * 60,
+}
 
 # Poll interval for the run directory (seconds).
 _POLL_INTERVAL = 5
@@ -136,28 +142,29 @@ def extract_usage(run_json: dict) -> dict:
     }
 
 
-def interpret_result(exit_code: int, findings: list, structured_report, killed_reason: str | None):
+def interpret_result(exit_code: int, findings: list, report_markdown: str | None, killed_reason: str | None):
     """Turn (exit code, parsed artifacts, kill reason) into our worker result dict.
 
     Policy mirrors the fail-loud rule in strix_runner: a run with neither findings nor a
-    structured report is a failure, never a false 'clean'."""
+    report is a failure, never a false 'clean'. Successful results carry the report markdown
+    for the postprocessing stage (app/postprocess.py) to extract."""
     if killed_reason == "timeout" and not findings:
         return {"error": "timeout", "message": "Scan exceeded its time budget.", "findings": []}
 
-    if exit_code == 1 and not findings and not structured_report:
+    if killed_reason == "cancelled" and not findings and not report_markdown:
+        return {"error": "cancelled", "message": "Scan cancelled by admin.", "findings": []}
+
+    if exit_code == 1 and not findings and not report_markdown:
         return {"error": "strix_error", "message": "Strix exited with an error.", "findings": []}
 
-    if not findings and not structured_report:
+    if not findings and not report_markdown:
         return {
             "error": "no_report",
             "message": "Scan completed but produced no usable report or findings.",
             "findings": [],
         }
 
-    result = {"findings": findings}
-    if structured_report:
-        result["structured_report"] = structured_report
-    return result
+    return {"findings": findings, "report_markdown": report_markdown}
 
 
 def _tier_config(scan_type: str):
@@ -208,7 +215,9 @@ def _discover_run_dir(strix_runs: Path) -> Path | None:
     return max(subdirs, key=lambda d: d.stat().st_mtime)
 
 
-async def run_strix_cli_scan_async(target_url: str, scan_type: str = "quick", scan_id: str = "") -> dict:
+async def run_strix_cli_scan_async(
+    target_url: str, scan_type: str = "quick", scan_id: str = "", instructions: str = "",
+) -> dict:
     llm, scan_mode, cost_limit = _tier_config(scan_type)
     wall_clock = _WALL_CLOCK_SECONDS.get(scan_type, _WALL_CLOCK_SECONDS["quick"])
 
@@ -224,7 +233,9 @@ async def run_strix_cli_scan_async(target_url: str, scan_type: str = "quick", sc
     env["STRIX_TELEMETRY"] = "0"  # no PostHog/Scarf from a server
 
     cmd = ["strix", "-n", "-t", target_url, "-m", scan_mode]
-    print(f"[strix-cli] launching: {' '.join(cmd)} (llm={llm}, cost_limit=${cost_limit}, "
+    if instructions:
+        cmd += ["--instruction", instructions]
+    print(f"[strix-cli] launching: {' '.join(cmd[:7])} (llm={llm}, cost_limit=${cost_limit}, "
           f"wall_clock={wall_clock}s)", flush=True)
 
     try:
@@ -236,14 +247,32 @@ async def run_strix_cli_scan_async(target_url: str, scan_type: str = "quick", sc
     except FileNotFoundError:
         return {"error": "strix_missing", "message": "strix CLI not found on PATH", "findings": []}
 
+    started_at = datetime.now(timezone.utc)
     start = time.monotonic()
     run_dir: Path | None = None
     killed_reason: str | None = None
     last_usage: dict = {"cost": 0.0, "input_tokens": 0, "output_tokens": 0}
 
+    def _kill(reason: str) -> None:
+        nonlocal killed_reason
+        killed_reason = killed_reason or reason
+        print(f"[strix-cli] killing scan ({reason})", flush=True)
+        try:
+            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, OSError):
+            pass
+
+    # Admin cancel kills the process group straight away instead of waiting for the next poll
+    cancel_task = None
+    if scan_id:
+        cancel_task = asyncio.create_task(watch_for_cancel(scan_id, lambda: _kill("cancelled")))
+
     while True:
         if run_dir is None:
             run_dir = _discover_run_dir(strix_runs)
+            if run_dir is not None and scan_id:
+                from app.artifacts import record_run_start
+                await record_run_start(scan_id, run_dir)
 
         findings_live: list = []
         if run_dir is not None:
@@ -267,12 +296,10 @@ async def run_strix_cli_scan_async(target_url: str, scan_type: str = "quick", sc
         except asyncio.TimeoutError:
             continue  # still running — poll again
 
-    if killed_reason:
-        print(f"[strix-cli] killing scan ({killed_reason})", flush=True)
-        try:
-            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
-        except (ProcessLookupError, PermissionError, OSError):
-            pass
+    if cancel_task:
+        cancel_task.cancel()
+    if killed_reason and proc.returncode is None:
+        _kill(killed_reason)
         await proc.wait()
 
     exit_code = proc.returncode if proc.returncode is not None else 1
@@ -283,17 +310,29 @@ async def run_strix_cli_scan_async(target_url: str, scan_type: str = "quick", sc
         return {"error": "strix_no_output", "message": "Strix produced no run directory.", "findings": []}
 
     findings = parse_vulnerabilities(run_dir)
+    if scan_id:
+        from app.artifacts import record_run_finish
+        await record_run_finish(scan_id, run_dir)
 
-    structured_report = None
+    report_markdown = None
     report_md = run_dir / "penetration_test_report.md"
     if report_md.exists():
         try:
-            structured_report = process_scan_report(report_md.read_text(encoding="utf-8"), target_url)
-        except Exception as e:
-            print(f"[strix-cli] report processing failed: {e}", flush=True)
+            report_markdown = report_md.read_text(encoding="utf-8")
+        except OSError as e:
+            print(f"[strix-cli] reading report failed: {e}", flush=True)
 
     await _write_progress(scan_id, last_usage["cost"], findings, "report", last_usage)
     print(f"[strix-cli] exit={exit_code} killed={killed_reason} findings={len(findings)} "
-          f"report={'yes' if structured_report else 'no'} cost=${last_usage['cost']:.4f}", flush=True)
+          f"report={'yes' if report_markdown else 'no'} cost=${last_usage['cost']:.4f}", flush=True)
 
-    return interpret_result(exit_code, findings, structured_report, killed_reason)
+    result = interpret_result(exit_code, findings, report_markdown, killed_reason)
+    if "error" not in result:
+        # The CLI exposes no tool-execution log, so facts come from findings + markdown.
+        result["report_facts"] = collect_report_facts(
+            target_url, findings=findings, markdown=report_markdown or "", started_at=started_at,
+        )
+        result["run_dir"] = str(run_dir)
+        if killed_reason:
+            result["stop_reason"] = killed_reason  # partial results (cost/time limit or cancel)
+    return result
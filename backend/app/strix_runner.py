@@ -1,16 +1,29 @@
 """
 Strix Runner - Clean integration following original Strix CLI pattern.
-Runs scans via Python API with progress tracking and report processing.
+Runs scans via Python API with progress tracking; the report markdown and locally computed
+report facts are handed to the postprocessing stage (app/postprocess.py) for LLM extraction.
 """
 
 import asyncio
 import csv
 import json
 import os
+import time
 from pathlib import Path
 
 from app.config import settings
-from app.report_processor import process_scan_report
+from app.activity import rollup_activity
+from app.budget import (
+    AdaptiveController,
+    BudgetGovernor,
+    activate_governor,
+    deactivate_governor,
+    install_usage_hook,
+)
+from app.findings import merge_findings
+from app.preflight import preflight_context
+from app.report_facts import collect_report_facts
+from app.scan_control import ScanWatchdog, watch_for_cancel
 
 
 def _categorize_action(tool_name: str, args: dict, cmd_lower: str = "") -> tuple[str, str]:
@@ -304,51 +317,110 @@ _max_cost_seen = {}  # scan_id -> float
 _max_tokens_seen = {}
 
 
+def _request_wrap_up(agent, message: str, extra_iterations: int = 8) -> None:
+    """Tell the root agent to finish up and cap it at a few more iterations."""
+    try:
+        agent.state.add_message("user", message)
+        # Guard against None (Strix internals occasionally leave these unset,
+        # which previously crashed the scan with a NoneType comparison error).
+        _cur_iter = getattr(agent.state, "iteration", 0) or 0
+        _cur_max = getattr(agent.state, "max_iterations", None)
+        _wrapup_cap = _cur_iter + extra_iterations
+        agent.state.max_iterations = (
+            min(_cur_max, _wrapup_cap) if _cur_max is not None else _wrapup_cap
+        )
+    except Exception as e:
+        print(f"[strix] Failed to send wrap-up message: {e}", flush=True)
+
+
+_COST_WRAP_UP_MESSAGE = (
+    "URGENT COST LIMIT REACHED: You have exceeded the budget for this scan. "
+    "Immediately wrap up all work. Tell all sub-agents to finish their current "
+    "tasks and call agent_finish NOW. Then generate your final report and call "
+    "finish_scan. No new tests or scans — wrap up with what you have."
+)
+
+
+def _apply_adjustment(agent, changes: dict) -> None:
+    """Apply an AdaptiveController decision to the running scan."""
+    if "max_agents" in changes:
+        # Read by the patched create_agent on every spawn (apply_strix_patches.py)
+        os.environ["STRIX_MAX_AGENTS"] = str(changes["max_agents"])
+    if "max_iterations" in changes:
+        try:
+            agent.state.max_iterations = changes["max_iterations"]
+        except Exception as e:
+            print(f"[adaptive] Failed to set max_iterations: {e}", flush=True)
+
+
+_STOP_WRAP_UP_MESSAGES = {
+    "timeout": (
+        "URGENT TIME LIMIT REACHED: This scan has used its time budget. Immediately wrap up "
+        "all work. Tell all sub-agents to finish and call agent_finish NOW, then generate "
+        "your final report and call finish_scan with what you have."
+    ),
+    "stalled": (
+        "NO PROGRESS DETECTED: No tool activity for several minutes. If you are waiting on "
+        "sub-agents, stop waiting. Wrap up now: generate your final report from what you have "
+        "and call finish_scan."
+    ),
+}
+
+
+async def _watch_scan(watchdog, tracer, interval: float = 5.0):
+    """Feed the watchdog tool/token activity; it fires wrap-up and, after the grace period, cancel."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            total = tracer.get_total_llm_stats().get("total", {})
+            watchdog.observe(
+                len(tracer.tool_executions),
+                total.get("input_tokens", 0) + total.get("output_tokens", 0),
+            )
+            watchdog.check()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[watchdog] Error: {e}", flush=True)
+
+
 async def _update_progress(
     scan_id: str, tracer, vulnerabilities: list,
-    cost_limit: float = 0, agent=None,
+    governor=None, controller=None, agent=None,
 ):
     """Write scan progress to database periodically."""
     from app.database import database, scans
 
-    _cost_warning_sent = False
-
+    started = time.monotonic()
     while True:
         await asyncio.sleep(5)
         try:
             stats = tracer.get_total_llm_stats()
             total = stats.get("total", {})
 
-            # Use tracer cost but track max-seen so it never decreases
+            # Use tracer cost but track max-seen so it never decreases. The budget governor
+            # enforces limits per LLM call; feeding it the tracer total here is only a backstop.
             raw_cost = total.get("cost", 0.0)
+            if governor is not None:
+                governor.observe_total(raw_cost)
+                raw_cost = max(raw_cost, governor.spent)
             if scan_id not in _max_cost_seen:
                 _max_cost_seen[scan_id] = 0.0
             _max_cost_seen[scan_id] = max(_max_cost_seen[scan_id], raw_cost)
             current_cost = _max_cost_seen[scan_id]
 
-            # Check cost limit — tell the agent to wrap up
-            if cost_limit > 0 and current_cost >= cost_limit and agent and not _cost_warning_sent:
-                _cost_warning_sent = True
-                print(f"[cost] Cost ${current_cost:.2f} exceeded limit ${cost_limit:.2f}, telling agent to wrap up", flush=True)
-                try:
-                    # Inject wrap-up message and reduce remaining iterations
-                    agent.state.add_message("user",
-                        "URGENT COST LIMIT REACHED: You have exceeded the budget for this scan. "
-                        "Immediately wrap up all work. Tell all sub-agents to finish their current "
-                        "tasks and call agent_finish NOW. Then generate your final report and call "
-                        "finish_scan. No new tests or scans — wrap up with what you have."
-                    )
-                    # Give the agent a few iterations to wrap up, then it hits max.
-                    # Guard against None (Strix internals occasionally leave these unset,
-                    # which previously crashed the scan with a NoneType comparison error).
-                    _cur_iter = getattr(agent.state, "iteration", 0) or 0
-                    _cur_max = getattr(agent.state, "max_iterations", None)
-                    _wrapup_cap = _cur_iter + 8
-                    agent.state.max_iterations = (
-                        min(_cur_max, _wrapup_cap) if _cur_max is not None else _wrapup_cap
-                    )
-                except Exception as e:
-                    print(f"[cost] Failed to send wrap-up message: {e}", flush=True)
+            # Retune agent cap / iteration budget toward the target cost and duration
+            # (hands off once the cost limit's wrap-up has taken over)
+            if controller is not None and agent is not None and not (governor and governor.soft_at):
+                changes = controller.step(
+                    elapsed=time.monotonic() - started,
+                    spent=current_cost,
+                    findings=len(vulnerabilities),
+                    iteration=getattr(agent.state, "iteration", 0) or 0,
+                    max_iterations=getattr(agent.state, "max_iterations", None) or controller.max_iterations,
+                )
+                if changes:
+                    _apply_adjustment(agent, changes)
 
             # Track max tokens (never decrease)
             current_tokens = total.get("input_tokens", 0)
@@ -415,15 +487,10 @@ async def _update_progress(
                     "status": exec_data.get("status", "running"),
                 })
 
-            # Sort by timestamp and take last 100
+            # Sort by timestamp, collapse runs of similar actions and keep the last 100
+            # (line numbers still count raw actions)
             all_activity.sort(key=lambda x: x["ts"])
-            total_activity = len(all_activity)
-            recent_activity = all_activity[-100:]
-
-            # Add line numbers (offset from total)
-            start_num = max(1, total_activity - len(recent_activity) + 1)
-            for i, entry in enumerate(recent_activity):
-                entry["line"] = start_num + i
+            recent_activity = rollup_activity(all_activity, max_entries=100)
 
             progress = {
                 "agents": len(tracer.agents),
@@ -438,7 +505,7 @@ async def _update_progress(
                     {"title": v.get("title", ""), "severity": v.get("severity", "")}
                     for v in vulnerabilities
                 ],
-                "recent_activity": recent_activity[-100:],
+                "recent_activity": recent_activity,
                 "current_phase": phase,
             }
 
@@ -456,18 +523,21 @@ async def _update_progress(
 async def run_strix_scan_async(
     target_url: str,
     scan_type: str = "quick",
-    scan_id: str = ""
+    scan_id: str = "",
+    preflight: dict | None = None,
 ) -> dict:
     """
     Run Strix scan using Python API (follows original CLI pattern).
-    Returns parsed results or error dict.
+    Returns parsed results or error dict. ``preflight`` is the worker's reachability probe
+    (app/preflight.py); when given, its summary goes to the agent as scan instructions.
     """
+    instructions = preflight_context(preflight) if preflight else ""
     # Durable path: route to the supported headless-CLI adapter when enabled. The in-process
     # code below targets the 0.x internals and breaks on strix-agent >= 1.0 (see the rebuild
     # plan). Flag stays off until the adapter is validated on a live 1.0.x + Docker host.
     if settings.strix_use_cli:
         from app.strix_adapter import run_strix_cli_scan_async
-        return await run_strix_cli_scan_async(target_url, scan_type, scan_id)
+        return await run_strix_cli_scan_async(target_url, scan_type, scan_id, instructions)
 
     # Configure scan mode, iterations, cost limit, agent cap, and wait timeout per tier
     tier_config = {
@@ -476,12 +546,19 @@ async def run_strix_scan_async(
         "deep":  (settings.tier_deep_llm,  settings.tier_deep_iterations,  settings.tier_deep_mode,  settings.tier_deep_cost_limit,  settings.tier_deep_max_agents,  settings.tier_deep_wait_timeout),
     }
     llm, max_iterations, scan_mode, cost_limit, max_agents, wait_timeout = tier_config.get(scan_type, tier_config["quick"])
+    wall_clock_minutes = {
+        "quick": settings.tier_quick_wall_clock_minutes,
+        "pro": settings.tier_pro_wall_clock_minutes,
+        "deep": settings.tier_deep_wall_clock_minutes,
+    }.get(scan_type, settings.tier_quick_wall_clock_minutes)
     os.environ["STRIX_LLM"] = llm
     os.environ["LLM_API_KEY"] = settings.llm_api_key
     os.environ["STRIX_MAX_AGENTS"] = str(max_agents)
     os.environ["STRIX_AGENT_WAIT_TIMEOUT"] = str(wait_timeout)
 
     progress_task = None
+    watchdog_task = None
+    cancel_task = None
 
     try:
         from strix.agents.StrixAgent import StrixAgent
@@ -529,7 +606,7 @@ async def run_strix_scan_async(
         scan_config = {
             "scan_id": run_name,
             "targets": targets_info,
-            "user_instructions": "",
+            "user_instructions": instructions,
             "run_name": run_name,
         }
 
@@ -538,6 +615,9 @@ async def run_strix_scan_async(
         tracer.set_scan_config(scan_config)
         set_global_tracer(tracer)
 
+        from app.artifacts import record_run_start
+        await record_run_start(scan_id, Path(f"strix_runs/{run_name}"), run_name)
+
         # Collect vulnerabilities via callback
         vulnerabilities = []
 
@@ -558,13 +638,65 @@ async def run_strix_scan_async(
         print(f"[strix] Launching agent (cost limit: ${cost_limit:.2f})...")
         agent = StrixAgent(agent_config)
 
-        # Start progress tracking with cost limit and agent reference
+        # Cost limits are enforced per LLM call: graceful wrap-up at the tier limit, hard
+        # cancel at budget_hard_multiplier x the limit (partial results are still finalized).
+        governor = BudgetGovernor(
+            scan_id, cost_limit, settings.budget_hard_multiplier,
+            on_soft=lambda: _request_wrap_up(agent, _COST_WRAP_UP_MESSAGE),
+            loop=asyncio.get_running_loop(),
+        )
+        install_usage_hook()
+        activate_governor(governor)
+        controller = None
+        if settings.adaptive_budget_enabled:
+            controller = AdaptiveController(
+                scan_id, cost_limit, wall_clock_minutes * 60 * settings.adaptive_target_fraction,
+                max_agents, max_iterations,
+            )
+
+        # Start progress tracking (also the budget backstop and adaptive controller)
         if scan_id:
             progress_task = asyncio.create_task(
-                _update_progress(scan_id, tracer, vulnerabilities, cost_limit, agent)
+                _update_progress(scan_id, tracer, vulnerabilities, governor, controller, agent)
             )
 
-        result = await agent.execute_scan(scan_config)
+        scan_task = asyncio.create_task(agent.execute_scan(scan_config))
+        stop_reason = None
+
+        def stop_scan(reason: str) -> None:
+            # Hard stop (cost, time, stall, admin cancel): cancel the agent, then finalize
+            # partial results.
+            nonlocal stop_reason
+            if stop_reason is None:
+                stop_reason = reason
+            scan_task.cancel()
+
+        governor.on_hard = lambda: stop_scan("cost_limit")
+
+        # Wall-clock budget and stall detection: wrap-up first, hard cancel after a grace period
+        watchdog = ScanWatchdog(
+            scan_id, wall_clock_minutes * 60, settings.scan_stall_minutes * 60,
+            settings.scan_stop_grace_seconds,
+            on_wrap_up=lambda reason: _request_wrap_up(agent, _STOP_WRAP_UP_MESSAGES[reason]),
+            on_cancel=stop_scan,
+        )
+        watchdog_task = asyncio.create_task(_watch_scan(watchdog, tracer))
+        # Admin cancel (status "cancelling") is picked up within scan_cancel_poll_seconds
+        if scan_id:
+            cancel_task = asyncio.create_task(watch_for_cancel(scan_id, lambda: stop_scan("cancelled")))
+
+        try:
+            result = await scan_task
+        except asyncio.CancelledError:
+            if stop_reason is None or asyncio.current_task().cancelling():
+                raise
+            print(f"[strix] Scan stopped ({stop_reason}) — finalizing partial results", flush=True)
+            result = {"success": True}
+        finally:
+            deactivate_governor(governor)
+            watchdog_task.cancel()
+            if cancel_task:
+                cancel_task.cancel()
         print(f"[strix] execute_scan returned: type={type(result).__name__}, keys={list(result.keys()) if isinstance(result, dict) else 'N/A'}", flush=True)
         if isinstance(result, dict):
             print(f"[strix] result success={result.get('success', 'not set')}, error={result.get('error', 'none')}", flush=True)
@@ -596,6 +728,8 @@ async def run_strix_scan_async(
                     progress = json.loads(existing["progress_json"]) if existing and existing["progress_json"] else {}
                     progress["cost"] = round(err_cost, 4)
                     progress["active_agents"] = 0
+                    governor.observe_total(err_cost)
+                    progress["budget"] = governor.summary()
                     await database.execute(scans_table.update().where(scans_table.c.id == scan_id).values(progress_json=json.dumps(progress)))
                 except Exception:
                     pass
@@ -608,56 +742,26 @@ async def run_strix_scan_async(
             }
 
         # Parse results from output directory (files should exist now after flush)
-        findings = parse_strix_run_dir(run_name)
-        print(f"[strix] File-based findings: {len(findings)}", flush=True)
+        file_findings = parse_strix_run_dir(run_name)
+        print(f"[strix] File-based findings: {len(file_findings)}", flush=True)
         print(f"[strix] Callback vulnerabilities: {len(vulnerabilities)}", flush=True)
         print(f"[strix] Tracer in-memory vulnerability_reports: {len(tracer.vulnerability_reports)}", flush=True)
 
-        # Also read directly from tracer memory (in case disk writes failed silently)
-        if tracer.vulnerability_reports:
-            tracer_findings = [
-                {
-                    "title": v.get("title", "Unknown"),
-                    "severity": normalize_severity(v.get("severity", "medium")),
-                    "endpoint": v.get("endpoint", ""),
-                    "impact": v.get("impact", v.get("description", "")),
-                    "reproduction_steps": v.get("technical_analysis", ""),
-                    "poc": v.get("poc_script_code", v.get("poc_description", "")),
-                    "fix_guidance": v.get("remediation_steps", ""),
-                }
-                for v in tracer.vulnerability_reports
-            ]
-            existing_titles = {f.get("title", "").lower() for f in findings}
-            for tf in tracer_findings:
-                if tf["title"].lower() not in existing_titles:
-                    findings.append(tf)
-            print(f"[strix] After tracer merge: {len(findings)}", flush=True)
-
-        # Also include callback vulnerabilities (merge with existing findings)
-        if vulnerabilities:
-            callback_findings = [
-                {
-                    "title": v.get("title", "Unknown"),
-                    "severity": normalize_severity(v.get("severity", "medium")),
-                    "endpoint": v.get("endpoint", ""),
-                    "impact": v.get("impact", v.get("description", "")),
-                    "reproduction_steps": v.get("technical_analysis", ""),
-                    "poc": v.get("poc_script_code", v.get("poc_description", "")),
-                    "fix_guidance": v.get("remediation_steps", ""),
-                }
-                for v in vulnerabilities
-            ]
-            existing_titles = {f.get("title", "").lower() for f in findings}
-            for cf in callback_findings:
-                if cf["title"].lower() not in existing_titles:
-                    findings.append(cf)
+        # Merge disk, tracer memory (in case disk writes failed silently) and callback findings
+        # by fingerprint, keeping the most complete fields from each source.
+        findings = merge_findings(
+            file_findings,
+            [_finding_from_report(v) for v in tracer.vulnerability_reports],
+            [_finding_from_report(v) for v in vulnerabilities],
+        )
+        print(f"[strix] After fingerprint merge: {len(findings)}", flush=True)
 
         # Filter non-findings (but keep anything with a valid title and severity)
         pre_filter_count = len(findings)
         findings = [f for f in findings if _is_real_finding(f)]
         print(f"[strix] After merge: {pre_filter_count}, after filter: {len(findings)}", flush=True)
         if pre_filter_count > 0 and len(findings) == 0:
-            print(f"[strix] WARNING: All findings filtered out! Titles were: {[f.get('title', '') for f in parse_strix_run_dir(run_name)]}", flush=True)
+            print(f"[strix] WARNING: All findings filtered out! Titles were: {[f.get('title', '') for f in file_findings]}", flush=True)
 
         # Write final progress before cancelling
         if progress_task:
@@ -671,6 +775,7 @@ async def run_strix_scan_async(
                 final_cost = max(
                     final_total.get("cost", 0.0),
                     _max_cost_seen.get(scan_id, 0.0),
+                    governor.spent,
                 )
                 final_tokens = max(
                     final_total.get("input_tokens", 0),
@@ -688,12 +793,19 @@ async def run_strix_scan_async(
                 progress["output_tokens"] = final_total.get("output_tokens", 0)
                 progress["active_agents"] = 0
                 progress["active_agent_list"] = []
+                governor.observe_total(final_cost)
+                progress["budget"] = governor.summary()
+                if controller is not None:
+                    progress["budget"]["adjustments"] = controller.adjustments
+                if stop_reason:
+                    progress["stop_reason"] = stop_reason
                 await database.execute(
                     scans.update()
                     .where(scans.c.id == scan_id)
                     .values(progress_json=json.dumps(progress))
                 )
-                print(f"[strix] Final cost: ${final_cost:.4f}", flush=True)
+                print(f"[strix] Final cost: ${final_cost:.4f} "
+                      f"(budget ${cost_limit:.2f}, overshoot {progress['budget']['overshoot_pct']}%)", flush=True)
             except Exception as e:
                 print(f"[strix] Warning: Failed to write final progress: {e}", flush=True)
 
@@ -812,8 +924,10 @@ async def run_strix_scan_async(
                 tracer.save_run_data(mark_complete=True)
                 print(f"[strix] Synthesized report from {len(findings)} parsed findings", flush=True)
 
-        # Process markdown report for structured output
-        structured_report = None
+        # Pick the report markdown and compute the deterministic report facts while tracer data
+        # is still in memory. LLM extraction itself happens later, in the postprocessing stage
+        # (app/postprocess.py), so this scan slot is released as soon as artifacts are flushed.
+        report_markdown = None
         report_path = run_dir / "penetration_test_report.md"
 
         # Log all files in run dir for debugging
@@ -827,12 +941,10 @@ async def run_strix_scan_async(
 
         if report_path.exists():
             try:
-                markdown_content = report_path.read_text(encoding="utf-8")
-                print(f"[strix] Processing report ({len(markdown_content)} chars)...", flush=True)
-                structured_report = process_scan_report(markdown_content, target_url)
-                print(f"[strix] Structured report extracted, risk: {structured_report.get('risk_level', '?')}", flush=True)
+                report_markdown = report_path.read_text(encoding="utf-8")
+                print(f"[strix] Report ready for postprocessing ({len(report_markdown)} chars)", flush=True)
             except Exception as e:
-                print(f"[strix] Warning: Report processing failed: {e}", flush=True)
+                print(f"[strix] Warning: Reading report failed: {e}", flush=True)
         else:
             print(f"[strix] WARNING: No penetration_test_report.md found even after synthesis", flush=True)
             # Try any .md in the run dir
@@ -844,111 +956,77 @@ async def run_strix_scan_async(
                         alt_content = md_files[0].read_text(encoding="utf-8")
                         if len(alt_content) > 200:
                             print(f"[strix] Using {md_files[0].name} as report ({len(alt_content)} chars)", flush=True)
-                            structured_report = process_scan_report(alt_content, target_url)
+                            report_markdown = alt_content
                     except Exception as e:
-                        print(f"[strix] Warning: Alt report processing failed: {e}", flush=True)
-
-            # Last resort: if we have findings but no structured report, build from synthesized report in memory
-            if not structured_report and tracer.final_scan_result:
-                try:
-                    print(f"[strix] Building structured report from in-memory synthesis ({len(tracer.final_scan_result)} chars)", flush=True)
-                    structured_report = process_scan_report(tracer.final_scan_result, target_url)
-                except Exception as e:
-                    print(f"[strix] Warning: In-memory report processing failed: {e}", flush=True)
-
-            # Ultimate fallback: create minimal structured report from findings
-            if not structured_report and findings:
-                try:
-                    from app.report_processor import create_fallback_report
-                    print(f"[strix] Creating fallback structured report from {len(findings)} findings", flush=True)
-                    structured_report = create_fallback_report(target_url, f"Found {len(findings)} potential issue(s)")
-                except Exception as e:
-                    print(f"[strix] Warning: Fallback report creation failed: {e}", flush=True)
-
-        # Enrich scan_stats with real data from tracer (GPT guesses poorly from synthesized reports)
-        if structured_report and "scan_stats" in structured_report:
-            try:
-                stats = structured_report["scan_stats"]
-                real_tool_count = tracer.get_real_tool_count()
-
-                # Count unique endpoints from tool executions
-                unique_endpoints = set()
-                http_request_count = 0
-                for exec_data in tracer.tool_executions.values():
-                    tool_name = exec_data.get("tool_name", "")
-                    args = exec_data.get("args", {})
-                    if tool_name == "send_request":
-                        http_request_count += 1
-                        url = args.get("url", "")
-                        if url:
-                            unique_endpoints.add(url.split("?")[0])
-                    elif tool_name == "browser_action" and args.get("action") == "goto":
-                        http_request_count += 1
-                        url = args.get("url", "")
-                        if url:
-                            unique_endpoints.add(url.split("?")[0])
-                    elif tool_name == "terminal_execute":
-                        cmd = args.get("command", "").lower()
-                        if any(x in cmd for x in ["curl", "wget", "httpx", "nuclei", "nikto", "sqlmap", "ffuf"]):
-                            http_request_count += 1
-
-                # Use real values, keeping GPT's if ours are lower (GPT may count from report content)
-                real_endpoints = len(unique_endpoints)
-                if real_endpoints > stats.get("endpoints_tested", 0):
-                    stats["endpoints_tested"] = real_endpoints
-                if real_endpoints > stats.get("endpoints_discovered", 0):
-                    stats["endpoints_discovered"] = real_endpoints
-
-                # requests_sent: use tool count as minimum (each tool call ~ 1+ request)
-                real_requests = max(http_request_count, real_tool_count)
-                if real_requests > stats.get("requests_sent", 0):
-                    stats["requests_sent"] = real_requests
-
-                # Duration from tracer timestamps
-                try:
-                    from datetime import datetime, timezone
-                    start = datetime.fromisoformat(tracer.start_time.replace("Z", "+00:00"))
-                    end = datetime.now(timezone.utc)
-                    duration_min = max(1, int((end - start).total_seconds() / 60))
-                    if duration_min > stats.get("duration_minutes", 0):
-                        stats["duration_minutes"] = duration_min
-                except Exception:
-                    pass
+                        print(f"[strix] Warning: Reading alt report failed: {e}", flush=True)
 
-                # Technologies: ensure non-zero
-                if stats.get("technologies_identified", 0) == 0:
-                    stats["technologies_identified"] = max(1, len(structured_report.get("attack_surface", {}).get("technologies", [])))
+            # Last resort: the synthesized report held in memory
+            if not report_markdown and tracer.final_scan_result:
+                print(f"[strix] Using in-memory synthesis as report ({len(tracer.final_scan_result)} chars)", flush=True)
+                report_markdown = tracer.final_scan_result
 
-                print(f"[strix] Enriched scan_stats: endpoints={stats['endpoints_tested']}, requests={stats['requests_sent']}, duration={stats['duration_minutes']}min", flush=True)
-            except Exception as e:
-                print(f"[strix] Warning: Failed to enrich scan_stats: {e}", flush=True)
+        # Stats, tested categories and the observable attack surface come from tracer data
+        # (app.report_facts), not the LLM.
+        report_facts = None
+        try:
+            report_facts = collect_report_facts(
+                target_url,
+                tool_executions=tracer.tool_executions.values(),
+                findings=findings,
+                markdown=report_markdown or "",
+                tool_count=tracer.get_real_tool_count(),
+                started_at=tracer.start_time,
+            )
+        except Exception as e:
+            print(f"[strix] Warning: Collecting report facts failed: {e}", flush=True)
 
         tracer.cleanup()
         cleanup_runtime()
 
-        print(f"[strix] === FINAL: {len(findings)} findings, structured_report={'yes' if structured_report else 'no'} ===", flush=True)
+        from app.artifacts import record_run_finish
+        await record_run_finish(scan_id, run_dir)
+
+        print(f"[strix] === FINAL: {len(findings)} findings, report_markdown={'yes' if report_markdown else 'no'} ===", flush=True)
 
         # Fail loudly instead of returning a hollow success. A scan that produced neither a
-        # structured report nor any findings means the pipeline broke (agent or report-
-        # extraction failure) — NOT that the target is genuinely clean. Returning it as a
-        # completed "Clean" result is the bug where costly scans showed "100% clean, no data".
-        # (A genuinely clean target still yields a structured_report with categories tested.)
-        if not structured_report and not findings:
-            print("[strix] No structured report and no findings — marking failed, not clean", flush=True)
+        # report nor any findings means the pipeline broke (agent failure) — NOT that the
+        # target is genuinely clean. Returning it as a completed "Clean" result is the bug
+        # where costly scans showed "100% clean, no data". (A genuinely clean target still
+        # yields a report with categories tested.)
+        if not report_markdown and not findings:
+            print("[strix] No report and no findings — marking failed, not clean", flush=True)
+            if stop_reason == "cancelled":
+                return {"error": "cancelled", "message": "Scan cancelled by admin.", "findings": []}
+            if stop_reason in ("timeout", "stalled"):
+                return {
+                    "error": "timeout",
+                    "message": f"Scan {'stalled' if stop_reason == 'stalled' else 'exceeded its time budget'} "
+                               "before producing a report or findings.",
+                    "findings": [],
+                }
             return {
                 "error": "no_report",
                 "message": "Scan completed but produced no usable report or findings.",
                 "findings": [],
             }
 
-        result = {"findings": findings}
-        if structured_report:
-            result["structured_report"] = structured_report
+        result = {
+            "findings": findings,
+            "report_markdown": report_markdown,
+            "report_facts": report_facts,
+            "run_dir": str(run_dir),
+        }
+        if stop_reason:
+            result["stop_reason"] = stop_reason  # partial results (cost/time limit or cancel)
         return result
 
     except Exception as e:
         if progress_task:
             progress_task.cancel()
+        if watchdog_task:
+            watchdog_task.cancel()
+        if cancel_task:
+            cancel_task.cancel()
         try:
             from strix.runtime import cleanup_runtime
             cleanup_runtime()
@@ -961,36 +1039,61 @@ async def run_strix_scan_async(
         }
 
 
+def _finding_from_report(v: dict) -> dict:
+    """Map a Strix vulnerability report (tracer memory / callback) to our finding shape."""
+    return {
+        "title": v.get("title", "Unknown"),
+        "severity": normalize_severity(v.get("severity", "medium")),
+        "endpoint": v.get("endpoint", ""),
+        "impact": v.get("impact", v.get("description", "")),
+        "reproduction_steps": v.get("technical_analysis", ""),
+        "poc": v.get("poc_script_code", v.get("poc_description", "")),
+        "fix_guidance": v.get("remediation_steps", ""),
+    }
+
+
 def run_strix_scan(target_url: str, scan_type: str = "quick") -> dict:
     """Sync wrapper for async scan function."""
     return asyncio.run(run_strix_scan_async(target_url, scan_type))
 
 
+# Run dirs with at least this many vulnerability files are parsed on a thread pool (one worker
+# per core, up to 8; none on a single core); below it the pool's startup cost outweighs the
+# overlapped file reads. See benchmarks/bench_vuln_parser.py.
+_PARALLEL_PARSE_MIN_FILES = 8
+_PARSE_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def _parse_all(fn, items: list) -> list:
+    """map(fn, items) in order — on a thread pool when there are enough items to pay off."""
+    workers = min(_PARSE_WORKERS, len(items))
+    if len(items) < _PARALLEL_PARSE_MIN_FILES or workers < 2:
+        return [fn(item) for item in items]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items))
+
+
 def parse_strix_run_dir(run_name: str) -> list[dict]:
     """Parse Strix output from strix_runs/<run_name>/."""
-    findings = []
     run_dir = Path(f"strix_runs/{run_name}")
 
     if not run_dir.exists():
-        return findings
+        return []
 
     csv_file = run_dir / "vulnerabilities.csv"
     vuln_dir = run_dir / "vulnerabilities"
 
     if csv_file.exists():
         with open(csv_file, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                finding = parse_vulnerability_file(vuln_dir, row)
-                if finding:
-                    findings.append(finding)
+            rows = list(csv.DictReader(f))
+        parsed = _parse_all(lambda row: parse_vulnerability_file(vuln_dir, row), rows)
     elif vuln_dir.exists():
-        for md_file in sorted(vuln_dir.glob("*.md")):
-            finding = parse_vulnerability_md(md_file)
-            if finding:
-                findings.append(finding)
+        parsed = _parse_all(parse_vulnerability_md, sorted(vuln_dir.glob("*.md")))
+    else:
+        return []
 
-    return findings
+    return [finding for finding in parsed if finding]
 
 
 def parse_vulnerability_file(vuln_dir: Path, csv_row: dict) -> dict | None:
@@ -1008,10 +1111,9 @@ def parse_vulnerability_file(vuln_dir: Path, csv_row: dict) -> dict | None:
         "fix_guidance": "",
     }
 
-    if md_file.exists():
-        details = parse_vulnerability_md(md_file)
-        if details:
-            finding.update({k: v for k, v in details.items() if v})
+    details = parse_vulnerability_md(md_file)
+    if details:
+        finding.update({k: v for k, v in details.items() if v})
 
     return finding
 
@@ -1022,7 +1124,17 @@ def parse_vulnerability_md(md_file: Path) -> dict | None:
         content = md_file.read_text(encoding="utf-8")
     except Exception:
         return None
+    return parse_vulnerability_text(content, md_file.stem)
 
+
+def parse_vulnerability_text(content: str, fallback_title: str = "") -> dict:
+    """
+    Build a finding from vulnerability markdown in a single pass: str.find jumps from one
+    `#`-prefixed line to the next, so ordinary lines are never split out or re-joined.
+    Section bodies are slices between `##`/`###` headings, the title is the first `# `
+    heading, and `**Endpoint:**` / `**Severity:**` metadata in the first 20 lines overrides
+    the section values.
+    """
     finding = {
         "title": "",
         "severity": "Medium",
@@ -1033,33 +1145,28 @@ def parse_vulnerability_md(md_file: Path) -> dict | None:
         "fix_guidance": "",
     }
 
-    # Extract title from first heading
-    for line in content.split("\n"):
-        if line.startswith("# "):
-            finding["title"] = line[2:].strip()
-            break
-
-    # Parse sections
-    sections = _split_markdown_sections(content)
-    for heading, body in sections.items():
-        h = heading.lower()
-        if "severity" in h:
-            finding["severity"] = normalize_severity(body.strip().split("\n")[0])
-        elif "endpoint" in h or "target" in h:
-            finding["endpoint"] = body.strip().split("\n")[0]
-        elif "impact" in h:
-            finding["impact"] = body.strip()
-        elif "description" in h and not finding["impact"]:
-            finding["impact"] = body.strip()
-        elif "proof of concept" in h or "poc" in h:
-            finding["poc"] = body.strip()
-        elif "technical analysis" in h:
-            finding["reproduction_steps"] = body.strip()
-        elif "remediation" in h or "fix" in h:
-            finding["fix_guidance"] = body.strip()
-
-    # Parse inline metadata
-    for line in content.split("\n")[:20]:
+    sections: dict[str, str] = {}
+    heading, body_start = None, 0
+    line_start = 0 if content.startswith("#") else content.find("\n#") + 1 or -1
+    while line_start >= 0:
+        line_end = content.find("\n", line_start)
+        if line_end < 0:
+            line_end = len(content)
+        if content.startswith("## ", line_start) or content.startswith("### ", line_start):
+            if heading:
+                sections[heading] = content[body_start:max(body_start, line_start - 1)]
+            heading = content[line_start:line_end].lstrip("#").strip()
+            body_start = line_end + 1
+        elif not finding["title"] and content.startswith("# ", line_start):
+            finding["title"] = content[line_start + 2:line_end].strip()
+        line_start = content.find("\n#", line_end) + 1 or -1
+    if heading:
+        sections[heading] = content[body_start:]
+    for h, body in sections.items():
+        _apply_section(finding, h, body)
+
+    # Inline metadata near the top
+    for line in content.split("\n", 20)[:20]:
         s = line.strip()
         if s.startswith("- **Endpoint") or s.startswith("**Endpoint"):
             finding["endpoint"] = line.split(":", 1)[-1].strip().strip("*")
@@ -1067,30 +1174,27 @@ def parse_vulnerability_md(md_file: Path) -> dict | None:
             finding["severity"] = normalize_severity(line.split(":", 1)[-1].strip().strip("*"))
 
     if not finding["title"]:
-        finding["title"] = md_file.stem.replace("-", " ").title()
+        finding["title"] = fallback_title.replace("-", " ").title()
 
     return finding
 
 
-def _split_markdown_sections(content: str) -> dict:
-    """Split markdown content into sections by heading."""
-    sections = {}
-    current_heading = ""
-    current_body = []
-
-    for line in content.split("\n"):
-        if line.startswith("## ") or line.startswith("### "):
-            if current_heading:
-                sections[current_heading] = "\n".join(current_body)
-            current_heading = line.lstrip("#").strip()
-            current_body = []
-        else:
-            current_body.append(line)
-
-    if current_heading:
-        sections[current_heading] = "\n".join(current_body)
-
-    return sections
+def _apply_section(finding: dict, heading: str, body: str):
+    h = heading.lower()
+    if "severity" in h:
+        finding["severity"] = normalize_severity(body.strip().split("\n")[0])
+    elif "endpoint" in h or "target" in h:
+        finding["endpoint"] = body.strip().split("\n")[0]
+    elif "impact" in h:
+        finding["impact"] = body.strip()
+    elif "description" in h and not finding["impact"]:
+        finding["impact"] = body.strip()
+    elif "proof of concept" in h or "poc" in h:
+        finding["poc"] = body.strip()
+    elif "technical analysis" in h:
+        finding["reproduction_steps"] = body.strip()
+    elif "remediation" in h or "fix" in h:
+        finding["fix_guidance"] = body.strip()
 
 
 def _is_real_finding(finding: dict) -> bool:
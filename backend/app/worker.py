@@ -2,9 +2,17 @@ import asyncio
 import json
 import subprocess
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from urllib.parse import urlparse
+from app.archive import archive_batch, reclaim_space
+from app.compression import reencode_batch
+from app.config import settings
 from app.database import database, scans
+from app.jobs import claim_pending_scan
+from app.migrations import run_migrations
+from app.postprocess import POSTPROCESS_STATUS, run_postprocess_loop
+from app.preflight import probe_target
+from app.scan_control import CANCEL_STATUS
 from app.strix_runner import run_strix_scan_async
 from app.email_service import send_scan_complete_email, send_scan_failed_email
 
@@ -32,9 +40,13 @@ def cleanup_strix_containers():
 
 
 async def reset_stuck_scans():
-    """Mark any scans stuck in 'running' as 'failed' on worker startup."""
+    """Mark any scans stuck in 'running' (or 'cancelling') as 'failed' on worker startup.
+
+    Scans in 'postprocessing' are left alone — their artifacts are already stored and the
+    postprocess loop resumes them."""
     result = await database.fetch_all(
-        scans.select().where(scans.c.status == "running")
+        scans.select().with_only_columns(scans.c.id)
+        .where(scans.c.status.in_(("running", CANCEL_STATUS)))
     )
     for scan in result:
         await database.execute(
@@ -51,12 +63,15 @@ async def reset_stuck_scans():
 
 
 async def process_pending_scans():
-    """Poll for pending scans and process them."""
-    query = scans.select().where(scans.c.status == "pending")
-    pending = await database.fetch_all(query)
+    """Claim due pending scans one at a time (oldest first) and process them.
 
-    for scan in pending:
-        await process_scan(dict(scan))
+    Claiming marks the scan running atomically (see app/jobs.py), so several workers can
+    share the queue and an admin cancel never races the pickup."""
+    while True:
+        scan = await claim_pending_scan()
+        if scan is None:
+            return
+        await process_scan(scan)
 
 
 def _is_self_scan(target_url: str) -> bool:
@@ -120,16 +135,38 @@ def _generate_clean_report(target_url: str) -> dict:
     }
 
 
-async def process_scan(scan: dict):
-    """Process a single scan."""
+async def _handle_unreachable(scan: dict, probe: dict):
+    """Fail a dead target outright; put a flaky one back in the queue for later (once)."""
     scan_id = scan["id"]
-
-    # Mark as running
+    retry_count = scan["retry_count"] or 0
+    if probe["verdict"] == "defer" and retry_count < 1:
+        not_before = datetime.now() + timedelta(minutes=settings.preflight_defer_minutes)
+        await database.execute(
+            scans.update()
+            .where(scans.c.id == scan_id)
+            .values(status="pending", retry_count=retry_count + 1, not_before=not_before)
+        )
+        print(f"[preflight] {scan_id}: deferred until {not_before:%H:%M} ({probe['error']})", flush=True)
+        return
     await database.execute(
         scans.update()
         .where(scans.c.id == scan_id)
-        .values(status="running")
+        .values(
+            status="failed",
+            results_json=json.dumps({
+                "error": "unreachable",
+                "message": f"Target unreachable ({probe['stage']}: {probe['error']})",
+                "preflight": probe,
+            }),
+            completed_at=datetime.now(),
+        )
     )
+    await send_scan_failed_email(scan["email"], scan_id)
+
+
+async def process_scan(scan: dict):
+    """Process a single scan."""
+    scan_id = scan["id"]  # already marked running by claim_pending_scan()
 
     # Self-scan: return a clean report after a short delay
     if _is_self_scan(scan["target_url"]):
@@ -176,18 +213,27 @@ async def process_scan(scan: dict):
         )
         return
 
+    # Pre-flight: fail dead targets / defer flaky ones before a sandbox is allocated
+    probe = None
+    if settings.preflight_enabled:
+        probe = await probe_target(scan["target_url"])
+        if probe["verdict"] != "ok":
+            await _handle_unreachable(scan, probe)
+            return
+
     try:
         # Run Strix
         results = await run_strix_scan_async(
             target_url=scan["target_url"],
             scan_type=scan["scan_type"],
             scan_id=scan_id,
+            preflight=probe,
         )
 
         if "error" in results:
-            # Check retry count
+            # Check retry count (an admin cancel is final — never retried)
             retry_count = scan["retry_count"] or 0
-            if retry_count < 1:
+            if retry_count < 1 and results["error"] != "cancelled":
                 await database.execute(
                     scans.update()
                     .where(scans.c.id == scan_id)
@@ -210,24 +256,19 @@ async def process_scan(scan: dict):
                 await send_scan_failed_email(scan["email"], scan_id)
                 return
 
-        # Success - store results
+        # Success - hand the artifacts to the postprocessing stage (app/postprocess.py), which
+        # extracts the structured report, completes the scan and sends the email. The scan slot
+        # is free again as soon as this returns.
         await database.execute(
             scans.update()
             .where(scans.c.id == scan_id)
             .values(
-                status="completed",
+                status=POSTPROCESS_STATUS,
                 results_json=json.dumps(results),
-                completed_at=datetime.now(),
+                postprocess_attempts=0,
             )
         )
 
-        await send_scan_complete_email(
-            email=scan["email"],
-            scan_id=scan_id,
-            findings_count=len(results.get("findings", [])),
-            target_url=scan["target_url"],
-        )
-
     except Exception as e:
         await database.execute(
             scans.update()
@@ -245,13 +286,21 @@ async def process_scan(scan: dict):
 
 async def run_worker():
     """Main worker loop."""
+    run_migrations()
     await database.connect()
     cleanup_strix_containers()
     await reset_stuck_scans()
+    postprocess_task = asyncio.create_task(run_postprocess_loop())  # noqa: F841 — runs for the worker's lifetime
     print("Worker started. Polling for scans...", flush=True)
 
     last_drip = 0.0
     DRIP_INTERVAL = 300  # run the marketing drip at most every 5 minutes
+    # Compress blobs stored before compression existed, a batch per idle tick until none are
+    # left, then check back hourly (new writes are compressed already).
+    next_reencode = 0.0
+    # Same for expired free reports (app/archive.py): archive a batch per idle tick while any
+    # are due, reclaiming SQLite pages after each, then check back hourly.
+    next_archive = 0.0
     while True:
         try:
             await process_pending_scans()
@@ -267,6 +316,28 @@ async def run_worker():
             except Exception as e:
                 print(f"Drip error: {e}", flush=True)
 
+        if now >= next_reencode:
+            try:
+                batch = await reencode_batch()
+                if batch["columns"]:
+                    print(f"[compression] re-encoded {batch['columns']} blobs in {batch['scans']} scans", flush=True)
+                next_reencode = now + (5 if batch["columns"] else 3600)
+            except Exception as e:
+                next_reencode = now + 300
+                print(f"[compression] re-encode error: {e}", flush=True)
+
+        if settings.archive_enabled and now >= next_archive:
+            try:
+                batch = await archive_batch()
+                if batch["scans"]:
+                    space = await asyncio.to_thread(reclaim_space)
+                    print(f"[archive] archived {batch['scans']} expired free scans "
+                          f"({batch['bytes_freed'] / 1e6:.1f} MB), released {space['released_pages']} pages", flush=True)
+                next_archive = now + (5 if batch["scans"] >= settings.archive_batch else 3600)
+            except Exception as e:
+                next_archive = now + 300
+                print(f"[archive] error: {e}", flush=True)
+
         await asyncio.sleep(5)  # Poll every 5 seconds
 
 
@@ -0,0 +1,136 @@
+"""
+Benchmark: compression ratio and encode/decode cost of the results_json / progress_json
+codec (app/compression.py), and what it does to the database file and the results read.
+
+Payloads are built from a vocabulary of report words plus random ids, paths and hex
+tokens, so they compress roughly like real reports rather than like repeated filler.
+Reports, per zlib level:
+
+  * ratio            raw bytes / stored bytes
+  * encode / decode  ms per payload and MB/s
+
+then fills two SQLite files with the same scans — plain text vs compressed — and compares
+file size and the time to fetch one scan's results (the GET /scans/{id}/results read).
+
+Usage (from backend/):
+    python benchmarks/bench_blob_compression.py [--scans 200] [--findings 40] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/unused.db"
+
+import sqlalchemy as sa  # noqa: E402
+
+from app import compression  # noqa: E402
+from app.database import scans  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.sqlite_backend import TunedDatabase, tune_sqlite_connection  # noqa: E402
+
+_WORDS = ("the endpoint request response parameter header token session user admin input "
+          "validation injection payload server returned status error attacker cookie origin "
+          "script query value database access control missing rate limit exposed").split()
+
+
+def _prose(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def _results(rng: random.Random, findings: int) -> str:
+    return json.dumps({
+        "findings": [{
+            "title": _prose(rng, 6), "severity": rng.choice(["High", "Medium", "Low"]),
+            "endpoint": f"https://example.com/api/v{rng.randint(1, 3)}/{rng.randbytes(4).hex()}",
+            "impact": _prose(rng, rng.randint(40, 120)),
+            "reproduction_steps": [_prose(rng, 12) for _ in range(rng.randint(3, 8))],
+            "poc_script_code": "\n".join(
+                f"r = requests.post(URL + '/{rng.randbytes(3).hex()}', json={{'id': {rng.randint(1, 10**6)}, "
+                f"'token': '{rng.randbytes(12).hex()}'}})" for _ in range(rng.randint(5, 25))),
+            "fix_guidance": _prose(rng, rng.randint(40, 120)),
+        } for _ in range(findings)],
+        "structured_report": {"executive_summary": _prose(rng, 400), "risk_level": "High"},
+    })
+
+
+def _progress(rng: random.Random) -> str:
+    return json.dumps({
+        "cost": round(rng.random() * 10, 4), "tools": rng.randint(50, 400),
+        "recent_activity": [{"description": f"{_prose(rng, 5)} /api/{rng.randbytes(3).hex()}",
+                             "status": "done", "ts": 1760000000 + i} for i in range(100)],
+    })
+
+
+def codec_table(payloads: list[str]) -> None:
+    raw = sum(len(p.encode()) for p in payloads)
+    print(f"{len(payloads)} payloads, {raw / 1e6:.1f} MB raw (avg {raw / len(payloads) / 1e3:.0f} KB)\n")
+    print(f"{'level':>5} {'ratio':>6} {'enc ms':>7} {'enc MB/s':>9} {'dec ms':>7} {'dec MB/s':>9}")
+    for level in (1, 6, 9):
+        start = time.perf_counter()
+        packed = [zlib.compress(p.encode(), level) for p in payloads]
+        enc = time.perf_counter() - start
+        start = time.perf_counter()
+        for blob in packed:
+            zlib.decompress(blob).decode()
+        dec = time.perf_counter() - start
+        stored = sum(len(b) + 1 for b in packed)
+        print(f"{level:>5} {raw / stored:>6.2f} {enc * 1000 / len(payloads):>7.2f} {raw / enc / 1e6:>9.0f} "
+              f"{dec * 1000 / len(payloads):>7.2f} {raw / dec / 1e6:>9.0f}")
+
+
+async def db_compare(n: int, findings: int, repeat: int) -> None:
+    print(f"\n{'mode':10} {'file MB':>8} {'results read ms':>16}")
+    for mode, enabled in (("plain", False), ("compressed", True)):
+        settings.blob_compression = enabled
+        path = f"{tempfile.mkdtemp()}/{mode}.db"
+        engine = sa.create_engine(f"sqlite:///{path}")
+        sa.event.listen(engine, "connect", lambda conn, _: tune_sqlite_connection(conn))
+        run_migrations(engine)
+        engine.dispose()
+
+        rng = random.Random(7)
+        db = TunedDatabase(f"sqlite:///{path}")
+        await db.connect()
+        try:
+            for i in range(n):
+                await db.execute(scans.insert().values(
+                    id=f"scan-{i:05d}", email="a@example.com", target_url="https://example.com",
+                    status="completed", results_json=_results(rng, findings), progress_json=_progress(rng),
+                ))
+            await db.execute(sa.text("PRAGMA wal_checkpoint(TRUNCATE)"))
+            query = scans.select().with_only_columns(scans.c.status, scans.c.results_json)
+            pick = random.Random(1)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                row = await db.fetch_one(query.where(scans.c.id == f"scan-{pick.randrange(n):05d}"))
+                json.loads(row["results_json"])
+            elapsed = time.perf_counter() - start
+        finally:
+            await db.disconnect()
+        print(f"{mode:10} {os.path.getsize(path) / 1e6:>8.1f} {elapsed * 1000 / repeat:>16.3f}")
+    settings.blob_compression = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scans", type=int, default=200)
+    parser.add_argument("--findings", type=int, default=40, help="findings per results_json")
+    parser.add_argument("--repeat", type=int, default=200, help="results reads per mode")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    codec_table([_results(rng, args.findings) for _ in range(50)] + [_progress(rng) for _ in range(50)])
+    asyncio.run(db_compare(args.scans, args.findings, args.repeat))
+    print(f"\nthis process: {compression.compression_stats()}")
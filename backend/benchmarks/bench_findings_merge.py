@@ -0,0 +1,94 @@
+"""
+Benchmark: merging findings from the runner's three sources (disk, tracer memory, callback).
+
+Builds synthetic sources where each underlying issue is reported by several sources under
+reworded titles ("SQL Injection in /api/x" / "SQLi on x endpoint") with different fields
+filled in, then times:
+
+  * baseline  — the previous merge: lowercase-title sets rebuilt per source, first wins
+  * merge     — app.findings.merge_findings (one fingerprint pass over all sources)
+
+and reports how many findings each leaves behind versus the true issue count.
+
+Usage (from backend/):
+    python benchmarks/bench_findings_merge.py [--issues 5000] [--repeat 5]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.findings import merge_findings  # noqa: E402
+
+_CLASSES = [
+    ("SQL Injection in {path}", "SQLi on {name} endpoint"),
+    ("Reflected XSS in {path}", "Cross-Site Scripting (XSS) at {path}"),
+    ("IDOR on {path}/{id}", "Insecure Direct Object Reference in {path}/{id2}"),
+    ("SSRF via {path}", "Server-Side Request Forgery in {name} endpoint"),
+    ("Path Traversal in {path}", "Directory traversal on {name} endpoint"),
+]
+
+
+def build_sources(issues: int, seed: int = 7) -> list[list[dict]]:
+    rng = random.Random(seed)
+    disk, tracer, callback = [], [], []
+    for i in range(issues):
+        primary, alternate = _CLASSES[i % len(_CLASSES)]
+        name = f"res{i}"
+        fields = {"path": f"/api/{name}", "name": name, "id": rng.randint(1, 999), "id2": rng.randint(1, 999)}
+        base = {"severity": rng.choice(["High", "Medium", "Critical"]), "endpoint": "",
+                "impact": "", "reproduction_steps": "", "poc": "", "fix_guidance": ""}
+        disk.append({**base, "title": primary.format(**fields), "impact": "x" * rng.randint(20, 200)})
+        if rng.random() < 0.7:
+            tracer.append({**base, "title": alternate.format(**fields), "poc": "curl ..." * rng.randint(1, 20),
+                           "endpoint": f"https://example.com{fields['path']}"})
+        if rng.random() < 0.5:
+            callback.append({**base, "title": primary.format(**fields).upper(), "fix_guidance": "fix it"})
+    return [disk, tracer, callback]
+
+
+def baseline_merge(disk, tracer, callback):
+    findings = list(disk)
+    for source in (tracer, callback):
+        existing_titles = {f.get("title", "").lower() for f in findings}
+        for f in source:
+            if f["title"].lower() not in existing_titles:
+                findings.append(f)
+    return findings
+
+
+def _time(fn, repeat: int) -> tuple[float, list]:
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--issues", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sources = build_sources(args.issues)
+    total_in = sum(len(s) for s in sources)
+    base_t, base_out = _time(lambda: baseline_merge(*sources), args.repeat)
+    merge_t, merge_out = _time(lambda: merge_findings(*sources), args.repeat)
+    with_poc = sum(1 for f in merge_out if f["poc"])
+
+    print(f"{args.issues} issues reported as {total_in} findings across 3 sources, median of {args.repeat}:")
+    print(f"  baseline (title sets)    {base_t * 1000:8.1f} ms  -> {len(base_out)} findings")
+    print(f"  merge_findings           {merge_t * 1000:8.1f} ms  -> {len(merge_out)} findings "
+          f"({with_poc} carry a PoC merged from another source)")
+    print(f"  per finding: {merge_t / total_in * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark: bytes read per request, full-row `scans.select()` vs the column-projected queries.
+
+Fills a throwaway SQLite database with finished scans carrying realistic results_json /
+progress_json blobs (plus a completed pro child for some), then runs each endpoint's query
+both ways and reports the bytes that came back through the driver and the time taken:
+
+  * before — scans.select() (every column, both blobs)
+  * after  — the projection the endpoint now uses (SCAN_SUMMARY_COLUMNS & co.)
+
+Usage (from backend/):
+    python benchmarks/bench_scan_queries.py [--scans 200] [--findings 40] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from app.database import SCAN_PAYMENT_COLUMNS, SCAN_SUMMARY_COLUMNS, database, scans  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+
+
+def _results(rng: random.Random, findings: int) -> str:
+    return json.dumps({
+        "findings": [{
+            "title": f"Finding {i}", "severity": rng.choice(["High", "Medium", "Low"]),
+            "endpoint": f"https://example.com/api/r{i}", "impact": "x" * rng.randint(200, 600),
+            "reproduction_steps": "step\n" * rng.randint(20, 60), "poc": "curl ..." * rng.randint(50, 200),
+            "fix_guidance": "y" * rng.randint(200, 600),
+        } for i in range(findings)],
+        "structured_report": {"executive_summary": "z" * 3000, "risk_level": "High"},
+    })
+
+
+def _progress(rng: random.Random) -> str:
+    return json.dumps({
+        "cost": 1.23, "tools": 180, "active_agents": 3,
+        "recent_activity": [{"description": f"Testing /api/r{i} " + "q" * 80, "status": "done"}
+                            for i in range(100)],
+        "vulnerabilities": [{"title": f"v{i}", "severity": "High"} for i in range(rng.randint(5, 30))],
+    })
+
+
+async def populate(n: int, findings: int) -> list[str]:
+    rng = random.Random(7)
+    ids = []
+    for i in range(n):
+        scan_id = f"scan-{i:05d}"
+        ids.append(scan_id)
+        await database.execute(scans.insert().values(
+            id=scan_id, email=f"user{i}@example.com", target_url=f"https://site{i}.example.com",
+            status="completed", scan_type="quick", results_json=_results(rng, findings),
+            progress_json=_progress(rng), paid_tier="pro" if i % 4 == 0 else None,
+        ))
+        if i % 4 == 0:
+            await database.execute(scans.insert().values(
+                id=f"{scan_id}-pro", email=f"user{i}@example.com", target_url=f"https://site{i}.example.com",
+                status="completed", scan_type="pro", results_json=_results(rng, findings * 2),
+                progress_json=_progress(rng), parent_scan_id=scan_id,
+            ))
+    return ids
+
+
+def _row_bytes(row) -> int:
+    if row is None:
+        return 0
+    return sum(len(v) if isinstance(v, (str, bytes)) else 8 for v in dict(row._mapping).values())
+
+
+def cases(scan_id: str) -> list[tuple[str, object, object]]:
+    """(endpoint, before query, after query) — the after side mirrors app/routers/scans.py."""
+    by_id = scans.c.id == scan_id
+    child = scans.c.parent_scan_id == scan_id
+    return [
+        ("GET /scans/{id}", scans.select().where(by_id),
+         scans.select().with_only_columns(*SCAN_SUMMARY_COLUMNS).where(by_id)),
+        ("GET /scans/{id}/progress", scans.select().where(by_id),
+         scans.select().with_only_columns(scans.c.status, scans.c.progress_json).where(by_id)),
+        ("GET /scans/{id}/child-status", scans.select().where(child),
+         scans.select().with_only_columns(
+             scans.c.id, scans.c.status, scans.c.scan_type, scans.c.progress_json).where(child)),
+        ("POST /scans/{id}/checkout", scans.select().where(by_id),
+         scans.select().with_only_columns(*SCAN_PAYMENT_COLUMNS).where(by_id)),
+        ("POST /scans/admin/cancel/{id}", scans.select().where(by_id),
+         scans.select().with_only_columns(scans.c.status).where(by_id)),
+    ]
+
+
+async def measure(query, repeat: int) -> tuple[int, float]:
+    nbytes = _row_bytes(await database.fetch_one(query))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await database.fetch_one(query)
+    return nbytes, (time.perf_counter() - start) / repeat * 1e6
+
+
+async def main(n: int, findings: int, repeat: int) -> None:
+    run_migrations()
+    await database.connect()
+    try:
+        ids = await populate(n, findings)
+        print(f"{n} scans, {findings} findings each, {repeat} requests per case\n")
+        print(f"{'endpoint':32} {'before B':>10} {'after B':>10} {'before us':>10} {'after us':>10}")
+        for i, (name, _, _) in enumerate(cases(ids[0])):
+            totals = [0, 0, 0.0, 0.0]
+            sample = ids[::max(1, len(ids) // 20)]
+            for scan_id in sample:
+                _, before, after = cases(scan_id)[i]
+                b_bytes, b_us = await measure(before, repeat // len(sample) or 1)
+                a_bytes, a_us = await measure(after, repeat // len(sample) or 1)
+                totals = [totals[0] + b_bytes, totals[1] + a_bytes, totals[2] + b_us, totals[3] + a_us]
+            k = len(sample)
+            print(f"{name:32} {totals[0] // k:>10} {totals[1] // k:>10} "
+                  f"{totals[2] / k:>10.0f} {totals[3] / k:>10.0f}")
+
+        dash_before = scans.select().order_by(scans.c.created_at.desc()).limit(250)
+        dash_after = (scans.select().with_only_columns(*SCAN_SUMMARY_COLUMNS, scans.c.progress_json)
+                      .order_by(scans.c.created_at.desc()).limit(250))
+        print()
+        for label, query in (("before", dash_before), ("after", dash_after)):
+            start = time.perf_counter()
+            rows = await database.fetch_all(query)
+            ms = (time.perf_counter() - start) * 1000
+            print(f"admin dashboard ({label}): {sum(_row_bytes(r) for r in rows)} B / {len(rows)} rows, {ms:.1f} ms")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scans", type=int, default=200)
+    parser.add_argument("--findings", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.scans, args.findings, args.repeat))
@@ -0,0 +1,166 @@
+"""
+Benchmark: concurrent progress writers and pollers on one SQLite file, stock backend vs the
+tuned profile (app/sqlite_backend.py).
+
+Each simulated worker is its own process (like the real worker) rewriting one running scan's
+progress_json on a tight cadence; each poller process hammers GET /scans/{id}/progress-style
+reads plus the summary read — the API side. Both modes run the same load for the same time:
+
+  * stock  — databases' default SQLite backend on a rollback-journal file
+  * tuned  — WAL, synchronous=NORMAL, busy_timeout, mmap, one writer + pooled readers
+
+and report throughput, read/write latency percentiles and "database is locked" errors.
+
+Usage (from backend/):
+    python benchmarks/bench_sqlite_concurrency.py [--workers 4] [--pollers 8] [--seconds 10]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/unused.db"
+
+import databases  # noqa: E402
+import sqlalchemy as sa  # noqa: E402
+
+from app.database import SCAN_SUMMARY_COLUMNS, scans  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.sqlite_backend import TunedDatabase  # noqa: E402
+
+
+def _database(mode: str, url: str) -> databases.Database:
+    return TunedDatabase(url) if mode == "tuned" else databases.Database(url)
+
+
+def _progress(rng: random.Random, step: int) -> str:
+    return json.dumps({"tools": step, "cost": step / 100, "recent_activity": [
+        {"description": "Testing /api/r%d " % i + "q" * 80, "status": "done"}
+        for i in range(rng.randint(150, 400))
+    ]})
+
+
+async def _worker(mode: str, url: str, scan_id: str, seconds: float, interval: float) -> dict:
+    db, rng, lat, errors, step = _database(mode, url), random.Random(scan_id), [], 0, 0
+    await db.connect()
+    until = time.monotonic() + seconds
+    try:
+        while time.monotonic() < until:
+            step += 1
+            start = time.perf_counter()
+            try:
+                await db.execute(scans.update().where(scans.c.id == scan_id)
+                                 .values(progress_json=_progress(rng, step)))
+                lat.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                errors += 1
+            await asyncio.sleep(interval)
+    finally:
+        await db.disconnect()
+    return {"role": "write", "lat": lat, "errors": errors}
+
+
+async def _poller(mode: str, url: str, scan_ids: list[str], seconds: float, concurrency: int) -> dict:
+    db, lat, errors = _database(mode, url), [], 0
+    await db.connect()
+    until = time.monotonic() + seconds
+
+    async def loop(rng):
+        nonlocal errors
+        while time.monotonic() < until:
+            scan_id = rng.choice(scan_ids)
+            start = time.perf_counter()
+            try:
+                await db.fetch_one(scans.select().with_only_columns(scans.c.status, scans.c.progress_json)
+                                   .where(scans.c.id == scan_id))
+                await db.fetch_one(scans.select().with_only_columns(*SCAN_SUMMARY_COLUMNS)
+                                   .where(scans.c.id == scan_id))
+                lat.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                errors += 1
+            await asyncio.sleep(0)
+
+    try:
+        await asyncio.gather(*(loop(random.Random(i)) for i in range(concurrency)))
+    finally:
+        await db.disconnect()
+    return {"role": "read", "lat": lat, "errors": errors}
+
+
+def _run(kind: str, args: tuple, start: mp.Event, out: mp.Queue) -> None:
+    start.wait()  # every process is imported and ready: start the clock together
+    out.put(asyncio.run((_worker if kind == "worker" else _poller)(*args)))
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return sorted(values)[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+def run_mode(mode: str, workers: int, pollers: int, seconds: float, interval: float, concurrency: int) -> dict:
+    url = f"sqlite:///{tempfile.mkdtemp()}/{mode}.db"
+    engine = sa.create_engine(url)
+    if mode == "tuned":
+        from app.sqlite_backend import tune_sqlite_connection
+        sa.event.listen(engine, "connect", lambda conn, _: tune_sqlite_connection(conn))
+    run_migrations(engine)
+    scan_ids = [f"scan-{i}" for i in range(workers)]
+    with engine.begin() as conn:
+        conn.execute(scans.insert(), [dict(id=s, email="a@example.com", target_url="https://example.com",
+                                           status="running", progress_json="{}") for s in scan_ids])
+    engine.dispose()
+
+    out: mp.Queue = mp.Queue()
+    start = mp.Event()
+    procs = [mp.Process(target=_run, args=("worker", (mode, url, s, seconds, interval), start, out))
+             for s in scan_ids]
+    procs += [mp.Process(target=_run, args=("poller", (mode, url, scan_ids, seconds, concurrency), start, out))
+              for _ in range(pollers)]
+    for p in procs:
+        p.start()
+    time.sleep(1.0 + 0.5 * len(procs))  # let every process finish importing
+    start.set()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    summary = {}
+    for role in ("write", "read"):
+        lat = [x for r in results if r["role"] == role for x in r["lat"]]
+        summary[role] = {
+            "ops_s": len(lat) / seconds,
+            "p50": _pct(lat, 0.50), "p99": _pct(lat, 0.99),
+            "errors": sum(r["errors"] for r in results if r["role"] == role),
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pollers", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent requests per poller process")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=0.05, help="pause between a worker's writes")
+    args = parser.parse_args()
+
+    mp.set_start_method("spawn")
+    print(f"{args.workers} writer processes, {args.pollers} poller processes x {args.concurrency}, "
+          f"{args.seconds:.0f} s per mode\n")
+    print(f"{'mode':6} {'role':5} {'ops/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'locked':>7}")
+    for mode in ("stock", "tuned"):
+        for role, s in run_mode(mode, args.workers, args.pollers, args.seconds, args.interval,
+                                args.concurrency).items():
+            print(f"{mode:6} {role:5} {s['ops_s']:>8.0f} {s['p50']:>8.2f} {s['p99']:>9.2f} {s['errors']:>7}")
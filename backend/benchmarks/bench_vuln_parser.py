@@ -0,0 +1,168 @@
+"""
+Benchmark: vulnerability-markdown parsing for a large Strix run directory.
+
+Generates a synthetic strix_runs/<run>/ with hundreds of large vulnerability reports (plus
+the vulnerabilities.csv index Strix writes) and times:
+
+  * baseline   — the previous parser: three line splits per file + a section dict, files
+                 parsed sequentially (kept below verbatim for comparison)
+  * single     — parse_vulnerability_md (one pass over the text), sequential
+  * run_dir    — parse_strix_run_dir with the thread pool disabled and enabled (the pool
+                 only engages with 2+ CPUs)
+
+The pool overlaps file reads (open/read release the GIL); parsing itself stays GIL-bound, so
+its gain depends on core count and whether the reports are already in the page cache.
+
+Usage (from backend/):
+    python benchmarks/bench_vuln_parser.py [--files 400] [--kb 64] [--repeat 3]
+"""
+
+import argparse
+import csv
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import strix_runner  # noqa: E402
+from app.strix_runner import normalize_severity, parse_strix_run_dir, parse_vulnerability_md  # noqa: E402
+
+
+def _baseline_split_sections(content: str) -> dict:
+    sections = {}
+    current_heading = ""
+    current_body = []
+    for line in content.split("\n"):
+        if line.startswith("## ") or line.startswith("### "):
+            if current_heading:
+                sections[current_heading] = "\n".join(current_body)
+            current_heading = line.lstrip("#").strip()
+            current_body = []
+        else:
+            current_body.append(line)
+    if current_heading:
+        sections[current_heading] = "\n".join(current_body)
+    return sections
+
+
+def baseline_parse_md(md_file: Path) -> dict | None:
+    try:
+        content = md_file.read_text(encoding="utf-8")
+    except Exception:
+        return None
+    finding = {"title": "", "severity": "Medium", "endpoint": "", "impact": "",
+               "reproduction_steps": "", "poc": "", "fix_guidance": ""}
+    for line in content.split("\n"):
+        if line.startswith("# "):
+            finding["title"] = line[2:].strip()
+            break
+    for heading, body in _baseline_split_sections(content).items():
+        h = heading.lower()
+        if "severity" in h:
+            finding["severity"] = normalize_severity(body.strip().split("\n")[0])
+        elif "endpoint" in h or "target" in h:
+            finding["endpoint"] = body.strip().split("\n")[0]
+        elif "impact" in h:
+            finding["impact"] = body.strip()
+        elif "description" in h and not finding["impact"]:
+            finding["impact"] = body.strip()
+        elif "proof of concept" in h or "poc" in h:
+            finding["poc"] = body.strip()
+        elif "technical analysis" in h:
+            finding["reproduction_steps"] = body.strip()
+        elif "remediation" in h or "fix" in h:
+            finding["fix_guidance"] = body.strip()
+    for line in content.split("\n")[:20]:
+        s = line.strip()
+        if s.startswith("- **Endpoint") or s.startswith("**Endpoint"):
+            finding["endpoint"] = line.split(":", 1)[-1].strip().strip("*")
+        elif s.startswith("- **Severity") or s.startswith("**Severity"):
+            finding["severity"] = normalize_severity(line.split(":", 1)[-1].strip().strip("*"))
+    if not finding["title"]:
+        finding["title"] = md_file.stem.replace("-", " ").title()
+    return finding
+
+
+def _report(i: int, target_bytes: int) -> str:
+    head = (
+        f"# Vulnerability {i}: SQL injection in /api/items/{i}\n\n"
+        f"- **Endpoint:** https://example.com/api/items/{i}\n"
+        f"- **Severity:** {'High' if i % 3 else 'Critical'}\n\n"
+        "## Description\nUser input reaches a raw SQL query.\n\n"
+        "## Impact\nFull database read access.\n\n"
+        "## Technical Analysis\n"
+    )
+    filler = "The `id` parameter is concatenated into the WHERE clause; responses differ by row count.\n"
+    poc = "\n## Proof of Concept\n```bash\ncurl 'https://example.com/api/items/1%27%20OR%201=1--'\n```\n"
+    fix = "\n## Remediation\nUse parameterized queries.\n"
+    body_len = max(0, target_bytes - len(head) - len(poc) - len(fix))
+    return head + filler * (body_len // len(filler) + 1) + poc + fix
+
+
+def build_run_dir(root: Path, files: int, kb: int) -> str:
+    run_name = "bench-run"
+    vuln_dir = root / "strix_runs" / run_name / "vulnerabilities"
+    vuln_dir.mkdir(parents=True)
+    rows = []
+    for i in range(files):
+        name = f"vuln-{i:04d}.md"
+        (vuln_dir / name).write_text(_report(i, kb * 1024), encoding="utf-8")
+        rows.append({"id": f"vuln-{i:04d}", "title": f"Vulnerability {i}", "severity": "high", "file": name})
+    with open(vuln_dir.parent / "vulnerabilities.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "title", "severity", "file"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return run_name
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--kb", type=int, default=64, help="approximate size of each report")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        root = Path(d)
+        run_name = build_run_dir(root, args.files, args.kb)
+        cwd = os.getcwd()
+        os.chdir(root)  # parse_strix_run_dir resolves strix_runs/ relative to the CWD
+        try:
+            md_files = sorted(Path(f"strix_runs/{run_name}/vulnerabilities").glob("*.md"))
+            assert [baseline_parse_md(p) for p in md_files] == [parse_vulnerability_md(p) for p in md_files]
+
+            results = {
+                "baseline (3 splits, sequential)": _time(lambda: [baseline_parse_md(p) for p in md_files], args.repeat),
+                "single pass, sequential": _time(lambda: [parse_vulnerability_md(p) for p in md_files], args.repeat),
+            }
+            threshold = strix_runner._PARALLEL_PARSE_MIN_FILES
+            strix_runner._PARALLEL_PARSE_MIN_FILES = args.files + 1
+            results["parse_strix_run_dir, sequential"] = _time(lambda: parse_strix_run_dir(run_name), args.repeat)
+            strix_runner._PARALLEL_PARSE_MIN_FILES = threshold
+            results["parse_strix_run_dir, thread pool"] = _time(lambda: parse_strix_run_dir(run_name), args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    total_mb = args.files * args.kb / 1024
+    print(f"{args.files} reports x ~{args.kb} KB ({total_mb:.1f} MB), median of {args.repeat}, "
+          f"{os.cpu_count()} CPU(s):")
+    base = next(iter(results.values()))
+    for label, secs in results.items():
+        print(f"  {label:<48} {secs * 1000:8.1f} ms  {total_mb / secs:7.1f} MB/s  x{base / secs:.2f}")
+
+
+if __name__ == "__main__":
+    main()
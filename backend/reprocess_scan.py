@@ -1,29 +1,66 @@
 """
 Reprocess a scan's results from raw Strix output files.
-Run on Hetzner: python reprocess_scan.py <scan_id>
+Run on Hetzner: python reprocess_scan.py <scan_id> [--force]
 
 This re-parses the strix_runs directory, re-generates the structured report,
-and updates the database with the corrected results.
+and updates the database with the corrected results. Identical reports are served from the
+extraction cache unless --force is given.
+
+Bulk mode re-extracts many completed scans after a prompt or model change:
+
+    python reprocess_scan.py --bulk --since 2026-09-01 --tier unlock --concurrency 4 --rate 30
+
+Scans are selected by created_at range / paid tier / status, extracted with bounded
+concurrency and a requests-per-minute limit, and checkpointed to a JSON file after every scan
+so an interrupted run resumes where it left off. Findings and the deterministic report facts
+already stored for a scan are kept; only the LLM narrative is regenerated. Scans that predate
+the scan_runs index are matched to their strix_runs/ directory by target host and report time;
+those with no run directory are counted separately and left out of the checkpoint. A
+throughput and cost summary is printed at the end.
 """
 
+import argparse
 import asyncio
 import json
 import sys
 import os
+import tempfile
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlparse
 
 # Add parent dir so app imports work
 sys.path.insert(0, os.path.dirname(__file__))
 
+from app.config import settings
+from app.archive import restore_scan
+from app.artifacts import REPORT_NAME, get_run_dir
 from app.database import database, scans
+from app.migrations import run_migrations
+from app.strix_adapter import parse_vulnerabilities
 from app.strix_runner import parse_strix_run_dir, normalize_severity, _is_real_finding
-from app.report_processor import process_scan_report
+from app.report_cache import cache_stats
+from app.report_facts import collect_report_facts
+from app.report_processor import is_fallback_report, process_scan_report_async, usage_stats
+from app.result_views import invalidate
+
 
+def _parse_run_findings(run_dir: Path) -> list[dict]:
+    """In-process runs live in strix_runs/<name>/ (markdown/CSV); CLI runs carry vulnerabilities.json.
 
-async def reprocess(scan_id: str):
+    Compared resolved, so an absolute or indexed path to strix_runs/<name>/ counts too."""
+    if run_dir.resolve().parent == Path("strix_runs").resolve():
+        return parse_strix_run_dir(run_dir.name)
+    return parse_vulnerabilities(run_dir)
+
+
+async def reprocess(scan_id: str, force: bool = False):
+    run_migrations()
     await database.connect()
 
-    # Fetch the scan
+    # Fetch the scan (an expired free one comes back from the archive first)
+    await restore_scan(scan_id)
     scan = await database.fetch_one(scans.select().where(scans.c.id == scan_id))
     if not scan:
         print(f"ERROR: Scan {scan_id} not found in database")
@@ -53,45 +90,49 @@ async def reprocess(scan_id: str):
             print(f"  - {f.get('title', '?')} [{f.get('severity', '?')}]")
         print()
 
-    # Find the strix_runs directory
-    run_dirs = sorted(Path("strix_runs").glob("*"), key=lambda p: p.stat().st_mtime, reverse=True)
-    print(f"Found {len(run_dirs)} run directories:")
-    for d in run_dirs[:10]:
-        print(f"  {d.name}")
-    print()
+    # Look the run up in the scan_runs index; fall back to picking from strix_runs/ by hand
+    # for scans that predate it.
+    run_dir = await get_run_dir(scan_id)
+    if run_dir is not None and run_dir.exists():
+        print(f"Indexed run directory: {run_dir}")
+    else:
+        run_dirs = sorted(Path("strix_runs").glob("*"), key=lambda p: p.stat().st_mtime, reverse=True)
+        print(f"Found {len(run_dirs)} run directories:")
+        for d in run_dirs[:10]:
+            print(f"  {d.name}")
+        print()
 
-    if not run_dirs:
-        print("ERROR: No strix_runs directories found")
-        return
+        if not run_dirs:
+            print("ERROR: No strix_runs directories found")
+            return
+
+        # Try to find the matching run dir - ask user to pick
+        print("Which directory matches this scan? Enter the name (or number from list):")
+        for i, d in enumerate(run_dirs[:10]):
+            # Check for report file
+            has_report = (d / "penetration_test_report.md").exists()
+            has_vulns = (d / "vulnerabilities").exists()
+            vuln_count = len(list((d / "vulnerabilities").glob("*.md"))) if has_vulns else 0
+            print(f"  [{i}] {d.name}  {'[REPORT]' if has_report else ''}  [vulns: {vuln_count}]")
 
-    # Try to find the matching run dir - ask user to pick
-    print("Which directory matches this scan? Enter the name (or number from list):")
-    for i, d in enumerate(run_dirs[:10]):
-        # Check for report file
-        has_report = (d / "penetration_test_report.md").exists()
-        has_vulns = (d / "vulnerabilities").exists()
-        vuln_count = len(list((d / "vulnerabilities").glob("*.md"))) if has_vulns else 0
-        print(f"  [{i}] {d.name}  {'[REPORT]' if has_report else ''}  [vulns: {vuln_count}]")
-
-    choice = input("\n> ").strip()
-    if choice.isdigit():
-        idx = int(choice)
-        if idx < len(run_dirs):
-            run_dir = run_dirs[idx]
+        choice = input("\n> ").strip()
+        if choice.isdigit():
+            idx = int(choice)
+            if idx < len(run_dirs):
+                run_dir = run_dirs[idx]
+            else:
+                print("Invalid choice")
+                return
         else:
-            print("Invalid choice")
-            return
-    else:
-        run_dir = Path("strix_runs") / choice
-        if not run_dir.exists():
-            print(f"Directory not found: {run_dir}")
-            return
+            run_dir = Path("strix_runs") / choice
+            if not run_dir.exists():
+                print(f"Directory not found: {run_dir}")
+                return
 
-    run_name = run_dir.name
     print(f"\nUsing: {run_dir}")
 
     # Parse findings from files
-    findings = parse_strix_run_dir(run_name)
+    findings = _parse_run_findings(run_dir)
     print(f"\nFile-based findings: {len(findings)}")
     for f in findings:
         print(f"  - {f.get('title', '?')} [{f.get('severity', '?')}]")
@@ -112,7 +153,10 @@ async def reprocess(scan_id: str):
         reprocess_report = input("\nReprocess structured report with GPT? (y/n): ").strip().lower()
         if reprocess_report == "y":
             print("Processing report...")
-            structured_report = process_scan_report(md, scan["target_url"])
+            facts = collect_report_facts(scan["target_url"], findings=findings, markdown=md)
+            structured_report = await process_scan_report_async(
+                md, scan["target_url"], facts=facts, use_cache=not force
+            )
             print(f"Structured report risk: {structured_report.get('risk_level', '?')}")
             areas = structured_report.get("areas_of_interest", [])
             print(f"Areas of interest: {len(areas)}")
@@ -144,14 +188,262 @@ async def reprocess(scan_id: str):
             status="completed",
         )
     )
+    await invalidate(scan_id)
     print(f"\nDone! Scan {scan_id} updated with {len(findings)} findings.")
     await database.disconnect()
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python reprocess_scan.py <scan_id>")
-        print("\nThis re-parses Strix output files and updates the database.")
-        sys.exit(1)
+# ---- Bulk mode ----
+
+
+class RateLimiter:
+    """Token bucket: at most ``per_minute`` acquisitions per minute, bursting up to ``burst``."""
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def load_checkpoint(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {"done": [], "failed": {}}
+    return {"done": list(data.get("done", [])), "failed": dict(data.get("failed", {}))}
+
+
+def save_checkpoint(path: Path, checkpoint: dict):
+    """Atomic write, so a kill mid-save never corrupts the resume state."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent if str(path.parent) else ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+# How far a run's report may be written from the scan's completed_at and still be its run.
+RUN_MATCH_WINDOW = timedelta(hours=6)
+
+
+def in_process_runs() -> list[tuple[datetime, Path]]:
+    """(report written at, run dir) for every strix_runs/<name>/ holding a report."""
+    root = Path("strix_runs")
+    if not root.is_dir():
+        return []
+    runs = []
+    for d in root.iterdir():
+        report = d / REPORT_NAME
+        if report.is_file():
+            runs.append((datetime.fromtimestamp(report.stat().st_mtime), d))
+    return runs
+
 
-    asyncio.run(reprocess(sys.argv[1]))
+def _match_in_process_run(scan: dict, runs: list[tuple[datetime, Path]]) -> Path | None:
+    """The strix_runs/ dir an unindexed in-process scan wrote — what single-scan mode asks a
+    human to pick: a report naming the target host, written closest to the scan's completion."""
+    host = (urlparse(scan.get("target_url") or "").hostname or "").lower()
+    when = scan.get("completed_at") or scan.get("created_at")
+    if not host or when is None:
+        return None
+    for _, d in sorted((r for r in runs if abs(r[0] - when) <= RUN_MATCH_WINDOW), key=lambda r: abs(r[0] - when)):
+        try:
+            if host in (d / REPORT_NAME).read_text(encoding="utf-8", errors="replace").lower():
+                return d
+        except OSError:
+            continue
+    return None
+
+
+def find_run_dir(scan: dict, results: dict, runs: list[tuple[datetime, Path]] | None = None) -> Path | None:
+    """Locate the Strix run directory for a scan that isn't in the scan_runs index.
+
+    ``runs`` is in_process_runs(), listed once by the caller when it looks up many scans."""
+    recorded = results.get("run_dir")
+    if recorded and (Path(recorded) / REPORT_NAME).exists():
+        return Path(recorded)
+    # CLI adapter layout: strix_cli_runs/<scan_id>/strix_runs/<run>/
+    cli_runs = Path("strix_cli_runs") / scan["id"] / "strix_runs"
+    if cli_runs.is_dir():
+        for d in sorted(cli_runs.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True):
+            if (d / REPORT_NAME).exists():
+                return d
+    # In-process runs from before the scan_runs index: strix_runs/<name>/
+    return _match_in_process_run(scan, in_process_runs() if runs is None else runs)
+
+
+def _stored_facts(report: dict | None) -> dict | None:
+    """Reuse the facts computed at scan time (they had the tracer's tool log; we don't)."""
+    if report and all(k in report for k in ("scan_stats", "categories_tested", "attack_surface")):
+        surface = report["attack_surface"] or {}
+        return {
+            "scan_stats": report["scan_stats"],
+            "categories_tested": report["categories_tested"],
+            "attack_surface": {k: surface.get(k, []) for k in ("subdomains", "key_routes", "technologies")},
+        }
+    return None
+
+
+async def _bulk_one(scan: dict, args, limiter: RateLimiter, runs: list[tuple[datetime, Path]]) -> tuple[str, str]:
+    """Re-extract one scan. Returns (outcome, detail) with outcome in updated/skipped/no_run/failed."""
+    if scan["results_json"] is None and await restore_scan(scan["id"]):
+        scan = dict(await database.fetch_one(scans.select().where(scans.c.id == scan["id"])))
+    results = json.loads(scan["results_json"]) if scan["results_json"] else {}
+    run_dir = await get_run_dir(scan["id"])
+    if run_dir is None or not (run_dir / REPORT_NAME).exists():
+        run_dir = find_run_dir(scan, results, runs)
+    if run_dir is None:
+        return "no_run", "no run directory with a report"
+
+    md = (run_dir / REPORT_NAME).read_text(encoding="utf-8")
+    findings = results.get("findings")
+    if findings is None:
+        findings = [f for f in _parse_run_findings(run_dir) if _is_real_finding(f)]
+    facts = _stored_facts(results.get("structured_report")) or collect_report_facts(
+        scan["target_url"], findings=findings, markdown=md
+    )
+
+    if args.dry_run:
+        return "skipped", f"dry run ({len(md)} chars from {run_dir})"
+
+    await limiter.acquire()
+    report = await process_scan_report_async(md, scan["target_url"], facts=facts, use_cache=not args.force)
+    if is_fallback_report(report):
+        # Extraction failed — keep the existing report rather than overwrite it with the fallback.
+        return "failed", "extraction fell back"
+
+    new_results = {**results, "findings": findings, "structured_report": report, "run_dir": str(run_dir)}
+    await database.execute(
+        scans.update().where(scans.c.id == scan["id"]).values(results_json=json.dumps(new_results))
+    )
+    await invalidate(scan["id"])
+    return "updated", f"risk={report.get('risk_level', '?')}"
+
+
+def _bulk_query(args):
+    query = scans.select().where(scans.c.status == args.status)
+    if args.since:
+        query = query.where(scans.c.created_at >= datetime.fromisoformat(args.since))
+    if args.until:
+        query = query.where(scans.c.created_at < datetime.fromisoformat(args.until))
+    if args.tier == "free":
+        query = query.where(scans.c.paid_tier.is_(None))
+    elif args.tier:
+        query = query.where(scans.c.paid_tier == args.tier)
+    if args.scan_type:
+        query = query.where(scans.c.scan_type == args.scan_type)
+    query = query.order_by(scans.c.created_at)
+    if args.limit:
+        query = query.limit(args.limit)
+    return query
+
+
+async def reprocess_bulk(args):
+    run_migrations()
+    await database.connect()
+    checkpoint_path = Path(args.checkpoint)
+    checkpoint = load_checkpoint(checkpoint_path)
+    done = set(checkpoint["done"])
+
+    selected = await database.fetch_all(_bulk_query(args))
+    todo = [dict(s) for s in selected if s["id"] not in done]
+    print(f"Selected {len(selected)} scans; {len(selected) - len(todo)} already done per "
+          f"{checkpoint_path}, {len(todo)} to process "
+          f"(concurrency={args.concurrency}, rate={args.rate}/min{', dry run' if args.dry_run else ''})")
+
+    sem = asyncio.Semaphore(max(1, args.concurrency))
+    limiter = RateLimiter(args.rate, burst=args.concurrency)
+    counts = {"updated": 0, "skipped": 0, "no_run": 0, "failed": 0}
+    runs = in_process_runs()
+    usage_before, cache_before = usage_stats(), cache_stats()
+    started = time.monotonic()
+
+    async def worker(scan: dict):
+        async with sem:
+            t0 = time.monotonic()
+            try:
+                outcome, detail = await _bulk_one(scan, args, limiter, runs)
+            except Exception as e:
+                outcome, detail = "failed", str(e)[:300]
+            counts[outcome] += 1
+            if outcome == "failed":
+                checkpoint["failed"][scan["id"]] = detail
+            elif not args.dry_run and outcome != "no_run":  # retried once its run dir turns up
+                checkpoint["done"].append(scan["id"])
+                checkpoint["failed"].pop(scan["id"], None)
+            if not args.dry_run:
+                save_checkpoint(checkpoint_path, checkpoint)
+            n = sum(counts.values())
+            print(f"[{n}/{len(todo)}] {scan['id']} {outcome}: {detail} ({time.monotonic() - t0:.1f}s)", flush=True)
+
+    try:
+        await asyncio.gather(*(worker(s) for s in todo))
+    finally:
+        elapsed = time.monotonic() - started
+        usage_after, cache_after = usage_stats(), cache_stats()
+        calls = usage_after["calls"] - usage_before["calls"]
+        tokens_in = usage_after["input_tokens"] - usage_before["input_tokens"]
+        tokens_out = usage_after["output_tokens"] - usage_before["output_tokens"]
+        cost = (tokens_in * settings.report_llm_input_cost_per_mtok
+                + tokens_out * settings.report_llm_output_cost_per_mtok) / 1_000_000
+        processed = sum(counts.values())
+
+        print("\n--- BULK SUMMARY ---")
+        print(f"Processed: {processed}/{len(todo)}  updated={counts['updated']} "
+              f"skipped={counts['skipped']} no_run_dir={counts['no_run']} failed={counts['failed']}")
+        print(f"Elapsed: {elapsed:.1f}s  throughput: {processed / elapsed * 60 if elapsed else 0:.1f} scans/min")
+        print(f"LLM calls: {calls}  tokens: {tokens_in} in / {tokens_out} out  "
+              f"est. cost: ${cost:.4f} ({settings.report_llm})")
+        print(f"Cache hits: {cache_after['hits'] - cache_before['hits']}  "
+              f"misses: {cache_after['misses'] - cache_before['misses']}")
+        if counts["no_run"]:
+            print(f"No run directory found for {counts['no_run']} scans — not reprocessed, and not "
+                  f"checkpointed, so a re-run tries them again")
+        if checkpoint["failed"]:
+            print(f"Failed scans recorded in {checkpoint_path} (re-run to retry them)")
+        await database.disconnect()
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="Reprocess scan results from raw Strix output.")
+    parser.add_argument("scan_id", nargs="?", help="Single scan to reprocess interactively")
+    parser.add_argument("--force", action="store_true",
+                        help="Bypass the extraction cache and always call the report LLM")
+    bulk = parser.add_argument_group("bulk mode")
+    bulk.add_argument("--bulk", action="store_true", help="Re-extract every scan matching the filters")
+    bulk.add_argument("--since", help="created_at >= this ISO date")
+    bulk.add_argument("--until", help="created_at < this ISO date")
+    bulk.add_argument("--tier", help="paid tier (unlock/pro/deep), or 'free' for unpaid scans")
+    bulk.add_argument("--scan-type", help="quick/pro/deep")
+    bulk.add_argument("--status", default="completed", help="scan status (default: completed)")
+    bulk.add_argument("--limit", type=int, default=0, help="process at most this many scans")
+    bulk.add_argument("--concurrency", type=int, default=4, help="scans extracted at once")
+    bulk.add_argument("--rate", type=float, default=30.0, help="max extractions started per minute (0 = unlimited)")
+    bulk.add_argument("--checkpoint", default="reprocess_checkpoint.json", help="resume state file")
+    bulk.add_argument("--dry-run", action="store_true", help="list what would be reprocessed; no LLM calls or writes")
+    args = parser.parse_args(argv)
+    if not args.bulk and not args.scan_id:
+        parser.error("give a scan_id, or --bulk with filters")
+    return args
+
+
+if __name__ == "__main__":
+    args = _parse_args(sys.argv[1:])
+    if args.bulk:
+        asyncio.run(reprocess_bulk(args))
+    else:
+        asyncio.run(reprocess(args.scan_id, force=args.force))
@@ -0,0 +1,73 @@
+"""Unit tests for app/activity.py (activity-feed rollups).
+
+Pure functions — runnable directly (`python tests/test_activity.py`) or via pytest.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.activity import rollup_activity  # noqa: E402
+
+
+def _events(*descriptions, status="completed"):
+    return [{"ts": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}", "description": d, "status": status}
+            for i, d in enumerate(descriptions)]
+
+
+def test_probes_under_one_prefix_collapse_with_count():
+    events = _events(*(f"[PROBE] Testing /api/item{i}" for i in range(140)))
+    rolled = rollup_activity(events)
+    assert len(rolled) == 1
+    assert rolled[0]["description"] == "[PROBE] Probed 140 endpoints under /api"
+    assert rolled[0]["count"] == 140
+    assert rolled[0]["line"] == 140
+    assert rolled[0]["ts"] == events[-1]["ts"]
+
+
+def test_interleaved_agents_still_collapse_and_lines_increase():
+    descriptions = []
+    for i in range(20):
+        descriptions += [f"[PROBE] GET request to /api/v{i}", "[ANALYZE] Processing scan results"]
+    descriptions.append("[VULN] SQL Injection vulnerability confirmed")
+    descriptions.append("[VULN] SQL Injection vulnerability confirmed")
+    rolled = rollup_activity(_events(*descriptions))
+    assert [r["description"] for r in rolled] == [
+        "[PROBE] Probed 20 endpoints under /api",
+        "[ANALYZE] Processing scan results (20x)",
+        "[VULN] SQL Injection vulnerability confirmed",
+        "[VULN] SQL Injection vulnerability confirmed",
+    ]
+    lines = [r["line"] for r in rolled]
+    assert lines == sorted(lines) and lines[-1] == len(descriptions)
+
+
+def test_output_is_bounded_and_single_events_unchanged():
+    events = _events(*(f"[RECON] Step {i}" for i in range(500)))
+    rolled = rollup_activity(events, max_entries=100)
+    assert len(rolled) == 100
+    assert rolled[0]["description"] == "[RECON] Step 400" and rolled[0]["count"] == 1
+    assert rolled[-1]["line"] == 500
+
+
+def test_running_status_survives_rollup():
+    events = _events("[PROBE] Testing /login", "[PROBE] Testing /login")
+    events[0]["status"] = "running"
+    rolled = rollup_activity(events)
+    assert rolled == [{"ts": events[1]["ts"], "description": "[PROBE] Testing /login (2x)",
+                       "status": "running", "line": 2, "count": 2}]
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,159 @@
+"""Tests for app/archive.py (expired free reports moved to gzip files, SQLite space reclaimed).
+
+Uses throwaway SQLite files and archive directories — runnable directly
+(`python tests/test_archive.py`) or via pytest.
+"""
+
+import asyncio
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import sqlalchemy as sa
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+if "app.database" not in sys.modules:  # keep the import-time engine off ./scanner.db
+    settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from app import archive  # noqa: E402
+from app.database import scans  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.sqlite_backend import TunedDatabase, tune_sqlite_connection  # noqa: E402
+
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+OLD = NOW - timedelta(days=archive.FREE_REPORT_TTL_DAYS, hours=1)
+
+
+def _setup() -> tuple[TunedDatabase, sa.Engine, str]:
+    settings.archive_dir = tempfile.mkdtemp()
+    path = f"{tempfile.mkdtemp()}/archive.db"
+    engine = sa.create_engine(f"sqlite:///{path}")
+    sa.event.listen(engine, "connect", lambda conn, _: tune_sqlite_connection(conn))
+    run_migrations(engine)
+    return TunedDatabase(f"sqlite:///{path}"), engine, path
+
+
+def _scan(scan_id: str, created_at: datetime, **values) -> dict:
+    return {"id": scan_id, "email": "a@example.com", "target_url": "https://x.io", "status": "completed",
+            "created_at": created_at, "results_json": json.dumps({"findings": [{"title": scan_id}]}),
+            "progress_json": json.dumps({"tools": 3}), **values}
+
+
+def _payloads(path: str) -> dict:
+    with sqlite3.connect(path) as conn:
+        return {r[0]: (r[1] is not None, r[2]) for r in conn.execute(
+            "SELECT id, results_json, archived_at FROM scans")}
+
+
+def test_archives_only_expired_free_scans_and_restores():
+    db, engine, path = _setup()
+    rows = [
+        _scan("old-free", OLD), _scan("old-failed", OLD - timedelta(days=1), status="failed"),
+        _scan("old-paid", OLD, paid_tier="unlock"), _scan("old-child", OLD, parent_scan_id="old-paid"),
+        _scan("old-running", OLD, status="running"), _scan("recent-free", NOW - timedelta(days=29)),
+    ]
+
+    async def run():
+        await db.connect()
+        try:
+            for row in rows:
+                await db.execute(scans.insert().values(**row))
+            first = await archive.archive_batch(NOW, limit=1, db=db)
+            second = await archive.archive_batch(NOW, limit=10, db=db)
+            third = await archive.archive_batch(NOW, limit=10, db=db)
+            on_disk = archive.load_archive("old-free")
+            restored = await archive.restore_scan("old-free", db=db)
+            again = await archive.restore_scan("old-free", db=db)
+            back = await db.fetch_one(scans.select().where(scans.c.id == "old-free"))
+            return first, second, third, on_disk, restored, again, back
+        finally:
+            await db.disconnect()
+
+    first, second, third, on_disk, restored, again, back = asyncio.run(run())
+    assert first["scans"] == 1 and second["scans"] == 1 and third["scans"] == 0  # oldest first, in batches
+    assert on_disk["results_json"] == rows[0]["results_json"] and on_disk["progress_json"] == '{"tools": 3}'
+    stored = _payloads(path)
+    assert stored["old-failed"][0] is False and stored["old-failed"][1] is not None
+    for kept in ("old-paid", "old-child", "old-running", "recent-free"):
+        assert stored[kept] == (True, None), kept
+    assert restored and not again
+    assert back["results_json"] == rows[0]["results_json"] and back["archived_at"] is None
+    assert not archive.archive_path("old-free").exists() and archive.archive_path("old-failed").exists()
+    engine.dispose()
+
+
+def test_scan_paid_mid_batch_keeps_its_payloads():
+    db, engine, path = _setup()
+    real_write = archive._write_archive
+
+    def write_then_pay(scan_id, payload):
+        size = real_write(scan_id, payload)
+        with sqlite3.connect(path) as conn:  # the payment lands between read and clear
+            conn.execute("UPDATE scans SET paid_tier = 'unlock' WHERE id = ?", (scan_id,))
+        return size
+
+    async def run():
+        await db.connect()
+        try:
+            await db.execute(scans.insert().values(**_scan("paying", OLD)))
+            archive._write_archive = write_then_pay
+            return await archive.archive_batch(NOW, db=db)
+        finally:
+            archive._write_archive = real_write
+            await db.disconnect()
+
+    assert asyncio.run(run())["scans"] == 0
+    assert _payloads(path)["paying"] == (True, None)
+    assert not archive.archive_path("paying").exists()
+    engine.dispose()
+
+
+def test_freed_pages_are_reclaimed_incrementally():
+    db, engine, path = _setup()
+    big = json.dumps({"findings": [{"poc": random.randbytes(8000).hex()} for _ in range(8)]})  # incompressible
+
+    async def run():
+        await db.connect()
+        try:
+            for i in range(20):
+                await db.execute(scans.insert().values(**_scan(f"s{i:02d}", OLD, results_json=big)))
+            await db.execute(sa.text("PRAGMA wal_checkpoint(TRUNCATE)"))
+            return await archive.archive_batch(NOW, db=db)
+        finally:
+            await db.disconnect()
+
+    assert asyncio.run(run())["scans"] == 20
+    first = archive.reclaim_space(engine, max_pages=10)
+    rest = archive.reclaim_space(engine)
+    assert first["auto_vacuum"] == 2 and first["released_pages"] == 10
+    assert rest["released_pages"] > 0 and rest["freelist_pages"] == 0
+
+    legacy = sa.create_engine(f"sqlite:///{tempfile.mkdtemp()}/legacy.db")  # made without the profile
+    with legacy.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (x)")
+    assert archive.reclaim_space(legacy)["auto_vacuum"] == 0
+    archive.vacuum(legacy)
+    assert archive.reclaim_space(legacy)["auto_vacuum"] == 2
+    engine.dispose()
+    legacy.dispose()
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,88 @@
+"""Tests for app.artifacts (scan → run-directory / artifact index).
+
+Uses a throwaway SQLite database — no Strix or OpenAI. Runnable directly
+(`python tests/test_artifacts.py`) or via pytest.
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+if "app.database" not in sys.modules:  # keep the import-time engine off ./scanner.db
+    settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from app import artifacts  # noqa: E402
+from app.database import database, scan_artifacts  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+
+run_migrations()
+
+
+def _make_run_dir(base: Path) -> Path:
+    run_dir = base / "strix_runs" / "example-com_ab12"
+    (run_dir / "vulnerabilities").mkdir(parents=True)
+    (run_dir / "penetration_test_report.md").write_text("# Report\n" + "x" * 100, encoding="utf-8")
+    (run_dir / "vulnerabilities" / "vuln-0001.md").write_text("# SQLi", encoding="utf-8")
+    (run_dir / "vulnerabilities.csv").write_text("id,title\n", encoding="utf-8")
+    (run_dir / "run.json").write_text("{}", encoding="utf-8")
+    return run_dir
+
+
+def test_index_run_dir_classifies_and_sizes_files():
+    with tempfile.TemporaryDirectory() as d:
+        files = artifacts.index_run_dir(_make_run_dir(Path(d)))
+        assert [(f["path"], f["kind"]) for f in files] == [
+            ("penetration_test_report.md", "report"),
+            ("run.json", "run"),
+            ("vulnerabilities.csv", "vulnerability"),
+            ("vulnerabilities/vuln-0001.md", "vulnerability"),
+        ]
+        assert files[0]["size_bytes"] == len("# Report\n") + 100
+    assert artifacts.index_run_dir(Path("/nonexistent/run")) == []
+
+
+def test_record_start_finish_and_lookup():
+    async def run(run_dir: Path):
+        await database.connect()
+        try:
+            assert await artifacts.get_run_dir("scan-a") is None
+            await artifacts.record_run_start("scan-a", run_dir, "example-com_ab12")
+            assert await artifacts.get_run_dir("scan-a") == run_dir
+            await artifacts.record_run_finish("scan-a", run_dir)
+            await artifacts.record_run_finish("scan-a", run_dir)  # re-index replaces, never duplicates
+            rows = await database.fetch_all(
+                scan_artifacts.select().where(scan_artifacts.c.scan_id == "scan-a").order_by(scan_artifacts.c.path)
+            )
+            reports = [r for r in rows if r["kind"] == "report"]
+            everything = rows
+            # finish without a prior start still records the run
+            await artifacts.record_run_finish("scan-b", run_dir)
+            return reports, everything, await artifacts.get_run_dir("scan-b")
+        finally:
+            await database.disconnect()
+
+    with tempfile.TemporaryDirectory() as d:
+        run_dir = _make_run_dir(Path(d))
+        reports, everything, run_b = asyncio.run(run(run_dir))
+        assert [r["path"] for r in reports] == ["penetration_test_report.md"]
+        assert len(everything) == 4
+        assert run_b == run_dir
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
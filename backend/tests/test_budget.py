@@ -0,0 +1,133 @@
+"""Unit tests for app/budget.py (push-based cost limits and the adaptive controller).
+
+No Strix or LiteLLM needed — runnable directly (`python tests/test_budget.py`) or via pytest.
+"""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import budget  # noqa: E402
+from app.budget import AdaptiveController, BudgetGovernor, _call_cost  # noqa: E402
+
+
+def test_soft_then_hard_fire_once_per_call():
+    fired = []
+    gov = BudgetGovernor("s1", 4.0, 1.5, on_soft=lambda: fired.append("soft"), on_hard=lambda: fired.append("hard"))
+    for _ in range(3):
+        gov.charge(1.0)
+    assert fired == []
+    gov.charge(1.2)  # 4.2 — over the limit on this very call, not 5 s later
+    assert fired == ["soft"] and gov.soft_at == 4.2
+    gov.charge(1.0)
+    gov.charge(1.0)  # 6.2 >= 6.0
+    gov.charge(1.0)
+    assert fired == ["soft", "hard"] and gov.hard_tripped
+
+    s = gov.summary()
+    assert (s["limit"], s["hard_limit"], s["spent"], s["llm_calls"]) == (4.0, 6.0, 7.2, 7)
+    assert s["overshoot"] == 3.2 and s["overshoot_pct"] == 80.0
+
+
+def test_observe_total_is_a_backstop_and_never_decreases():
+    fired = []
+    gov = BudgetGovernor("s2", 2.0, on_soft=lambda: fired.append("soft"))
+    gov.charge(0.5)
+    gov.observe_total(2.5)  # tracer saw spend the hook missed
+    assert fired == ["soft"] and gov.spent == 2.5
+    gov.observe_total(1.0)
+    assert gov.spent == 2.5
+
+
+def test_zero_limit_tracks_but_never_enforces():
+    gov = BudgetGovernor("s3", 0.0, on_soft=lambda: 1 / 0, on_hard=lambda: 1 / 0)
+    gov.charge(100.0)
+    s = gov.summary()
+    assert s["spent"] == 100.0 and s["overshoot"] == 0.0 and s["soft_at"] is None
+
+
+def test_thread_charges_are_handed_to_the_scan_loop():
+    async def run():
+        seen = []
+        gov = BudgetGovernor("s4", 1.0, on_soft=lambda: seen.append(threading.current_thread().name),
+                             loop=asyncio.get_running_loop())
+        budget.activate_governor(gov)
+        try:
+            worker = threading.Thread(target=budget.charge_active, args=(1.5,), name="agent-thread")
+            worker.start()
+            worker.join()
+            await asyncio.sleep(0)
+        finally:
+            budget.deactivate_governor(gov)
+        budget.charge_active(5.0)  # no active governor: ignored
+        return seen, gov.spent
+
+    seen, spent = asyncio.run(run())
+    assert seen == [threading.main_thread().name] and spent == 1.5
+
+
+def test_call_cost_prefers_callback_cost():
+    assert _call_cost({"response_cost": 0.0123}, None) == 0.0123
+    assert _call_cost({}, object()) == 0.0  # unpriceable (or no litellm): 0, polling covers it
+
+
+def test_controller_shrinks_cap_when_burn_overshoots_target():
+    ctl = AdaptiveController("a1", target_cost=10.0, target_seconds=600, max_agents=20,
+                             max_iterations=300, min_interval=0)
+    assert ctl.step(elapsed=0, spent=0.0, findings=0, iteration=0, max_iterations=300) is None  # no rate yet
+    # $5 in 60 s -> $50 projected at 10 min, 5x the target
+    changes = ctl.step(elapsed=60, spent=5.0, findings=1, iteration=10, max_iterations=300)
+    assert changes["max_agents"] == 4
+    # $5 left at $0.50/iteration -> 10 more iterations, not the remaining 290
+    assert changes["max_iterations"] == 20
+    adj = ctl.adjustments[-1]
+    assert adj["max_agents"] == 4 and "projected" in adj["reason"] and adj["spent"] == 5.0
+
+
+def test_controller_rate_limits_and_never_exceeds_tier_caps():
+    ctl = AdaptiveController("a2", target_cost=100.0, target_seconds=3600, max_agents=8,
+                             max_iterations=50, min_interval=120)
+    ctl.agents = 2
+    ctl.step(elapsed=0, spent=0.0, findings=0, iteration=0, max_iterations=50)
+    changes = ctl.step(elapsed=60, spent=0.5, findings=2, iteration=5, max_iterations=50)
+    assert changes == {"max_agents": 4}  # cheap and productive: grow back, iterations untouched
+    assert ctl.step(elapsed=90, spent=0.6, findings=3, iteration=6, max_iterations=50) is None  # too soon
+    for t in range(300, 1500, 150):
+        ctl.step(elapsed=t, spent=t / 600, findings=3 + t, iteration=10, max_iterations=50)
+    assert ctl.agents == 8 and all(a.get("max_iterations", 50) <= 50 for a in ctl.adjustments)
+
+
+def test_controller_halves_cap_when_findings_dry_up():
+    ctl = AdaptiveController("a3", target_cost=0, target_seconds=1000, max_agents=10,
+                             max_iterations=1000, min_interval=0)
+    ctl.step(elapsed=0, spent=0.0, findings=1, iteration=1, max_iterations=1000)
+    changes = ctl.step(elapsed=600, spent=1.0, findings=1, iteration=600, max_iterations=1000)
+    assert changes["max_agents"] == 5 and "no new findings" in ctl.adjustments[-1]["reason"]
+    assert "max_iterations" not in changes  # no cost target: iterations are left alone
+
+
+def test_controller_never_cuts_iterations_for_time_alone():
+    ctl = AdaptiveController("a4", target_cost=100.0, target_seconds=600, max_agents=10,
+                             max_iterations=300, min_interval=0)
+    ctl.step(elapsed=0, spent=0.0, findings=1, iteration=0, max_iterations=300)
+    # Past the target duration at 10 s/iteration but cheap: only the wall clock ends the scan.
+    for t in range(60, 1200, 60):
+        changes = ctl.step(elapsed=t, spent=t / 1000, findings=1, iteration=t // 10, max_iterations=300)
+        assert not changes or "max_iterations" not in changes
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,147 @@
+"""Tests for app/compression.py (zlib-encoded results_json / progress_json on SQLite).
+
+Uses throwaway SQLite files — runnable directly (`python tests/test_compression.py`) or via
+pytest.
+"""
+
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import sqlalchemy as sa
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+if "app.database" not in sys.modules:  # keep the import-time engine off ./scanner.db
+    settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from app import compression  # noqa: E402
+from app.database import scans  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.sqlite_backend import TunedDatabase, tune_sqlite_connection  # noqa: E402
+
+
+def _report(findings: int) -> str:
+    return json.dumps({"findings": [
+        {"title": f"Reflected XSS in /search #{i}", "severity": "Medium",
+         "poc_script_code": "import requests\nr = requests.get(URL, params={'q': '<script>'})\n" * 4,
+         "reproduction_steps": ["Open /search", "Submit the payload", "Observe the alert"]}
+        for i in range(findings)
+    ]})
+
+
+def _database() -> tuple[TunedDatabase, str]:
+    path = f"{tempfile.mkdtemp()}/blobs.db"
+    engine = sa.create_engine(f"sqlite:///{path}")
+    sa.event.listen(engine, "connect", lambda conn, _: tune_sqlite_connection(conn))
+    run_migrations(engine)
+    engine.dispose()
+    return TunedDatabase(f"sqlite:///{path}"), path
+
+
+def _stored_types(path: str) -> dict:
+    with sqlite3.connect(path) as conn:
+        return {r[0]: (r[1], r[2]) for r in conn.execute(
+            "SELECT id, typeof(results_json), typeof(progress_json) FROM scans")}
+
+
+def test_encode_decode_roundtrip():
+    big, small = _report(40), json.dumps({"findings": []})
+    before = compression.compression_stats()  # process-wide counters: compare deltas
+    packed = compression.encode(big)
+    assert isinstance(packed, bytes) and packed[:1] == compression.FORMAT_ZLIB
+    assert len(packed) * 4 < len(big.encode())
+    assert compression.decode(packed) == big and compression.decode(big) == big
+    assert compression.encode(small) == small  # under the threshold: stays text
+    try:
+        compression.decode(b"\x09garbage")
+        raise AssertionError("unknown format byte was accepted")
+    except ValueError:
+        pass
+    stats = compression.compression_stats()
+    assert stats["encoded"] - before["encoded"] == 1 and stats["decoded"] - before["decoded"] == 1
+    assert (stats["raw_bytes"] - before["raw_bytes"]) / (stats["stored_bytes"] - before["stored_bytes"]) > 4
+    assert stats["ratio"] > 1 and stats["decode_ms_avg"] is not None
+
+
+def test_columns_are_compressed_transparently():
+    db, path = _database()
+    big = _report(30)
+
+    async def run():
+        await db.connect()
+        try:
+            await db.execute(scans.insert().values(id="big", email="a@example.com", target_url="https://x.io",
+                                                   status="completed", results_json=big, progress_json="{}"))
+            full = await db.fetch_one(scans.select().where(scans.c.id == "big"))
+            returned = await db.fetch_one(scans.update().where(scans.c.id == "big").values(status="completed")
+                                          .returning(scans.c.results_json))
+            return full, returned
+        finally:
+            await db.disconnect()
+
+    full, returned = asyncio.run(run())
+    assert full["results_json"] == big and full["progress_json"] == "{}"
+    assert returned["results_json"] == big
+    assert _stored_types(path)["big"] == ("blob", "text")
+
+
+def test_reencode_rewrites_only_settled_plain_rows():
+    db, path = _database()
+    big = _report(20)
+    with sqlite3.connect(path) as conn:  # rows as written before compression existed
+        conn.executemany(
+            "INSERT INTO scans (id, email, target_url, status, results_json, progress_json, created_at) "
+            "VALUES (?, 'a@example.com', 'https://x.io', ?, ?, ?, datetime('now'))",
+            [("done", "completed", big, big), ("failed", "failed", big, "{}"),
+             ("live", "running", None, big), ("raced", "completed", big, None)],
+        )
+
+    async def run():
+        await db.connect()
+        real_encode = compression.encode
+
+        def racing_encode(text):
+            # Someone rewrites "raced" between the re-encoder's read and its update.
+            with sqlite3.connect(path) as conn:
+                conn.execute("UPDATE scans SET results_json = '{\"new\": true}' WHERE id = 'raced'")
+            return real_encode(text)
+
+        try:
+            compression.encode = racing_encode
+            first = await compression.reencode_batch(db, limit=10)
+            compression.encode = real_encode
+            again = await compression.reencode_all(db)
+            rows = {r["id"]: r for r in await db.fetch_all(scans.select())}
+        finally:
+            compression.encode = real_encode
+            await db.disconnect()
+        return first, again, rows
+
+    first, again, rows = asyncio.run(run())
+    types = _stored_types(path)
+    assert first == {"scans": 3, "columns": 3}, first
+    assert again == {"scans": 0, "columns": 0}, again
+    assert types["done"] == ("blob", "blob") and types["failed"] == ("blob", "text")
+    assert types["live"] == ("null", "text")  # running: left alone
+    assert types["raced"] == ("text", "null") and rows["raced"]["results_json"] == '{"new": true}'
+    assert rows["done"]["results_json"] == big and rows["done"]["progress_json"] == big
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
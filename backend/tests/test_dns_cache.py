@@ -0,0 +1,132 @@
+"""Tests for app/dns_cache.py (async resolver with positive/negative TTL cache).
+
+The lookup backend and the clock are swapped for fakes, so nothing here touches the network.
+Runnable directly (`python tests/test_dns_cache.py`) or via pytest.
+"""
+
+import asyncio
+import socket
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import dns_cache  # noqa: E402
+from app.config import settings  # noqa: E402
+
+
+class _FakeDNS:
+    """Stands in for dns_cache._lookup: canned answers, a call log, an optional delay."""
+
+    def __init__(self, answers: dict, delay: float = 0.0):
+        self.answers, self.delay, self.calls = answers, delay, []
+
+    async def __call__(self, host: str):
+        self.calls.append(host)
+        await asyncio.sleep(self.delay)
+        answer = self.answers[host]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@contextmanager
+def _installed(fake: _FakeDNS):
+    """Fresh module state with the fake resolver; yields a settable clock."""
+    now = [1000.0]
+    real = dns_cache._lookup, dns_cache._clock
+    dns_cache._cache.clear()
+    dns_cache._in_flight.clear()
+    dns_cache._latencies.clear()
+    dns_cache._stats.update(dict.fromkeys(dns_cache._stats, 0))
+    dns_cache._lookup, dns_cache._clock = fake, lambda: now[0]
+    try:
+        yield now
+    finally:
+        dns_cache._lookup, dns_cache._clock = real
+        dns_cache._cache.clear()
+
+
+def test_answers_cached_for_clamped_ttl():
+    fake = _FakeDNS({"short.example": (["93.184.216.34"], 1), "long.example": (["1.1.1.1", "::1"], 86400)})
+    with _installed(fake) as now:
+        async def run():
+            first = await dns_cache.resolve("Short.Example.")
+            again = await dns_cache.resolve("short.example")
+            now[0] += settings.dns_min_ttl_seconds - 1  # a 1 s record TTL is held to the minimum
+            still = await dns_cache.resolve("short.example")
+            now[0] += 2
+            refreshed = await dns_cache.resolve("short.example")
+            await dns_cache.resolve("long.example")
+            now[0] += settings.dns_max_ttl_seconds + 1  # and a day-long one to the maximum
+            await dns_cache.resolve("long.example")
+            literal = await dns_cache.resolve("10.0.0.1")
+            return first, again, still, refreshed, literal
+
+        first, again, still, refreshed, literal = asyncio.run(run())
+        assert first == again == still == refreshed == ["93.184.216.34"]
+        assert fake.calls == ["short.example", "short.example", "long.example", "long.example"]
+        assert literal == ["10.0.0.1"]  # IP literals never reach the resolver
+        stats = dns_cache.resolver_stats()
+        assert (stats["lookups"], stats["hits"], stats["misses"]) == (6, 2, 4) and stats["p95_ms"] is not None
+        assert dns_cache.is_private_address("10.0.0.1") and dns_cache.is_private_address("fe80::1%eth0")
+        assert not dns_cache.is_private_address("93.184.216.34")
+
+
+def test_negative_answers_cached_but_transient_failures_not():
+    fake = _FakeDNS({
+        "gone.example": socket.gaierror(socket.EAI_NONAME, "Name or service not known"),
+        "flaky.example": socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution"),
+    })
+    with _installed(fake) as now:
+        async def outcome(host):
+            try:
+                return await dns_cache.resolve(host)
+            except socket.gaierror as e:
+                return e.errno
+
+        async def run():
+            gone = [await outcome("gone.example") for _ in range(3)]
+            now[0] += settings.dns_negative_ttl_seconds + 1
+            expired = await outcome("gone.example")
+            flaky = [await outcome("flaky.example") for _ in range(2)]
+            return gone, expired, flaky
+
+        gone, expired, flaky = asyncio.run(run())
+        assert gone == [socket.EAI_NONAME] * 3 and expired == socket.EAI_NONAME
+        assert flaky == [socket.EAI_AGAIN] * 2
+        assert fake.calls.count("gone.example") == 2 and fake.calls.count("flaky.example") == 2
+        assert dns_cache.resolver_stats()["negative_hits"] == 2
+
+
+def test_concurrent_lookups_share_one_query_and_time_out():
+    fake = _FakeDNS({"busy.example": (["93.184.216.34"], 60), "slow.example": (["93.184.216.35"], 60)}, delay=0.05)
+    with _installed(fake):
+        async def run():
+            shared = await asyncio.gather(*(dns_cache.resolve("busy.example") for _ in range(20)))
+            try:
+                await dns_cache.resolve("slow.example", timeout=0.01)
+                timed_out = False
+            except asyncio.TimeoutError:
+                timed_out = True
+            return shared, timed_out
+
+        shared, timed_out = asyncio.run(run())
+        assert shared == [["93.184.216.34"]] * 20 and fake.calls.count("busy.example") == 1
+        assert timed_out and "slow.example" not in dns_cache._cache  # a timeout isn't cached
+        assert dns_cache.resolver_stats()["timeouts"] == 1 and not dns_cache._in_flight
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
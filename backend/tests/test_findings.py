@@ -0,0 +1,100 @@
+"""Unit tests for app.findings (fingerprint dedupe + field-level merge).
+
+Pure functions — no Strix or OpenAI. Runnable directly (`python tests/test_findings.py`)
+or via pytest.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.findings import fingerprint, merge_findings, normalize_endpoint  # noqa: E402
+
+
+def _f(title, **fields):
+    base = {"title": title, "severity": "Medium", "endpoint": "", "impact": "",
+            "reproduction_steps": "", "poc": "", "fix_guidance": ""}
+    base.update(fields)
+    return base
+
+
+def test_normalize_endpoint():
+    assert normalize_endpoint("https://Example.com/API/Users/123?x=1#frag") == "/api/users"
+    assert normalize_endpoint("POST /api/orders/9f8e7d6c5b4a39281706/items") == "/api/orders/{id}/items"
+    assert normalize_endpoint("/login/") == "/login"
+    assert normalize_endpoint("login form") == ""
+    assert normalize_endpoint("") == ""
+
+
+def test_reworded_titles_share_a_fingerprint():
+    a = fingerprint(_f("SQL Injection in /login"))
+    assert a == fingerprint(_f("SQLi on login endpoint")) == ("sqli", "/login", "")
+    assert fingerprint(_f("Blind SQL injection", endpoint="https://example.com/login?user=a")) == \
+        ("sqli", "/login", "blind")
+    assert a != fingerprint(_f("Reflected XSS in /login"))
+    assert a != fingerprint(_f("SQL Injection in /search"))
+    # Across sources, a title saying no more than class + endpoint joins the specific one.
+    merged = merge_findings([_f("Blind SQL injection", endpoint="/login")], [_f("SQLi on login endpoint")])
+    assert [m["title"] for m in merged] == ["Blind SQL injection"]
+
+
+def test_same_class_without_endpoint_stays_distinct():
+    assert fingerprint(_f("Verbose error messages")) != fingerprint(_f("Exposed .git directory"))
+    merged = merge_findings([_f(""), _f("")])
+    assert len(merged) == 2  # nothing identifying → never merged away
+
+
+def test_distinct_findings_of_one_class_and_endpoint_survive():
+    disk = [
+        _f("Missing Content-Security-Policy header", endpoint="https://example.com"),
+        _f("Missing HSTS header", endpoint="https://example.com/"),
+        _f("Exposed .git directory", endpoint="/"),
+        _f("Verbose stack trace", endpoint="/"),
+        _f("Reflected XSS in q parameter", endpoint="/search"),
+        _f("Stored XSS in comment body", endpoint="/search"),
+    ]
+    assert merge_findings(disk) == disk  # one source: nothing is ever merged
+    # Another source re-reporting two of them merges into the matching ones only.
+    tracer = [_f("Stored XSS via comment body", endpoint="/search", poc="<script>"),
+              _f("Missing HSTS header", endpoint="/", severity="High")]
+    merged = merge_findings(disk, tracer)
+    assert [m["title"] for m in merged] == [f["title"] for f in disk]
+    assert merged[5]["poc"] == "<script>" and merged[4]["poc"] == ""
+    assert merged[1]["severity"] == "High" and merged[0]["severity"] == "Medium"
+
+
+def test_merge_keeps_most_complete_fields_single_pass():
+    disk = [_f("SQL Injection in /login", severity="High", impact="short"),
+            _f("Missing security headers", severity="Low")]
+    tracer = [_f("SQLi on login endpoint", severity="Critical", endpoint="https://example.com/login",
+                 impact="Full read access to the users table", poc="curl -d \"u=' OR 1=1--\" /login")]
+    callback = [_f("sql injection in /login", fix_guidance="Use parameterized queries", poc="n/a"),
+                _f("Stored XSS in /comments", severity="High")]
+
+    merged = merge_findings(disk, tracer, callback)
+    assert [m["title"] for m in merged] == [
+        "SQL Injection in /login", "Missing security headers", "Stored XSS in /comments",
+    ]
+    sqli = merged[0]
+    assert sqli["severity"] == "Critical"
+    assert sqli["endpoint"] == "https://example.com/login"
+    assert sqli["impact"] == "Full read access to the users table"
+    assert sqli["poc"].startswith("curl")  # "n/a" never replaces a real value
+    assert sqli["fix_guidance"] == "Use parameterized queries"
+    # Inputs are not mutated.
+    assert disk[0]["impact"] == "short" and disk[0]["severity"] == "High"
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,153 @@
+"""Tests for app/migrations.py — versioning, legacy upgrades, and that every hot query is indexed.
+
+Each test migrates its own throwaway SQLite file. Runnable directly
+(`python tests/test_migrations.py`) or via pytest.
+"""
+
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import sqlalchemy as sa
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+if "app.database" not in sys.modules:  # keep the import-time engine off ./scanner.db
+    settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from app.archive import expired_query  # noqa: E402
+from app.database import scans  # noqa: E402
+from app.jobs import claim_query  # noqa: E402
+from app.migrations import MIGRATIONS, applied_versions, run_migrations  # noqa: E402
+from app.result_views import report_query  # noqa: E402
+
+
+def _engine():
+    return sa.create_engine(f"sqlite:///{tempfile.mkdtemp()}/migrate.db")
+
+
+def test_fresh_database_applies_every_step_once():
+    engine = _engine()
+    assert run_migrations(engine) == [v for v, _, _ in MIGRATIONS]
+    assert run_migrations(engine) == []
+    assert applied_versions(engine) == {v for v, _, _ in MIGRATIONS}
+    names = {ix["name"] for ix in sa.inspect(engine).get_indexes("scans")}
+    assert {ix.name for ix in scans.indexes} <= names
+
+
+def test_legacy_database_gets_columns_and_indexes_without_losing_rows():
+    engine = _engine()
+    with engine.begin() as conn:  # the original schema, before attribution / deferral columns
+        conn.execute(sa.text(
+            "CREATE TABLE scans (id VARCHAR(36) PRIMARY KEY, email VARCHAR(255) NOT NULL, "
+            "target_url VARCHAR(2048) NOT NULL, status VARCHAR(20), scan_type VARCHAR(20), "
+            "results_json TEXT, created_at DATETIME, completed_at DATETIME, paid_tier VARCHAR(20), "
+            "stripe_payment_id VARCHAR(255), retry_count INTEGER, progress_json TEXT)"
+        ))
+        conn.execute(sa.text("INSERT INTO scans (id, email, target_url, status) "
+                             "VALUES ('old-1', 'a@example.com', 'https://example.com', 'completed')"))
+    run_migrations(engine)
+    columns = {c["name"] for c in sa.inspect(engine).get_columns("scans")}
+    assert {"parent_scan_id", "utm_source", "landing_page", "not_before"} <= columns
+    with engine.connect() as conn:
+        row = conn.execute(sa.select(scans.c.id, scans.c.parent_scan_id)).one()
+    assert tuple(row) == ("old-1", None)
+    assert "ix_scans_parent_status_completed" in {ix["name"] for ix in sa.inspect(engine).get_indexes("scans")}
+
+
+def test_baseline_is_the_frozen_version_1_schema():
+    engine = _engine()
+    with engine.begin() as conn:
+        MIGRATIONS[0][2](conn)  # version 1 only
+    inspector = sa.inspect(engine)
+    assert "result_views" not in inspector.get_table_names()  # added by version 6
+    assert "archived_at" not in {c["name"] for c in inspector.get_columns("scans")}  # version 5
+    assert not {ix["name"] for ix in inspector.get_indexes("scans")} & {ix.name for ix in scans.indexes}
+
+
+def test_concurrent_starts_apply_each_step_once():
+    path = f"{tempfile.mkdtemp()}/race.db"
+    results, errors = [], []
+    start = threading.Barrier(4)
+
+    def migrate():
+        engine = sa.create_engine(f"sqlite:///{path}")
+        start.wait()
+        try:
+            results.append(run_migrations(engine))
+        except Exception as e:  # noqa: BLE001 — any failure is the bug under test
+            errors.append(e)
+
+    threads = [threading.Thread(target=migrate) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors
+    applied = sorted(v for r in results for v in r)
+    assert applied == [v for v, _, _ in MIGRATIONS]  # every version applied by exactly one process
+
+
+def _hot_queries():
+    """The app's hot scans queries (worker, postprocess, results/PDF, child-status, payments,
+    dashboard, drip), built the same way the code builds them."""
+    now = datetime.now()
+    child_of = scans.c.parent_scan_id == "p"
+    return {
+        "worker pending poll": sa.select(scans.c.id).where(
+            (scans.c.status == "pending")
+            & ((scans.c.not_before.is_(None)) | (scans.c.not_before <= now))
+        ),
+        "worker claim": claim_query(now),
+        "worker stuck reset": sa.select(scans.c.id).where(scans.c.status.in_(("running", "cancelling"))),
+        "postprocess queue": sa.select(scans.c.id).where(
+            (scans.c.status == "postprocessing")
+            & ((scans.c.not_before.is_(None)) | (scans.c.not_before <= now))
+        ).order_by(scans.c.created_at),
+        "report source (scan + best completed child)": report_query("p", "results_json", "progress_json"),
+        "child status": sa.select(scans.c.id).where(child_of).order_by(scans.c.created_at.desc()),
+        "existing child": sa.select(scans.c.id).where(child_of & (scans.c.scan_type == "pro")),
+        "dashboard page": sa.select(scans.c.id).order_by(scans.c.created_at.desc()).limit(250),
+        "dashboard totals": sa.select(scans.c.status, sa.func.count()).group_by(scans.c.status),
+        "drip candidates": sa.select(scans.c.id).where(
+            (scans.c.status == "completed") & (scans.c.paid_tier.is_(None))
+            & (scans.c.created_at <= now - timedelta(hours=1))
+            & (scans.c.created_at >= now - timedelta(days=30))
+        ).order_by(scans.c.created_at.desc()),
+        "drip paid emails": sa.select(scans.c.email).where(scans.c.paid_tier.isnot(None)).distinct(),
+        "scans by email": sa.select(scans.c.id).where(scans.c.email == "a@example.com"),
+        "expiry batch": expired_query(now, 100),
+    }
+
+
+def test_every_hot_query_uses_an_index():
+    engine = _engine()
+    run_migrations(engine)
+    with engine.connect() as conn:
+        for name, query in _hot_queries().items():
+            sql = str(query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.execute(sa.text("EXPLAIN QUERY PLAN " + sql))]
+            table_steps = [step for step in plan if "scans" in step]
+            assert table_steps and all("INDEX" in step for step in table_steps), (name, plan)
+            # A full pass is only OK over a covering index, or in index order under a LIMIT.
+            for step in table_steps:
+                if step.startswith("SCAN"):
+                    assert "COVERING" in step or name == "dashboard page", (name, plan)
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,144 @@
+"""Tests for app/rate_limit.py (atomic monthly quota upsert + in-process fast paths).
+
+Uses throwaway SQLite files; the cross-process test spawns real processes sharing one file.
+Runnable directly (`python tests/test_rate_limit.py`) or via pytest.
+"""
+
+import asyncio
+import multiprocessing as mp
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import databases
+import sqlalchemy as sa
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+if "app.database" not in sys.modules:  # keep the import-time engine off ./scanner.db
+    settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from app import rate_limit  # noqa: E402
+from app.database import rate_limits  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.sqlite_backend import TunedDatabase, tune_sqlite_connection  # noqa: E402
+
+JUNE, JULY = datetime(2026, 6, 15), datetime(2026, 7, 1)
+
+
+def _url() -> str:
+    url = f"sqlite:///{tempfile.mkdtemp()}/limits.db"
+    engine = sa.create_engine(url)
+    sa.event.listen(engine, "connect", lambda conn, _: tune_sqlite_connection(conn))
+    run_migrations(engine)
+    engine.dispose()
+    return url
+
+
+class _CountingDatabase:
+    """Wraps a Database and counts the statements that reach it."""
+
+    def __init__(self, db):
+        self._db, self.url, self.queries = db, db.url, 0
+
+    async def fetch_one(self, query):
+        self.queries += 1
+        return await self._db.fetch_one(query)
+
+    async def execute(self, query):
+        self.queries += 1
+        return await self._db.execute(query)
+
+
+def _reset_caches():
+    rate_limit._buckets.clear()
+    rate_limit._exhausted.clear()
+
+
+def test_monthly_quota_resets_and_refunds():
+    _reset_caches()
+    db = TunedDatabase(_url())
+
+    async def run():
+        await db.connect()
+        counted = _CountingDatabase(db)
+        try:
+            june = [await rate_limit.reserve_free_scan("a@example.com", JUNE, counted) for _ in range(4)]
+            queries = counted.queries
+            cached = await rate_limit.reserve_free_scan("a@example.com", JUNE, counted)
+            no_query = counted.queries == queries
+            await rate_limit.release_free_scan("a@example.com", JUNE, counted)
+            refunded = await rate_limit.reserve_free_scan("a@example.com", JUNE, counted)
+            july = await rate_limit.reserve_free_scan("a@example.com", JULY, counted)
+            other = await rate_limit.reserve_free_scan("b@example.com", JUNE, counted)
+            row = await db.fetch_one(rate_limits.select().where(rate_limits.c.email == "a@example.com"))
+            return june, cached, no_query, refunded, july, other, dict(row)
+        finally:
+            await db.disconnect()
+
+    june, cached, no_query, refunded, july, other, row = asyncio.run(run())
+    assert june == [True, True, True, False]
+    assert cached is False and no_query  # a known-exhausted email never reaches the database
+    assert refunded and july and other
+    assert row == {"email": "a@example.com", "scan_count": 1, "month": "2026-07"}
+
+
+def test_token_bucket_throttles_bursts_and_refills():
+    _reset_caches()
+    burst = settings.rate_limit_burst
+    results = [rate_limit.throttled("c@example.com", now=100.0) for _ in range(burst + 2)]
+    assert results == [False] * burst + [True, True]
+    assert not rate_limit.throttled("d@example.com", now=100.0)  # buckets are per email
+    assert rate_limit.throttled("c@example.com", now=100.0 + settings.rate_limit_refill_seconds / 2)
+    assert not rate_limit.throttled("c@example.com", now=100.0 + settings.rate_limit_refill_seconds * 1.5)
+
+    rate_limit.UNLIMITED_EMAILS.add("vip@example.com")
+    try:
+        assert not any(rate_limit.throttled("vip@example.com", now=100.0) for _ in range(burst * 3))
+    finally:
+        rate_limit.UNLIMITED_EMAILS.discard("vip@example.com")
+
+
+def _submit(url: str, attempts: int, start, out) -> None:
+    async def run():
+        db = databases.Database(url)  # stock backend: a separate connection per statement
+        await db.connect()
+        try:
+            start.wait()
+            return await asyncio.gather(*(rate_limit.reserve_free_scan("race@example.com", JUNE, db)
+                                          for _ in range(attempts)))
+        finally:
+            await db.disconnect()
+
+    out.put(sum(asyncio.run(run())))
+
+
+def test_quota_holds_across_processes():
+    url = _url()
+    ctx = mp.get_context("spawn")
+    start, out = ctx.Event(), ctx.Queue()
+    procs = [ctx.Process(target=_submit, args=(url, 5, start, out)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    start.set()
+    granted = sum(out.get(timeout=60) for _ in procs)
+    for p in procs:
+        p.join()
+    assert granted == rate_limit.MAX_FREE_SCANS_PER_MONTH, granted
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
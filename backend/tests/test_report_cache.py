@@ -0,0 +1,87 @@
+"""Unit tests for app.report_cache (content-addressed extraction cache).
+
+Pure filesystem tests — no OpenAI calls. Runnable directly
+(`python tests/test_report_cache.py`) or via pytest.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import report_cache  # noqa: E402
+from app.config import settings  # noqa: E402
+
+
+class _cache_in:
+    """Point the cache at a temp dir with a given size cap, restoring settings afterwards."""
+
+    def __init__(self, max_mb: float = 10.0):
+        self.max_mb = max_mb
+
+    def __enter__(self) -> Path:
+        self._tmp = tempfile.TemporaryDirectory()
+        self._saved = (settings.report_cache_dir, settings.report_cache_max_mb)
+        settings.report_cache_dir = self._tmp.name
+        settings.report_cache_max_mb = self.max_mb
+        return Path(self._tmp.name)
+
+    def __exit__(self, *exc):
+        settings.report_cache_dir, settings.report_cache_max_mb = self._saved
+        self._tmp.cleanup()
+
+
+def test_cache_key_varies_with_inputs():
+    base = report_cache.cache_key("# report", "gpt-5.2", "v1")
+    assert base == report_cache.cache_key("# report", "gpt-5.2", "v1")
+    assert base != report_cache.cache_key("# report!", "gpt-5.2", "v1")
+    assert base != report_cache.cache_key("# report", "gpt-5.6", "v1")
+    assert base != report_cache.cache_key("# report", "gpt-5.2", "v2")
+
+
+def test_get_put_roundtrip_and_counters():
+    with _cache_in():
+        before = report_cache.cache_stats()
+        key = report_cache.cache_key("md", "m", "v")
+        assert report_cache.get(key) is None
+        report_cache.put(key, {"risk_level": "High"})
+        assert report_cache.get(key) == {"risk_level": "High"}
+        after = report_cache.cache_stats()
+        assert after["misses"] == before["misses"] + 1
+        assert after["hits"] == before["hits"] + 1
+        assert after["writes"] == before["writes"] + 1
+
+
+def test_eviction_drops_least_recently_used():
+    # ~1.5 KB cap with ~600 B entries → only two fit.
+    with _cache_in(max_mb=1500 / (1024 * 1024)) as d:
+        blob = {"executive_summary": "x" * 560}
+        keys = [report_cache.cache_key(str(i), "m", "v") for i in range(3)]
+        report_cache.put(keys[0], blob)
+        report_cache.put(keys[1], blob)
+        # Age both entries, then touch key 0 via a hit so key 1 becomes the LRU entry.
+        old = time.time() - 100
+        for k in keys[:2]:
+            os.utime(d / f"{k}.json", (old, old))
+        assert report_cache.get(keys[0]) is not None
+        report_cache.put(keys[2], blob)
+
+        remaining = {p.stem for p in d.glob("*.json")}
+        assert remaining == {keys[0], keys[2]}, remaining
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,117 @@
+"""Unit tests for app.report_facts (deterministic stats / attack-surface extraction).
+
+Pure functions over synthetic tracer data — no OpenAI calls. Runnable directly
+(`python tests/test_report_facts.py`) or via pytest.
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.report_facts import assemble_report, collect_report_facts  # noqa: E402
+
+_EXECUTIONS = [
+    {"tool_name": "send_request", "args": {"method": "GET", "url": "https://example.com/api/users?id=1"},
+     "result": "HTTP/1.1 200 OK\nServer: nginx/1.25\nX-Powered-By: Express\n"},
+    {"tool_name": "send_request", "args": {"method": "GET", "url": "https://example.com/api/users?id=2"},
+     "result": "see https://cdn.example.com/static/app.js and https://google.com/x"},
+    {"tool_name": "browser_action", "args": {"action": "goto", "url": "https://app.example.com/login"},
+     "result": "<div data-reactroot>"},
+    {"tool_name": "terminal_execute", "args": {"command": "sqlmap -u 'https://example.com/search?q=1' --batch"},
+     "result": ""},
+    {"tool_name": "terminal_execute", "args": {"command": "ls -la"}, "result": ""},
+    {"tool_name": "think", "args": {"thought": "next"}, "result": ""},
+]
+
+
+def _facts(**kwargs):
+    defaults = dict(tool_executions=_EXECUTIONS, findings=[], markdown="", tool_count=0)
+    defaults.update(kwargs)
+    return collect_report_facts("https://example.com", **defaults)
+
+
+def test_stats_count_real_traffic_and_in_scope_endpoints():
+    facts = _facts(tool_count=3)
+    stats = facts["scan_stats"]
+    # send_request x2, goto, sqlmap — `ls` and `think` are not HTTP.
+    assert stats["requests_sent"] == 4
+    # /api/users (query ignored), app/login, /search
+    assert stats["endpoints_tested"] == 3
+    # + cdn.example.com/static/app.js seen in output; google.com is out of scope.
+    assert stats["endpoints_discovered"] == 4
+    assert facts["attack_surface"]["subdomains"] == ["app.example.com", "cdn.example.com", "example.com"]
+    assert stats["subdomains_found"] == 3
+    assert _facts(tool_count=50)["scan_stats"]["requests_sent"] == 50
+
+
+def test_key_routes_ranked_by_hits():
+    routes = _facts()["attack_surface"]["key_routes"]
+    assert routes[0] == "/api/users"
+    assert set(routes) == {"/api/users", "/login", "/search", "/static/app.js"}
+
+
+def test_technologies_from_headers_not_prose():
+    techs = _facts(markdown="The server may react slowly under load.")["attack_surface"]["technologies"]
+    assert techs == ["nginx", "React", "Express"]
+    assert _facts()["scan_stats"]["technologies_identified"] == 3
+
+
+def test_categories_findings_tested_skipped():
+    findings = [{"title": "SQL Injection in search", "endpoint": "/search", "impact": "db dump"}]
+    cats = {c["name"]: c for c in _facts(findings=findings)["categories_tested"]}
+    assert cats["SQL Injection"]["status"] == "findings" and cats["SQL Injection"]["findings_count"] == 1
+    assert cats["Authentication Bypass"]["status"] == "tested"  # visited /login
+    assert cats["SSRF"]["status"] == "skipped"
+
+
+def test_categories_match_whole_words_in_activity_only():
+    executions = [
+        {"tool_name": "send_request", "args": {"method": "GET", "url": "https://example.com/records"}},
+        {"tool_name": "terminal_execute", "args": {"command": "curl https://example.com/corridor/selfie.png"}},
+    ]
+    markdown = "Users sign in with a password; authorization and authentication looked fine. CORS, IDOR, LFI."
+    cats = {c["name"]: c["status"] for c in _facts(tool_executions=executions, markdown=markdown)["categories_tested"]}
+    assert set(cats.values()) == {"skipped"}, cats  # nothing the agent did was a category test
+
+    executions.append({"tool_name": "send_request",
+                       "args": {"method": "OPTIONS", "url": "https://example.com/api", "body": "CORS preflight"}})
+    findings = [{"title": "Missing Security Headers", "impact": "clickjacking"},
+                {"title": "Privileged actions without re-auth", "impact": ""}]
+    cats = {c["name"]: c for c in _facts(tool_executions=executions, findings=findings)["categories_tested"]}
+    assert cats["Security Headers"]["findings_count"] == 1 and cats["IDOR / Access Control"]["findings_count"] == 1
+    assert cats["Authentication Bypass"]["status"] == "skipped"
+
+
+def test_duration_and_empty_inputs():
+    started = datetime.now(timezone.utc) - timedelta(minutes=12)
+    assert _facts(started_at=started.isoformat())["scan_stats"]["duration_minutes"] == 12
+    empty = collect_report_facts("https://example.com")
+    assert empty["scan_stats"]["requests_sent"] == 0
+    assert empty["scan_stats"]["duration_minutes"] == 0
+    assert empty["attack_surface"]["key_routes"] == []
+
+
+def test_assemble_report_keeps_narrative_auth_and_services():
+    narrative = {"risk_level": "High", "attack_surface": {"auth_mechanisms": ["JWT"], "external_services": ["Stripe"]}}
+    report = assemble_report(narrative, _facts())
+    assert report["risk_level"] == "High"
+    assert report["attack_surface"]["auth_mechanisms"] == ["JWT"]
+    assert report["attack_surface"]["external_services"] == ["Stripe"]
+    assert report["attack_surface"]["technologies"] == ["nginx", "React", "Express"]
+    assert report["scan_stats"]["requests_sent"] == 4
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
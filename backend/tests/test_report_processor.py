@@ -0,0 +1,124 @@
+"""Unit tests for the pure map-reduce helpers in app.report_processor.
+
+Covers section-aware chunking of large reports and the deterministic merge of per-chunk
+extractions — no OpenAI calls. Runnable directly (`python tests/test_report_processor.py`)
+or via pytest.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.report_processor import (  # noqa: E402
+    create_fallback_report,
+    is_fallback_report,
+    merge_report_narratives,
+    split_report_sections,
+)
+
+
+def _vuln_section(i: int, body_len: int = 400) -> str:
+    return f"## Vulnerability {i}\n**Severity:** HIGH\n\n" + ("x" * body_len)
+
+
+def test_split_small_report_is_single_chunk():
+    md = "# Executive Summary\nAll good."
+    assert split_report_sections(md, 1000) == [md]
+
+
+def test_split_cuts_only_at_headings_and_respects_limit():
+    md = "# Executive Summary\nintro\n\n" + "\n\n".join(_vuln_section(i) for i in range(10))
+    chunks = split_report_sections(md, 1000)
+    assert len(chunks) > 1
+    assert all(len(c) <= 1000 for c in chunks), [len(c) for c in chunks]
+    assert chunks[0].startswith("# Executive Summary")
+    # Every chunk after the first starts on a section heading, and nothing is lost.
+    assert all(c.startswith("## ") for c in chunks[1:])
+    assert sum(c.count("## Vulnerability") for c in chunks) == 10
+
+
+def test_split_ignores_headings_inside_code_fences():
+    poc = "```bash\n# not a heading\n" + "echo hi\n" * 50 + "```"
+    md = "## PoC\n" + poc + "\n## Next\nbody"
+    chunks = split_report_sections(md, len(md) - 10)
+    assert any("# not a heading" in c and "```bash" in c for c in chunks), chunks
+
+
+def test_split_oversized_section_is_hard_cut():
+    md = "## Huge\n" + "y" * 2500
+    chunks = split_report_sections(md, 1000)
+    assert all(len(c) <= 1000 for c in chunks)
+    assert "".join(chunks).count("y") == 2500
+
+
+def _part(**overrides) -> dict:
+    base = create_fallback_report("https://example.com", "n/a")
+    base.update(overrides)
+    return base
+
+
+def test_merge_is_deterministic_and_picks_most_severe_risk():
+    a = _part(
+        executive_summary="Summary from chunk one.",
+        risk_level="Low", risk_rationale="minor issues",
+        areas_of_interest=[{"title": "Verbose errors", "severity": "Low"}],
+        recommendations=[{"priority": 0, "title": "Harden headers"}],
+        attack_surface={"auth_mechanisms": ["JWT bearer"], "external_services": ["Stripe"]},
+    )
+    b = _part(
+        executive_summary="Summary from chunk two.",
+        risk_level="High", risk_rationale="SQL injection confirmed",
+        areas_of_interest=[
+            {"title": "SQL Injection", "severity": "High"},
+            {"title": "verbose errors", "severity": "Low"},
+        ],
+        recommendations=[{"priority": 0, "title": "Parameterize queries"},
+                         {"priority": 1, "title": "harden headers"}],
+        attack_surface={"auth_mechanisms": ["jwt bearer", "Session cookie"], "external_services": []},
+    )
+
+    merged = merge_report_narratives([a, b])
+    assert merged == merge_report_narratives([a, b])
+    assert merged["executive_summary"] == "Summary from chunk one."
+    assert merged["risk_level"] == "High"
+    assert merged["risk_rationale"] == "SQL injection confirmed"
+    assert [a["title"] for a in merged["areas_of_interest"]] == ["SQL Injection", "Verbose errors"]
+    assert [(r["priority"], r["title"]) for r in merged["recommendations"]] == [
+        (0, "Harden headers"), (1, "Parameterize queries"),
+    ]
+    assert merged["attack_surface"] == {
+        "auth_mechanisms": ["JWT bearer", "Session cookie"], "external_services": ["Stripe"],
+    }
+    # Quantitative fields are computed locally (app.report_facts), never merged from chunks.
+    assert "scan_stats" not in merged and "categories_tested" not in merged
+
+
+def test_fallback_report_carries_local_facts():
+    facts = {
+        "scan_stats": {"endpoints_discovered": 4, "endpoints_tested": 2, "subdomains_found": 1,
+                       "requests_sent": 30, "duration_minutes": 7, "technologies_identified": 1},
+        "categories_tested": [{"name": "SSRF", "status": "tested", "findings_count": 0, "note": None}],
+        "attack_surface": {"subdomains": ["example.com"], "key_routes": ["/api"], "technologies": ["nginx"]},
+    }
+    report = create_fallback_report("https://example.com", "n/a", facts)
+    assert report["scan_stats"]["requests_sent"] == 30
+    assert report["categories_tested"] == facts["categories_tested"]
+    assert report["attack_surface"]["key_routes"] == ["/api"]
+    assert report["attack_surface"]["auth_mechanisms"] == []
+    assert is_fallback_report(report)
+    assert not is_fallback_report({"risk_level": "Indeterminate", "areas_of_interest": []})
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,152 @@
+"""Unit tests for the bulk-mode helpers in reprocess_scan.py.
+
+Covers the rate limiter, checkpoint round-trip and run-directory discovery — no database or
+OpenAI calls. Runnable directly (`python tests/test_reprocess_bulk.py`) or via pytest.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+if "app.database" not in sys.modules:  # keep the import-time engine off ./scanner.db
+    settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+import reprocess_scan  # noqa: E402
+from reprocess_scan import (  # noqa: E402
+    REPORT_NAME,
+    RateLimiter,
+    _stored_facts,
+    find_run_dir,
+    in_process_runs,
+    load_checkpoint,
+    save_checkpoint,
+)
+
+
+def test_rate_limiter_spaces_acquisitions():
+    async def run():
+        limiter = RateLimiter(per_minute=600, burst=2)  # 10/s after a burst of 2
+        start = time.monotonic()
+        for _ in range(5):
+            await limiter.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    assert 0.25 <= elapsed < 1.0, elapsed
+
+
+def test_checkpoint_roundtrip_and_missing_file():
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "ckpt.json"
+        assert load_checkpoint(path) == {"done": [], "failed": {}}
+        save_checkpoint(path, {"done": ["a", "b"], "failed": {"c": "timeout"}})
+        assert load_checkpoint(path) == {"done": ["a", "b"], "failed": {"c": "timeout"}}
+        assert [p.name for p in Path(d).iterdir()] == ["ckpt.json"]  # no temp files left
+
+
+def test_find_run_dir_prefers_recorded_then_cli_layout():
+    with tempfile.TemporaryDirectory() as d:
+        cwd = os.getcwd()
+        os.chdir(d)
+        try:
+            scan = {"id": "scan-1"}
+            assert find_run_dir(scan, {}) is None
+
+            cli_run = Path("strix_cli_runs/scan-1/strix_runs/example-com_ab12")
+            cli_run.mkdir(parents=True)
+            (cli_run / REPORT_NAME).write_text("# r", encoding="utf-8")
+            assert find_run_dir(scan, {}) == cli_run
+
+            recorded = Path("strix_runs/example-com_cd34")
+            recorded.mkdir(parents=True)
+            (recorded / REPORT_NAME).write_text("# r", encoding="utf-8")
+            assert find_run_dir(scan, {"run_dir": str(recorded)}) == recorded
+            assert find_run_dir(scan, {"run_dir": "strix_runs/gone"}) == cli_run
+        finally:
+            os.chdir(cwd)
+
+
+def test_find_run_dir_matches_unindexed_in_process_runs():
+    with tempfile.TemporaryDirectory() as d:
+        cwd = os.getcwd()
+        os.chdir(d)
+        try:
+            done = datetime(2026, 3, 1, 12, 0)
+
+            def run(name, host, written):
+                path = Path("strix_runs") / name
+                path.mkdir(parents=True)
+                (path / REPORT_NAME).write_text(f"# Pentest of https://{host}/", encoding="utf-8")
+                os.utime(path / REPORT_NAME, (written.timestamp(), written.timestamp()))
+                return path
+
+            earlier = run("example-com_aa11", "example.com", done - timedelta(hours=2))
+            ours = run("example-com_bb22", "example.com", done - timedelta(minutes=5))
+            run("other-io_cc33", "other.io", done - timedelta(minutes=1))
+            run("example-com_dd44", "example.com", done - timedelta(days=3))
+            runs = in_process_runs()
+            assert len(runs) == 4
+
+            scan = {"id": "old-1", "target_url": "https://Example.com/app", "completed_at": done}
+            assert find_run_dir(scan, {}, runs) == ours  # right host, nearest to completion
+            assert find_run_dir(scan, {}) == ours  # lists strix_runs/ itself when not given
+            assert find_run_dir({**scan, "completed_at": done - timedelta(hours=2)}, {}, runs) == earlier
+            assert find_run_dir({**scan, "completed_at": done + timedelta(days=1)}, {}, runs) is None
+            assert find_run_dir({**scan, "target_url": "https://nowhere.dev"}, {}, runs) is None
+        finally:
+            os.chdir(cwd)
+
+
+def test_run_findings_parser_chosen_by_resolved_location():
+    calls = []
+    real = reprocess_scan.parse_strix_run_dir, reprocess_scan.parse_vulnerabilities
+    reprocess_scan.parse_strix_run_dir = lambda name: calls.append(("in-process", name)) or []
+    reprocess_scan.parse_vulnerabilities = lambda run_dir: calls.append(("cli", run_dir.name)) or []
+    with tempfile.TemporaryDirectory() as d:
+        cwd = os.getcwd()
+        os.chdir(d)
+        try:
+            for run_dir in (Path("strix_runs/example-com_ab12"), Path(d) / "strix_runs" / "example-com_ab12",
+                            Path("strix_runs/../strix_runs/example-com_ab12"),
+                            Path("strix_cli_runs/scan-1/strix_runs/example-com_cd34")):
+                reprocess_scan._parse_run_findings(run_dir)
+        finally:
+            os.chdir(cwd)
+            reprocess_scan.parse_strix_run_dir, reprocess_scan.parse_vulnerabilities = real
+    assert calls == [("in-process", "example-com_ab12")] * 3 + [("cli", "example-com_cd34")]
+
+
+def test_stored_facts_reuses_scan_time_stats():
+    report = {
+        "scan_stats": {"requests_sent": 120},
+        "categories_tested": [{"name": "SSRF", "status": "tested"}],
+        "attack_surface": {"subdomains": ["a.example.com"], "key_routes": ["/api"], "technologies": [],
+                           "auth_mechanisms": ["JWT"]},
+    }
+    facts = _stored_facts(report)
+    assert facts["scan_stats"]["requests_sent"] == 120
+    assert facts["attack_surface"] == {"subdomains": ["a.example.com"], "key_routes": ["/api"], "technologies": []}
+    assert _stored_facts({"risk_level": "High"}) is None
+    assert _stored_facts(None) is None
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
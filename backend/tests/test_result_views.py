@@ -0,0 +1,226 @@
+"""Tests for app/result_views.py (stored per-tier results projections, ETags).
+
+Uses throwaway SQLite files — runnable directly (`python tests/test_result_views.py`) or via pytest.
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import sqlalchemy as sa
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+if "app.database" not in sys.modules:  # keep the import-time engine off ./scanner.db
+    settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from app import archive, result_views  # noqa: E402
+from app.database import scans  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.models import ScanResults  # noqa: E402
+from app.sqlite_backend import TunedDatabase, tune_sqlite_connection  # noqa: E402
+
+RESULTS = {
+    "findings": [
+        {"title": "SQL injection", "severity": "Critical", "endpoint": "/login", "impact": "Data theft",
+         "owasp_category": "A03", "reproduction_steps": "1. ' OR 1=1", "poc": "curl ...", "fix_guidance": "bind"},
+        {"title": "Missing HSTS", "severity": "Low"},
+    ],
+    "structured_report": {
+        "executive_summary": "A long executive summary. " * 20, "executive_summary_teaser": "Teaser",
+        "risk_level": "Critical", "risk_rationale": "SQLi on login",
+        "areas_of_interest": [{"title": "Auth", "severity": "Critical", "teaser": "t",
+                               "affected_component": "/login", "technical_detail": "d", "recommendation": "r"}],
+        "recommendations": [{"priority": 1, "title": "Bind parameters", "description": "d", "effort": "low"}],
+        "deep_scan_value_prop": "more", "scan_stats": {"endpoints_tested": 12},
+    },
+}
+DONE = datetime(2026, 6, 1, 12, 30, 15, 123456)
+
+
+def _fields(**overrides) -> dict:
+    return {"scan_id": "s1", "target_url": "https://x.io", "scan_type": "quick", "completed_at": DONE,
+            "paid_tier": None, "expires_in_days": 12, **overrides}
+
+
+class _CountingDatabase:
+    """Wraps a Database and counts the statements that reach it."""
+
+    def __init__(self, db):
+        self._db, self.url, self.queries = db, db.url, 0
+
+    async def fetch_one(self, query):
+        self.queries += 1
+        return await self._db.fetch_one(query)
+
+    async def execute(self, query):
+        self.queries += 1
+        return await self._db.execute(query)
+
+
+def _setup() -> TunedDatabase:
+    settings.archive_dir = tempfile.mkdtemp()
+    url = f"sqlite:///{tempfile.mkdtemp()}/views.db"
+    engine = sa.create_engine(url)
+    sa.event.listen(engine, "connect", lambda conn, _: tune_sqlite_connection(conn))
+    run_migrations(engine)
+    engine.dispose()
+    return TunedDatabase(url)
+
+
+def test_stored_view_matches_the_model_response():
+    for view, tier in (("free", None), ("paid", "pro")):
+        body = result_views.render(RESULTS, view)
+        etag, content = result_views.respond("v1", body, **_fields(paid_tier=tier))
+        expected = ScanResults(
+            **_fields(paid_tier=tier),
+            risk_level="Critical",
+            findings=result_views.filter_findings_for_tier(RESULTS["findings"], tier),
+            structured_report=result_views.filter_structured_report_for_tier(RESULTS["structured_report"], tier),
+        ).model_dump(mode="json")
+        assert json.loads(content) == expected, view
+    free = json.loads(result_views.respond("v1", result_views.render(RESULTS, "free"), **_fields())[1])
+    assert free["findings"][0]["poc"] is None and free["structured_report"]["executive_summary"] == "Teaser"
+
+    etag = result_views.respond("v1", "{}", **_fields())[0]
+    assert etag == result_views.respond("v1", "{}", **_fields())[0] and etag.startswith('"')
+    assert etag != result_views.respond("v1", "{}", **_fields(expires_in_days=11))[0]  # countdown moved
+    assert etag != result_views.respond("v1", "{}", **_fields(paid_tier="unlock"))[0]
+    assert etag != result_views.respond("v2", "{}", **_fields())[0]
+    assert result_views.not_modified(f'"other", W/{etag}', etag) and result_views.not_modified("*", etag)
+    assert not result_views.not_modified(None, etag) and not result_views.not_modified('"other"', etag)
+
+
+def test_views_render_once_and_go_stale_with_their_source():
+    db = _setup()
+    parent = {"id": "parent", "email": "a@example.com", "target_url": "https://x.io", "status": "completed",
+              "scan_type": "quick", "completed_at": DONE, "results_json": json.dumps(RESULTS)}
+    child = {**parent, "id": "child", "parent_scan_id": "parent", "scan_type": "deep",
+             "completed_at": datetime(2026, 6, 2), "results_json": json.dumps({"findings": []})}
+
+    async def run():
+        await db.connect()
+        try:
+            await db.execute(scans.insert().values(**parent))
+            renders = result_views._stats["renders"]
+            await result_views.warm("parent", db=db)
+            first = await result_views.get_view("parent", "free", "parent", DONE, db=db)
+            second = await result_views.get_view("parent", "free", "parent", DONE, db=db)
+            after_warm = result_views._stats["renders"] - renders
+
+            await db.execute(scans.insert().values(**child))
+            await db.execute(scans.update().where(scans.c.id == "parent").values(paid_tier="deep"))
+            await result_views.warm("child", db=db)  # the upgrade renders the parent's paid view
+            source = await result_views.resolve_report("parent", db=db)
+            upgraded = await result_views.get_view("parent", "paid", source["source_id"],
+                                                   source["source_completed_at"], db=db)
+            after_child = result_views._stats["renders"] - renders
+
+            await result_views.invalidate("child", db=db)  # reprocessed: views built from it go
+            again = await result_views.get_view("parent", "paid", "child", source["source_completed_at"], db=db)
+            return first, second, after_warm, source["source_id"], upgraded, after_child, again, \
+                result_views._stats["renders"] - renders
+        finally:
+            await db.disconnect()
+
+    first, second, after_warm, source_id, upgraded, after_child, again, total = asyncio.run(run())
+    assert first == second and after_warm == 1  # warm() rendered it; both reads were served stored
+    assert json.loads(first[1])["risk_level"] == "Critical"
+    assert source_id == "child" and json.loads(upgraded[1])["risk_level"] == "Clean" and after_child == 2
+    assert again == upgraded and total == 3
+
+
+def test_report_source_resolves_in_one_query():
+    db = _setup()
+    row = {"email": "a@example.com", "target_url": "https://x.io", "created_at": DONE}
+    rows = [
+        {**row, "id": "lone", "status": "completed", "scan_type": "quick", "completed_at": DONE,
+         "results_json": json.dumps(RESULTS), "progress_json": '{"tools": 9}'},
+        {**row, "id": "top", "status": "completed", "scan_type": "quick", "completed_at": DONE,
+         "results_json": json.dumps(RESULTS), "paid_tier": "deep"},
+        {**row, "id": "top-pro", "parent_scan_id": "top", "status": "completed", "scan_type": "pro",
+         "completed_at": datetime(2026, 6, 2), "results_json": '{"by": "pro"}', "progress_json": '{"tools": 1}'},
+        {**row, "id": "top-deep", "parent_scan_id": "top", "status": "completed", "scan_type": "deep",
+         "completed_at": datetime(2026, 6, 3), "results_json": '{"by": "deep"}', "progress_json": '{"tools": 2}'},
+        {**row, "id": "top-rerun", "parent_scan_id": "top", "status": "running", "scan_type": "deep"},
+    ]
+
+    async def run():
+        await db.connect()
+        counted = _CountingDatabase(db)
+        try:
+            for r in rows:
+                await db.execute(scans.insert().values(**r))
+            out = {}
+            for scan_id in ("lone", "top", "missing"):
+                before = counted.queries
+                report = await result_views.resolve_report(scan_id, "results_json", "progress_json", db=counted)
+                out[scan_id] = (dict(report) if report else None, counted.queries - before)
+            await result_views.get_view("top", "paid", "top-deep", datetime(2026, 6, 3), db=counted)
+            # GET /scans/{id}/results once the view is stored: the report source, then the view.
+            before = counted.queries
+            report = await result_views.resolve_report("top", db=counted)
+            await result_views.get_view("top", "paid", report["source_id"], report["source_completed_at"],
+                                        db=counted)
+            out["results request"] = (sorted(report.keys()), counted.queries - before)
+            return out
+        finally:
+            await db.disconnect()
+
+    out = asyncio.run(run())
+    lone, queries = out["lone"]
+    assert queries == 1 and (lone["source_id"], lone["source_scan_type"], lone["progress_json"]) == \
+        ("lone", "quick", '{"tools": 9}')
+    top, queries = out["top"]
+    assert queries == 1 and top["id"] == "top" and top["paid_tier"] == "deep" and top["scan_type"] == "quick"
+    assert (top["source_id"], top["source_scan_type"], top["source_completed_at"]) == \
+        ("top-deep", "deep", datetime(2026, 6, 3))  # newest *completed* child
+    assert (top["results_json"], top["progress_json"]) == ('{"by": "deep"}', '{"tools": 2}')
+    assert out["missing"] == (None, 1)
+    keys, queries = out["results request"]
+    assert queries == 2 and "results_json" not in keys  # no payload pulled when the view is stored
+
+
+def test_archived_scans_lose_their_views_and_render_after_restore():
+    db = _setup()
+    old = datetime(2026, 1, 1)
+    row = {"id": "old", "email": "a@example.com", "target_url": "https://x.io", "status": "completed",
+           "scan_type": "quick", "created_at": old, "completed_at": old, "results_json": json.dumps(RESULTS)}
+
+    async def run():
+        await db.connect()
+        try:
+            await db.execute(scans.insert().values(**row))
+            await result_views.get_view("old", "free", "old", old, db=db)
+            archived = await archive.archive_batch(datetime(2026, 6, 1), db=db)
+            stored = await db.fetch_all(result_views.result_views.select())
+            await db.execute(scans.update().where(scans.c.id == "old").values(paid_tier="unlock"))
+            _, body = await result_views.get_view("old", "paid", "old", old, db=db)  # paid after expiry
+            restored = await db.fetch_one(scans.select().where(scans.c.id == "old"))
+            return archived, stored, body, restored
+        finally:
+            await db.disconnect()
+
+    archived, stored, body, restored = asyncio.run(run())
+    assert archived["scans"] == 1 and stored == []
+    assert json.loads(body)["findings"][0]["poc"] == "curl ..."
+    assert restored["archived_at"] is None and restored["results_json"] == row["results_json"]
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
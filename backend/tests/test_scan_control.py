@@ -0,0 +1,119 @@
+"""Unit tests for app/scan_control.py (wall-clock budget, stall watchdog, admin cancel).
+
+Uses a fake clock and a throwaway SQLite database — runnable directly
+(`python tests/test_scan_control.py`) or via pytest.
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+if "app.database" not in sys.modules:  # keep the import-time engine off ./scanner.db
+    settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from app.database import database, scans  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.scan_control import CANCEL_STATUS, ScanWatchdog, watch_for_cancel  # noqa: E402
+
+run_migrations()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _watchdog(clock, events, wall=600, stall=120, grace=60):
+    return ScanWatchdog(
+        "scan-1", wall, stall, grace,
+        on_wrap_up=lambda r: events.append(("wrap_up", r)),
+        on_cancel=lambda r: events.append(("cancel", r)),
+        clock=clock,
+    )
+
+
+def test_activity_keeps_a_scan_alive_until_the_wall_clock():
+    clock, events = FakeClock(), []
+    wd = _watchdog(clock, events)
+    for step in range(1, 11):
+        clock.now += 55
+        wd.observe(tools=step, tokens=step * 1000)
+        assert wd.check() is None
+    clock.now += 55  # 605 s elapsed
+    assert wd.check() == "wrap_up" and events == [("wrap_up", "timeout")]
+    clock.now += 30
+    assert wd.check() is None
+    clock.now += 30
+    assert wd.check() == "cancel" and events[-1] == ("cancel", "timeout")
+    clock.now += 300
+    assert wd.check() is None and len(events) == 2  # each fires once
+
+
+def test_stall_fires_when_neither_tools_nor_tokens_move():
+    clock, events = FakeClock(), []
+    wd = _watchdog(clock, events)
+    wd.observe(tools=3, tokens=500)
+    clock.now += 100
+    wd.observe(tools=3, tokens=900)  # tokens still moving: not stalled
+    clock.now += 100
+    assert wd.check() is None
+    wd.observe(tools=3, tokens=900)
+    clock.now += 30
+    assert wd.check() == "wrap_up" and events == [("wrap_up", "stalled")]
+    assert wd.reason == "stalled"
+
+
+def test_zero_limits_disable_the_watchdog():
+    clock, events = FakeClock(), []
+    wd = _watchdog(clock, events, wall=0, stall=0)
+    clock.now += 10 ** 6
+    assert wd.check() is None and events == []
+
+
+def test_cancel_is_noticed_within_a_poll():
+    async def run():
+        await database.connect()
+        try:
+            await database.execute(scans.insert().values(
+                id="scan-cancel", email="a@example.com", target_url="https://example.com", status="running",
+            ))
+            cancelled_at = []
+            watcher = asyncio.create_task(
+                watch_for_cancel("scan-cancel", lambda: cancelled_at.append(time.monotonic()), interval=0.05)
+            )
+            await asyncio.sleep(0.2)
+            assert not cancelled_at and not watcher.done()
+            requested = time.monotonic()
+            await database.execute(
+                scans.update().where(scans.c.id == "scan-cancel").values(status=CANCEL_STATUS)
+            )
+            await asyncio.wait_for(watcher, timeout=2)
+            return cancelled_at, requested
+        finally:
+            await database.disconnect()
+
+    cancelled_at, requested = asyncio.run(run())
+    assert len(cancelled_at) == 1 and cancelled_at[0] - requested < 0.5
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,133 @@
+"""Tests for app/sqlite_backend.py (WAL profile, single writer, pooled read-only readers).
+
+Uses throwaway SQLite files — runnable directly (`python tests/test_sqlite_backend.py`) or
+via pytest.
+"""
+
+import asyncio
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import sqlalchemy as sa
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+
+if "app.database" not in sys.modules:  # keep the import-time engine off ./scanner.db
+    settings.database_url = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from app.database import scans  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.sqlite_backend import TunedDatabase, is_tunable, tune_sqlite_connection  # noqa: E402
+
+
+def _tuned_database() -> tuple[TunedDatabase, str]:
+    path = f"{tempfile.mkdtemp()}/tuned.db"
+    engine = sa.create_engine(f"sqlite:///{path}")
+    sa.event.listen(engine, "connect", lambda conn, _: tune_sqlite_connection(conn))
+    run_migrations(engine)
+    engine.dispose()
+    return TunedDatabase(f"sqlite:///{path}"), path
+
+
+def _insert(scan_id: str):
+    return scans.insert().values(id=scan_id, email="a@example.com", target_url="https://example.com",
+                                 status="running")
+
+
+def test_profile_and_read_only_readers():
+    db, path = _tuned_database()
+
+    async def run():
+        await db.connect()
+        try:
+            await db.execute(_insert("s1"))
+            row = await db.fetch_one(sa.text("PRAGMA busy_timeout"))
+            try:
+                await db.fetch_one(sa.text("DELETE FROM scans"))  # a "read" that writes: refused
+                wrote = True
+            except sqlite3.OperationalError:
+                wrote = False
+            return row[0], wrote, await db.fetch_one(scans.select().where(scans.c.id == "s1"))
+        finally:
+            await db.disconnect()
+
+    busy_timeout, wrote, row = asyncio.run(run())
+    assert busy_timeout == settings.sqlite_busy_timeout_ms and not wrote and row["status"] == "running"
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert is_tunable("sqlite:///./scanner.db") and not is_tunable("sqlite:///:memory:")
+    assert not is_tunable("postgresql://u@h/db")
+
+
+def test_readers_are_not_blocked_by_an_open_write_transaction():
+    db, _ = _tuned_database()
+
+    async def run():
+        await db.connect()
+        try:
+            await db.execute(_insert("s1"))
+            in_txn, release = asyncio.Event(), asyncio.Event()
+
+            async def writer():
+                async with db.transaction():
+                    await db.execute(scans.update().where(scans.c.id == "s1").values(status="completed"))
+                    seen_inside = (await db.fetch_one(scans.select().where(scans.c.id == "s1")))["status"]
+                    in_txn.set()
+                    await release.wait()
+                return seen_inside
+
+            task = asyncio.create_task(writer())
+            await in_txn.wait()
+            # WAL: the pollers read the last committed state without waiting for the writer
+            during = (await asyncio.wait_for(db.fetch_one(scans.select()), timeout=1))["status"]
+            release.set()
+            inside = await task
+            after = (await db.fetch_one(scans.select()))["status"]
+
+            try:
+                async with db.transaction():
+                    await db.execute(_insert("s2"))
+                    raise RuntimeError("boom")
+            except RuntimeError:
+                pass
+            count = len(await db.fetch_all(scans.select()))
+            return inside, during, after, count
+        finally:
+            await db.disconnect()
+
+    assert asyncio.run(run()) == ("completed", "running", "completed", 1)
+
+
+def test_concurrent_writers_in_one_process_never_hit_locked():
+    db, _ = _tuned_database()
+
+    async def run():
+        await db.connect()
+        try:
+            await asyncio.gather(*(db.execute(_insert(f"s{i}")) for i in range(50)))
+            await asyncio.gather(*(
+                db.execute(scans.update().where(scans.c.id == f"s{i % 50}").values(progress_json="x" * 5000))
+                for i in range(200)
+            ))
+            return len(await db.fetch_all(scans.select().where(scans.c.progress_json.isnot(None))))
+        finally:
+            await db.disconnect()
+
+    assert asyncio.run(run()) == 50
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
@@ -111,16 +111,19 @@ def test_read_run_json():
 def test_interpret_result_branches():
     f = {"title": "x", "severity": "High"}
     # exit 2 = findings → success
-    assert interpret_result(2, [f], None, None) == {"findings": [f]}
-    # structured report only → success
-    r = interpret_result(0, [], {"risk_level": "Clean"}, None)
-    assert r["findings"] == [] and r["structured_report"] == {"risk_level": "Clean"}
+    assert interpret_result(2, [f], None, None) == {"findings": [f], "report_markdown": None}
+    # report only → success, markdown handed to postprocessing
+    r = interpret_result(0, [], "# Report", None)
+    assert r["findings"] == [] and r["report_markdown"] == "# Report"
     # clean-but-empty → fail-loud, never false "clean"
     assert interpret_result(0, [], None, None)["error"] == "no_report"
     # exit 1 with nothing → strix_error
     assert interpret_result(1, [], None, None)["error"] == "strix_error"
     # killed on timeout with nothing → timeout
     assert interpret_result(0, [], None, "timeout")["error"] == "timeout"
+    # admin cancel: partial results still finalize; nothing at all → cancelled, not retried
+    assert interpret_result(-9, [], None, "cancelled")["error"] == "cancelled"
+    assert interpret_result(-9, [f], None, "cancelled")["findings"] == [f]
 
 
 def test_discover_run_dir():
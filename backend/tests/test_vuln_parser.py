@@ -0,0 +1,96 @@
+"""Unit tests for the single-pass vulnerability markdown parser in app.strix_runner.
+
+The previous three-split parser lives on in benchmarks/bench_vuln_parser.py as the baseline;
+these tests pin the new parser to it on edge cases and check parallel run-dir parsing keeps
+file order. Runnable directly (`python tests/test_vuln_parser.py`) or via pytest.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import strix_runner  # noqa: E402
+from app.strix_runner import parse_strix_run_dir, parse_vulnerability_text  # noqa: E402
+from benchmarks.bench_vuln_parser import baseline_parse_md  # noqa: E402
+
+_CASES = {
+    "full": (
+        "# SQL Injection in login\n\n- **Endpoint:** https://example.com/login\n- **Severity:** Critical\n\n"
+        "## Description\nQuery built from input.\n\n## Impact\nDB dump.\n\n"
+        "## Technical Analysis\nstep 1\nstep 2\n\n## Proof of Concept\n```bash\n# not a title\ncurl x\n```\n"
+        "## Remediation\nParameterize."
+    ),
+    "sections_override_by_inline": "## Severity\nlow\n## Endpoint\n/a\n**Severity:** high\n",
+    "description_only": "# T\n### Description\nfallback impact\n",
+    "duplicate_and_empty_sections": "# T\n## Impact\nfirst\n## Impact\nsecond\n## Fix\n",
+    "heading_last_line_no_newline": "# T\n## Impact\nbody\n## Remediation",
+    "crlf": "# Title\r\n## Impact\r\nbody\r\n## Severity\r\nHigh\r\n",
+    "title_after_sections": "## Impact\nx\n# Late Title\n",
+    "no_headings": "just text\nmore\n",
+    "hashes_without_space": "#notitle\n##nosection\n# Real\n",
+    "empty": "",
+}
+
+
+def test_matches_previous_parser_on_edge_cases():
+    with tempfile.TemporaryDirectory() as d:
+        for name, content in _CASES.items():
+            path = Path(d) / f"vuln-{name}.md"
+            path.write_bytes(content.encode("utf-8"))
+            expected = baseline_parse_md(path)
+            assert parse_vulnerability_text(path.read_text(encoding="utf-8"), path.stem) == expected, name
+
+
+def test_full_report_fields():
+    f = parse_vulnerability_text(_CASES["full"])
+    assert f["title"] == "SQL Injection in login"
+    assert f["severity"] == "Critical"
+    assert f["endpoint"].strip() == "https://example.com/login"
+    assert f["impact"] == "DB dump."
+    assert f["reproduction_steps"] == "step 1\nstep 2"
+    assert "# not a title" in f["poc"]
+    assert f["fix_guidance"] == "Parameterize."
+
+
+def test_parallel_run_dir_parse_keeps_csv_order():
+    with tempfile.TemporaryDirectory() as d:
+        cwd = os.getcwd()
+        os.chdir(d)
+        saved = strix_runner._PARALLEL_PARSE_MIN_FILES, strix_runner._PARSE_WORKERS
+        try:
+            vuln_dir = Path("strix_runs/run-a/vulnerabilities")
+            vuln_dir.mkdir(parents=True)
+            rows = ["id,title,severity,file"]
+            for i in range(20):
+                (vuln_dir / f"v{i}.md").write_text(f"# Vuln {i}\n## Impact\nimpact {i}\n", encoding="utf-8")
+                rows.append(f"v{i},CSV title {i},high,v{i}.md")
+            (vuln_dir.parent / "vulnerabilities.csv").write_text("\n".join(rows) + "\n", encoding="utf-8")
+
+            strix_runner._PARALLEL_PARSE_MIN_FILES = 1000
+            sequential = parse_strix_run_dir("run-a")
+            strix_runner._PARALLEL_PARSE_MIN_FILES, strix_runner._PARSE_WORKERS = 2, 4
+            parallel = parse_strix_run_dir("run-a")
+        finally:
+            strix_runner._PARALLEL_PARSE_MIN_FILES, strix_runner._PARSE_WORKERS = saved
+            os.chdir(cwd)
+
+    assert parallel == sequential
+    assert [f["title"] for f in parallel] == [f"Vuln {i}" for i in range(20)]
+    assert parallel[3]["impact"] == "impact 3"
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)